@@ -0,0 +1,64 @@
+'''Benchmarks for modular_quaternion.py'''
+
+from __future__ import absolute_import
+
+import random
+
+import numpy as np
+from benchmarks.runner import benchmark, SEED
+from modular_quaternion import ModularQuaternion, ModularQuaternionArray
+from quaternionic_integer import QuaternionicInteger
+
+MODULUS = 1000003
+ARRAY_SIZE = 100000
+
+
+def random_components(count, modulus=MODULUS, seed=SEED):
+    '''Reproducible rows of four residues modulo modulus'''
+    rng = random.Random(seed)
+    return [[rng.randrange(modulus) for _ in range(4)] for _ in range(count)]
+
+
+@benchmark('modular_quaternion.mul')
+def mul():
+    family = ModularQuaternion.modulo(MODULUS)
+    q1, q2 = (family(*row) for row in random_components(2))
+    return lambda: q1 * q2
+
+
+@benchmark('modular_quaternion.quaternionic_integer_mul_then_reduce')
+def quaternionic_integer_mul_then_reduce():
+    # The pattern ModularQuaternion replaces: an integer product, then a reduction
+    q1, q2 = (QuaternionicInteger(*row) for row in random_components(2))
+    def workload():
+        q = q1 * q2
+        return QuaternionicInteger(q.scalar % MODULUS, q.i % MODULUS, q.j % MODULUS, q.k % MODULUS)
+    return workload
+
+
+@benchmark('modular_quaternion.pow')
+def power():
+    q = ModularQuaternion.modulo(MODULUS)(*random_components(1)[0])
+    return lambda: q ** (MODULUS - 2)
+
+
+@benchmark('modular_quaternion.reciprocal')
+def reciprocal():
+    q = ModularQuaternion.modulo(MODULUS)(*random_components(1)[0])
+    return q.reciprocal
+
+
+@benchmark('modular_quaternion_array.mul_100k')
+def array_mul():
+    rng = np.random.default_rng(SEED)
+    a = ModularQuaternionArray(rng.integers(0, MODULUS, size=(ARRAY_SIZE, 4)), MODULUS)
+    b = ModularQuaternionArray(rng.integers(0, MODULUS, size=(ARRAY_SIZE, 4)), MODULUS)
+    return lambda: a * b
+
+
+@benchmark('modular_quaternion_array.reciprocal_100k')
+def array_reciprocal():
+    rng = np.random.default_rng(SEED)
+    a = ModularQuaternionArray(rng.integers(0, MODULUS, size=(ARRAY_SIZE, 4)), MODULUS)
+    a = a[a.norm_squared() != 0]
+    return a.reciprocal
@@ -0,0 +1,33 @@
+'''Benchmarks for quaternion_array.py'''
+
+from __future__ import absolute_import
+
+from benchmarks.runner import benchmark
+from benchmarks.quaternion_benchmark import random_quaternions
+from quaternion_array import QuaternionArray, to_numpy, from_numpy
+
+ARRAY_SIZE = 100000
+
+
+@benchmark('quaternion_array.from_quaternions_100k')
+def bench_from_quaternions():
+    quaternions = random_quaternions(ARRAY_SIZE)
+    return lambda: QuaternionArray.from_quaternions(quaternions)
+
+
+@benchmark('quaternion_array.to_quaternions_100k')
+def bench_to_quaternions():
+    qa = QuaternionArray.from_quaternions(random_quaternions(ARRAY_SIZE))
+    return qa.to_quaternions
+
+
+@benchmark('quaternion_array.to_numpy_100k')
+def bench_to_numpy():
+    quaternions = random_quaternions(ARRAY_SIZE)
+    return lambda: to_numpy(quaternions)
+
+
+@benchmark('quaternion_array.from_numpy_100k')
+def bench_from_numpy():
+    arr = to_numpy(random_quaternions(ARRAY_SIZE))
+    return lambda: from_numpy(arr)
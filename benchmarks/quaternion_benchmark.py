@@ -0,0 +1,92 @@
+'''Benchmarks for quaternion.py'''
+
+from __future__ import absolute_import
+
+import random
+
+from benchmarks.runner import benchmark, SEED
+from quaternion import Quaternion
+
+
+def random_quaternions(count, seed=SEED):
+    '''Reproducible quaternions with components in [-10, 10)'''
+    rng = random.Random(seed)
+    return [Quaternion(*(rng.uniform(-10, 10) for _ in range(4))) for _ in range(count)]
+
+
+@benchmark('quaternion.construct')
+def construct():
+    return lambda: Quaternion(1.5, -2.5, 3.5, -4.5)
+
+
+@benchmark('quaternion.make')
+def make():
+    return lambda: Quaternion._make(1.5, -2.5, 3.5, -4.5)
+
+
+@benchmark('quaternion.construction')
+def construction():
+    # A list of 1000 live instances through the public constructor only, so the
+    # workload also runs on trees from before Quaternion._make and compares with them
+    components = [q.to_list() for q in random_quaternions(1000)]
+    return lambda: [Quaternion(*c) for c in components]
+
+
+@benchmark('quaternion.add')
+def add():
+    q1, q2 = random_quaternions(2)
+    return lambda: q1 + q2
+
+
+@benchmark('quaternion.mul')
+def mul():
+    q1, q2 = random_quaternions(2)
+    return lambda: q1 * q2
+
+
+@benchmark('quaternion.mul_real')
+def mul_real():
+    q1, = random_quaternions(1)
+    return lambda: q1 * 2.5
+
+
+@benchmark('quaternion.truediv')
+def truediv():
+    q1, q2 = random_quaternions(2)
+    return lambda: q1 / q2
+
+
+@benchmark('quaternion.pow_real')
+def pow_real():
+    q1, = random_quaternions(1)
+    return lambda: q1 ** 2.5
+
+
+@benchmark('quaternion.pow_int')
+def pow_int():
+    q1, = random_quaternions(1)
+    return lambda: q1 ** 3
+
+
+@benchmark('quaternion.norm')
+def norm():
+    q1, = random_quaternions(1)
+    return q1.norm
+
+
+@benchmark('quaternion.from_string')
+def from_string():
+    string = repr(random_quaternions(1)[0])
+    return lambda: Quaternion.from_string(string)
+
+
+@benchmark('quaternion.product_chain_1000')
+def product_chain():
+    quaternions = [q.unit() for q in random_quaternions(1000)]
+
+    def run():
+        result = Quaternion(1)
+        for q in quaternions:
+            result = result * q
+        return result
+    return run
@@ -0,0 +1,36 @@
+'''Benchmarks for quaternion_clustering.py'''
+
+from __future__ import absolute_import
+
+import numpy as np
+
+from benchmarks.runner import benchmark, SEED
+from quaternion_clustering import kmeans, kmedoids, deduplicate
+
+
+def noisy_rotations(clusters, copies, scale=1e-3):
+    '''copies noisy candidates, with random signs, of each of clusters random rotations'''
+    rng = np.random.default_rng(SEED)
+    centers = rng.normal(size=(clusters, 4))
+    samples = np.repeat(centers / np.linalg.norm(centers, axis=1, keepdims=True), copies, axis=0)
+    samples += rng.normal(scale=scale, size=samples.shape)
+    samples *= rng.choice([-1, 1], size=(len(samples), 1))
+    return samples[rng.permutation(len(samples))]
+
+
+@benchmark('quaternion_clustering.deduplicate_100k')
+def bench_deduplicate():
+    samples = noisy_rotations(1000, 100)
+    return lambda: deduplicate(samples, 0.01)
+
+
+@benchmark('quaternion_clustering.kmeans_100k_k16')
+def bench_kmeans():
+    samples = noisy_rotations(16, 6250, scale=0.05)
+    return lambda: kmeans(samples, 16, seed=SEED)
+
+
+@benchmark('quaternion_clustering.kmedoids_5k_k8')
+def bench_kmedoids():
+    samples = noisy_rotations(8, 625, scale=0.05)
+    return lambda: kmedoids(samples, 8, seed=SEED)
@@ -0,0 +1,41 @@
+'''Benchmarks for quaternion_dict.py'''
+
+from __future__ import absolute_import
+
+import numpy as np
+
+from benchmarks.runner import benchmark, SEED
+from quaternion import Quaternion
+from quaternion_dict import QuaternionDict
+
+KEYS = 100000
+
+
+def random_rotations(count, rng):
+    return [Quaternion._make(*row) for row in rng.normal(size=(count, 4)).tolist()]
+
+
+@benchmark('quaternion.bucket_key')
+def bench_bucket_key():
+    q, = random_rotations(1, np.random.default_rng(SEED))
+    return lambda: q.bucket_key(1e-3)
+
+
+@benchmark('quaternion_dict.insert_10k')
+def bench_insert():
+    keys = random_rotations(10000, np.random.default_rng(SEED))
+    def insert():
+        qdict = QuaternionDict(1e-3)
+        for q in keys:
+            qdict[q] = None
+    return insert
+
+
+@benchmark('quaternion_dict.lookup_1k_of_100k')
+def bench_lookup():
+    rng = np.random.default_rng(SEED)
+    keys = random_rotations(KEYS, rng)
+    qdict = QuaternionDict(1e-3, ((q, None) for q in keys))
+    #the same rotations after rounding errors and sign flips
+    queries = [-q + Quaternion(1e-9) for q in keys[:1000]]
+    return lambda: [qdict[q] for q in queries]
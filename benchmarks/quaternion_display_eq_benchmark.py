@@ -0,0 +1,20 @@
+'''Benchmarks for quaternion_display_eq.py'''
+
+from __future__ import absolute_import
+
+from benchmarks.runner import benchmark
+from benchmarks.quaternion_benchmark import random_quaternions
+from benchmarks.quaternion_int_benchmark import random_quaternionic_integers
+from quaternion_display_eq import DisplayEquation
+
+
+@benchmark('quaternion_display_eq.render')
+def render():
+    q1, q2 = random_quaternions(2)
+    return lambda: DisplayEquation(q1, q2, '*').equation
+
+
+@benchmark('quaternion_display_eq.render_integral')
+def render_integral():
+    q1, q2 = random_quaternionic_integers(2)
+    return lambda: DisplayEquation(q1, q2, '+').equation
@@ -0,0 +1,76 @@
+'''Benchmarks for quaternionic_integer.py'''
+
+from __future__ import absolute_import
+
+import random
+
+from benchmarks.runner import benchmark, SEED
+from quaternionic_integer import QuaternionicInteger, four_square, factor
+
+
+def random_quaternionic_integers(count, bound=1000, seed=SEED):
+    '''Reproducible quaternionic integers with components in [-bound, bound]'''
+    rng = random.Random(seed)
+    return [QuaternionicInteger(*(rng.randint(-bound, bound) for _ in range(4)))
+            for _ in range(count)]
+
+
+@benchmark('quaternionic_integer.construct')
+def construct():
+    return lambda: QuaternionicInteger(1, -2, 3, -4)
+
+
+@benchmark('quaternionic_integer.add')
+def add():
+    q1, q2 = random_quaternionic_integers(2)
+    return lambda: q1 + q2
+
+
+@benchmark('quaternionic_integer.mul')
+def mul():
+    q1, q2 = random_quaternionic_integers(2)
+    return lambda: q1 * q2
+
+
+@benchmark('quaternionic_integer.mul_int')
+def mul_int():
+    q1, = random_quaternionic_integers(1)
+    return lambda: q1 * 7
+
+
+@benchmark('quaternionic_integer.truediv_int')
+def truediv_int():
+    q1, = random_quaternionic_integers(1)
+    q1 = q1 * 6
+    return lambda: q1 / 3
+
+
+@benchmark('quaternionic_integer.truediv')
+def truediv():
+    q1, q2 = random_quaternionic_integers(2)
+    return lambda: q1 / q2
+
+
+@benchmark('quaternionic_integer.pow_int')
+def pow_int():
+    q1, = random_quaternionic_integers(1)
+    return lambda: q1 ** 3
+
+
+@benchmark('quaternionic_integer.pow_mod')
+def pow_mod():
+    q1, = random_quaternionic_integers(1)
+    return lambda: pow(q1, 2 ** 64 + 1, 1000003)
+
+
+@benchmark('quaternionic_integer.four_square_256bit')
+def four_square_256bit():
+    n = random.Random(SEED).getrandbits(256)
+    return lambda: four_square(n)
+
+
+@benchmark('quaternionic_integer.factor')
+def factor_product():
+    # Norm 2**31 - 1 times a 64-bit prime
+    q = four_square(2 ** 31 - 1) * four_square(18446744073709551557)
+    return lambda: factor(q)
@@ -0,0 +1,44 @@
+'''Benchmarks for quaternion_io.py'''
+
+from __future__ import absolute_import
+
+import os
+import tempfile
+
+from benchmarks.runner import benchmark
+from benchmarks.quaternion_benchmark import random_quaternions
+from quaternion_array import QuaternionArray
+from quaternion_io import QuaternionReader, save, load
+
+ARRAY_SIZE = 100000
+
+
+def _saved(quaternions):
+    '''The path of a temporary file holding the quaternions'''
+    path = os.path.join(tempfile.mkdtemp(), 'benchmark.quat')
+    save(path, quaternions)
+    return path
+
+
+@benchmark('quaternion_io.save_100k')
+def bench_save():
+    qa = QuaternionArray.from_quaternions(random_quaternions(ARRAY_SIZE))
+    path = os.path.join(tempfile.mkdtemp(), 'benchmark.quat')
+    return lambda: save(path, qa)
+
+
+@benchmark('quaternion_io.load_100k')
+def bench_load():
+    path = _saved(QuaternionArray.from_quaternions(random_quaternions(ARRAY_SIZE)))
+    return lambda: load(path).norm()
+
+
+@benchmark('quaternion_io.iterate_100k')
+def bench_iterate():
+    path = _saved(QuaternionArray.from_quaternions(random_quaternions(ARRAY_SIZE)))
+
+    def iterate():
+        with QuaternionReader(path) as reader:
+            for _ in reader:
+                pass
+    return iterate
@@ -0,0 +1,53 @@
+'''Benchmarks for quaternion_linked_list.py'''
+
+from __future__ import absolute_import
+
+from benchmarks.runner import benchmark
+from benchmarks.quaternion_benchmark import random_quaternions
+from quaternion_linked_list import QuaternionList
+
+LIST_SIZE = 500
+
+
+def _bench_add(ordering):
+    quaternions = random_quaternions(LIST_SIZE)
+
+    def run():
+        qlist = QuaternionList(ordering)
+        for q in quaternions:
+            qlist.add(q)
+        return qlist
+    return run
+
+
+def _bench_remove(ordering):
+    quaternions = random_quaternions(LIST_SIZE)
+    qlist = QuaternionList(ordering)
+    middle = quaternions[LIST_SIZE // 2]
+    for q in quaternions:
+        qlist.add(q)
+
+    def run():
+        qlist.remove(middle)
+        qlist.add(middle)
+    return run
+
+
+@benchmark(f'quaternion_linked_list.add_{LIST_SIZE}_alpha')
+def add_alpha():
+    return _bench_add('alpha')
+
+
+@benchmark(f'quaternion_linked_list.add_{LIST_SIZE}_norm')
+def add_norm():
+    return _bench_add('norm')
+
+
+@benchmark('quaternion_linked_list.remove_add_alpha')
+def remove_add_alpha():
+    return _bench_remove('alpha')
+
+
+@benchmark('quaternion_linked_list.remove_add_norm')
+def remove_add_norm():
+    return _bench_remove('norm')
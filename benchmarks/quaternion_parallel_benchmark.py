@@ -0,0 +1,23 @@
+'''Benchmarks for quaternion_parallel.py'''
+
+from __future__ import absolute_import
+
+from benchmarks.runner import benchmark
+from benchmarks.quaternion_benchmark import random_quaternions
+from quaternion import Quaternion
+from quaternion_array import QuaternionArray
+from quaternion_parallel import pmap, preduce
+
+ARRAY_SIZE = 100000
+
+
+@benchmark('quaternion_parallel.preduce_100k')
+def bench_preduce():
+    qa = QuaternionArray.from_quaternions(random_quaternions(ARRAY_SIZE)).unit()
+    return lambda: preduce(qa)
+
+
+@benchmark('quaternion_parallel.pmap_conjugate_100k')
+def bench_pmap():
+    qa = QuaternionArray.from_quaternions(random_quaternions(ARRAY_SIZE))
+    return lambda: pmap(Quaternion.conjugate, qa)
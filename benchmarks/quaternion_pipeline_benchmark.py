@@ -0,0 +1,17 @@
+'''Benchmarks for quaternion_pipeline.py'''
+
+from __future__ import absolute_import
+
+import asyncio
+
+from benchmarks.runner import benchmark
+from benchmarks.quaternion_benchmark import random_quaternions
+from quaternion_pipeline import run_pipeline, parse, normalize, compose
+
+STREAM_SIZE = 10000
+
+
+@benchmark('quaternion_pipeline.parse_normalize_compose_10k')
+def bench_pipeline():
+    lines = [repr(q) for q in random_quaternions(STREAM_SIZE)]
+    return lambda: asyncio.run(run_pipeline(lines, [parse(), normalize(), compose(renormalize=True)]))
@@ -0,0 +1,128 @@
+'''Registry and runner for the benchmark suite.
+
+Benchmarks are registered with the @benchmark decorator in the *_benchmark modules
+of this package.  Each registered function sets up a reproducible workload and
+returns a zero-argument callable, which is the code that gets timed.
+
+Run from the repository root:
+
+    python -m benchmarks -o results.json
+    python -m benchmarks --compare results.json
+'''
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import argparse
+import importlib
+import json
+import pkgutil
+import platform
+import statistics
+import sys
+import timeit
+
+BENCHMARKS = {}
+
+SEED = 20240101
+
+
+def benchmark(name):
+    '''Register a workload setup function under the given name'''
+    def register(setup):
+        if name in BENCHMARKS:
+            raise ValueError(f'Duplicate benchmark name: {name}')
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def load_benchmarks():
+    '''Import every *_benchmark module in this package so their workloads register'''
+    package = sys.modules[__package__]
+    for module in pkgutil.iter_modules(package.__path__):
+        if module.name.endswith('_benchmark'):
+            importlib.import_module(f'{__package__}.{module.name}')
+
+
+def time_workload(func, repeat=5, min_time=0.2):
+    '''Time a zero-argument callable, returning seconds per call'''
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'min': min(times),
+        'median': statistics.median(times),
+        'loops': number,
+        'repeat': repeat,
+    }
+
+
+def run(pattern='', repeat=5, min_time=0.2, stream=None):
+    '''Run every registered benchmark whose name contains pattern'''
+    load_benchmarks()
+    results = {}
+    for name in sorted(BENCHMARKS):
+        if pattern not in name:
+            continue
+        results[name] = time_workload(BENCHMARKS[name](), repeat, min_time)
+        if stream:
+            print(f'{name:<55} {results[name]["min"] * 1e6:12.3f} us', file=stream)
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'seed': SEED,
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.1, stream=sys.stdout):
+    '''Print the ratio of current to baseline timings.
+
+    Returns the names of benchmarks that are slower than the baseline by more than
+    the threshold fraction.
+    '''
+    regressions = []
+    for name, result in sorted(current['results'].items()):
+        if name not in baseline['results']:
+            print(f'{name:<55} {"new":>12}', file=stream)
+            continue
+        ratio = result['min'] / baseline['results'][name]['min']
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<55} {ratio:11.2f}x{flag}', file=stream)
+    return regressions
+
+
+def main(argv=None):
+    '''Command-line entry point'''
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-o', '--output', help='write results as JSON to this file')
+    parser.add_argument('-k', '--filter', default='', help='only run benchmarks containing this text')
+    parser.add_argument('--repeat', type=int, default=5, help='timing repetitions per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='approximate seconds per repetition')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='compare against a JSON file from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown fraction reported as a regression')
+    args = parser.parse_args(argv)
+
+    stream = None if args.compare else sys.stdout
+    results = run(args.filter, args.repeat, args.min_time, stream)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.threshold):
+            return 1
+    return 0
@@ -0,0 +1,145 @@
+'''Benchmarks for utils/quaternion_utils.py and utils/quaternion_matrix_utils.py'''
+
+from __future__ import absolute_import
+
+import numpy as np
+
+from benchmarks.runner import benchmark, SEED
+from benchmarks.quaternion_benchmark import random_quaternions
+from quaternion import Quaternion
+from quaternion_array import QuaternionArray
+from utils.quaternion_utils import exp, ln, geodesic_distance
+from utils.quaternion_utils import exp_array, ln_array, geodesic_distance_matrix
+from utils.quaternion_utils import integrate_angular_velocity, mean, MeanAccumulator
+from utils.quaternion_matrix_utils import complex_matrix, real_matrix, matrix_to_quaternion
+from utils.quaternion_matrix_utils import to_rotation_matrix, from_rotation_matrix, to_euler, from_euler
+
+
+@benchmark('quaternion_utils.exp')
+def bench_exp():
+    q1, = random_quaternions(1)
+    return lambda: exp(q1)
+
+
+@benchmark('quaternion_utils.ln')
+def bench_ln():
+    q1, = random_quaternions(1)
+    return lambda: ln(q1)
+
+
+@benchmark('quaternion_utils.geodesic_distance')
+def bench_geodesic_distance():
+    q1, q2 = random_quaternions(2)
+    return lambda: geodesic_distance(q1, q2)
+
+
+@benchmark('quaternion_utils.exp_array_10000')
+def bench_exp_array():
+    qa = QuaternionArray.from_quaternions(random_quaternions(10000))
+    return lambda: exp_array(qa)
+
+
+@benchmark('quaternion_utils.ln_array_10000')
+def bench_ln_array():
+    qa = QuaternionArray.from_quaternions(random_quaternions(10000))
+    return lambda: ln_array(qa)
+
+
+@benchmark('quaternion_utils.geodesic_distance_matrix_1000x1000')
+def bench_geodesic_distance_matrix():
+    qa = QuaternionArray.from_quaternions(random_quaternions(1000))
+    return lambda: geodesic_distance_matrix(qa)
+
+
+@benchmark('quaternion_matrix_utils.real_matrix')
+def bench_real_matrix():
+    q1, = random_quaternions(1)
+    return lambda: real_matrix(q1)
+
+
+@benchmark('quaternion_matrix_utils.complex_matrix')
+def bench_complex_matrix():
+    q1, = random_quaternions(1)
+    return lambda: complex_matrix(q1)
+
+
+@benchmark('quaternion_matrix_utils.matrix_to_quaternion_real')
+def bench_matrix_to_quaternion_real():
+    matrix = real_matrix(random_quaternions(1)[0])
+    return lambda: matrix_to_quaternion(matrix)
+
+
+@benchmark('quaternion_matrix_utils.matrix_to_quaternion_complex')
+def bench_matrix_to_quaternion_complex():
+    matrix = complex_matrix(random_quaternions(1)[0])
+    return lambda: matrix_to_quaternion(matrix)
+
+
+@benchmark('quaternion_matrix_utils.from_rotation_matrix_10000')
+def bench_from_rotation_matrix():
+    matrices = to_rotation_matrix(QuaternionArray.from_quaternions(random_quaternions(10000)))
+    return lambda: from_rotation_matrix(matrices)
+
+
+@benchmark('quaternion_matrix_utils.to_euler_10000')
+def bench_to_euler():
+    qa = QuaternionArray.from_quaternions(random_quaternions(10000))
+    return lambda: to_euler(qa, 'zyx')
+
+
+@benchmark('quaternion_matrix_utils.from_euler_10000')
+def bench_from_euler():
+    angles = to_euler(QuaternionArray.from_quaternions(random_quaternions(10000)), 'zyx')
+    return lambda: from_euler(angles, 'zyx')
+
+
+def _angular_velocities(count):
+    '''Reproducible gyroscope-like samples in radians per second'''
+    return np.random.default_rng(SEED).normal(scale=2.0, size=(count, 3))
+
+
+@benchmark('quaternion_utils.integrate_angular_velocity_exp_100k')
+def bench_integrate_exp():
+    omega = _angular_velocities(100000)
+    return lambda: integrate_angular_velocity(omega, 1e-3)
+
+
+@benchmark('quaternion_utils.integrate_angular_velocity_rk4_100k')
+def bench_integrate_rk4():
+    omega = _angular_velocities(100000)
+    return lambda: integrate_angular_velocity(omega, 1e-3, method='rk4')
+
+
+@benchmark('quaternion_utils.integrate_angular_velocity_loop_10k')
+def bench_integrate_loop():
+    omega = _angular_velocities(10000).tolist()
+
+    def integrate():
+        q = Quaternion(1.0)
+        for x, y, z in omega:
+            q = q * exp(Quaternion(0.0, x * 5e-4, y * 5e-4, z * 5e-4))
+        return q
+    return integrate
+
+
+@benchmark('quaternion_utils.mean_100000')
+def bench_mean():
+    components = np.random.default_rng(SEED).normal(size=(100000, 4))
+    return lambda: mean(components)
+
+
+@benchmark('quaternion_utils.mean_frames_1000x1000')
+def bench_mean_frames():
+    components = np.random.default_rng(SEED).normal(size=(1000, 1000, 4))
+    return lambda: mean(components)
+
+
+@benchmark('quaternion_utils.mean_accumulator_100x1000')
+def bench_mean_accumulator():
+    chunks = np.random.default_rng(SEED).normal(size=(100, 1000, 4))
+    def accumulate():
+        accumulator = MeanAccumulator()
+        for chunk in chunks:
+            accumulator.update(chunk)
+        return accumulator.mean()
+    return accumulate
@@ -0,0 +1,421 @@
+'''Defines ModularQuaternion and ModularQuaternionArray classes'''
+
+from __future__ import absolute_import, annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import lru_cache
+from numbers import Integral
+from typing import ClassVar, Union
+
+import numpy as np
+from quaternion import Quaternion, hamilton_components
+from quaternionic_integer import QuaternionicInteger
+
+
+@dataclass(frozen=True)
+class ModularQuaternion(Quaternion):
+
+    '''Quaternions whose components are integers modulo a fixed modulus p,
+    i.e. elements of the quaternion algebra over Z/pZ.
+
+    Each modulus has its own subclass, created with ModularQuaternion.modulo(p).
+    Products are computed and reduced in a single step, and only quaternions of
+    the same family, integers and quaternionic integers can be combined.
+
+        >>> Z7 = ModularQuaternion.modulo(7)
+        >>> q = Z7(1, 2, 3, 4)
+        >>> q * q
+        0 + 4i + 6j + 1k (mod 7)
+        >>> q * q.reciprocal()
+        1 + 0i + 0j + 0k (mod 7)
+    '''
+
+    __slots__ = ()
+
+    modulus: ClassVar[int] = 0
+
+    def __post_init__(self):
+        p = self.modulus
+        if not p:
+            raise TypeError('Create a ModularQuaternion family with ModularQuaternion.modulo(p)')
+        object.__setattr__(self, 'scalar', int(self.scalar) % p)
+        object.__setattr__(self, 'i', int(self.i) % p)
+        object.__setattr__(self, 'j', int(self.j) % p)
+        object.__setattr__(self, 'k', int(self.k) % p)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def modulo(p: int) -> type[ModularQuaternion]:
+        '''The ModularQuaternion subclass for modulus p'''
+        if not isinstance(p, Integral) or p < 2:
+            raise ValueError('Modulus must be an integer greater than 1')
+        return type(f'ModularQuaternion{int(p)}', (ModularQuaternion,),
+                    {'__slots__': (), 'modulus': int(p)})
+
+    def __repr__(self):
+
+        return (f'{self.scalar} + {self.i}i + {self.j}j + {self.k}k '
+                f'(mod {self.modulus})')
+
+    def __eq__(self, other: object) -> bool:
+        # Only quaternions of the same family are equal, unlike in arithmetic,
+        # where integers are reduced first: Z7(1) == 8 would need hash(Z7(1))
+        # to equal both hash(1) and hash(8).  Other quaternions and numbers are
+        # answered here, so that Quaternion.__eq__ does not compare components.
+        if isinstance(other, ModularQuaternion):
+            return other.modulus == self.modulus and \
+                (self.scalar, self.i, self.j, self.k) == (other.scalar, other.i, other.j, other.k)
+        if isinstance(other, Quaternion):
+            return False
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.modulus, self.scalar, self.i, self.j, self.k))
+
+    def _components_of(self, other) -> Union[tuple, None]:
+        '''The reduced components of another operand, or None if it cannot be combined'''
+        p = self.modulus
+        if isinstance(other, Integral):
+            return (int(other) % p, 0, 0, 0)
+        if isinstance(other, ModularQuaternion):
+            if other.modulus != p:
+                return None
+            return (other.scalar, other.i, other.j, other.k)
+        if isinstance(other, QuaternionicInteger):
+            return (other.scalar % p, other.i % p, other.j % p, other.k % p)
+        return None
+
+    def _reduce(self, s, i, j, k) -> ModularQuaternion:
+        p = self.modulus
+        return type(self)._make(s % p, i % p, j % p, k % p)
+
+    def __add__(self, other: object) -> ModularQuaternion:
+        b = self._components_of(other)
+        if b is None:
+            return NotImplemented
+        return self._reduce(self.scalar + b[0], self.i + b[1], self.j + b[2], self.k + b[3])
+
+    def __radd__(self, other: object) -> ModularQuaternion:
+        b = self._components_of(other)
+        if b is None:
+            return NotImplemented
+        return self._reduce(b[0] + self.scalar, b[1] + self.i, b[2] + self.j, b[3] + self.k)
+
+    def __neg__(self) -> ModularQuaternion:
+        return self._reduce(-self.scalar, -self.i, -self.j, -self.k)
+
+    def __sub__(self, other: object) -> ModularQuaternion:
+        b = self._components_of(other)
+        if b is None:
+            return NotImplemented
+        return self._reduce(self.scalar - b[0], self.i - b[1], self.j - b[2], self.k - b[3])
+
+    def __rsub__(self, other: object) -> ModularQuaternion:
+        b = self._components_of(other)
+        if b is None:
+            return NotImplemented
+        return self._reduce(b[0] - self.scalar, b[1] - self.i, b[2] - self.j, b[3] - self.k)
+
+    def __mul__(self, other: object) -> ModularQuaternion:
+        b = self._components_of(other)
+        if b is None:
+            return NotImplemented
+        return self._reduce(*hamilton_components((self.scalar, self.i, self.j, self.k), b))
+
+    def __rmul__(self, other: object) -> ModularQuaternion:
+        b = self._components_of(other)
+        if b is None:
+            return NotImplemented
+        return self._reduce(*hamilton_components(b, (self.scalar, self.i, self.j, self.k)))
+
+    def __truediv__(self, other: object) -> ModularQuaternion:
+        b = self._components_of(other)
+        if b is None:
+            return NotImplemented
+        return self * self._reduce(*b).reciprocal()
+
+    def __rtruediv__(self, other: object) -> ModularQuaternion:
+        b = self._components_of(other)
+        if b is None:
+            return NotImplemented
+        return self._reduce(*b) * self.reciprocal()
+
+    def __pow__(self, exponent: object, modulo=None) -> ModularQuaternion:
+        '''Exponentiation by squaring; negative exponents use the reciprocal'''
+        if not isinstance(exponent, Integral) or modulo is not None:
+            return NotImplemented
+        n = int(exponent)
+        base = self if n >= 0 else self.reciprocal()
+        p = self.modulus
+        result = (1 % p, 0, 0, 0)
+        square = (base.scalar, base.i, base.j, base.k)
+        n = abs(n)
+        while n:
+            if n & 1:
+                result = tuple(x % p for x in hamilton_components(result, square))
+            n >>= 1
+            if n:
+                square = tuple(x % p for x in hamilton_components(square, square))
+        return type(self)._make(*result)
+
+    def norm_squared(self) -> int:
+        '''The squared norm reduced modulo p'''
+        return int(self.scalar * self.scalar + self.i * self.i
+                   + self.j * self.j + self.k * self.k) % self.modulus
+
+    def conjugate(self) -> ModularQuaternion:
+        return self._reduce(self.scalar, -self.i, -self.j, -self.k)
+
+    def reciprocal(self) -> ModularQuaternion:
+        '''The multiplicative inverse, the conjugate times the modular inverse of the norm.
+
+        Raises ZeroDivisionError if the norm is not invertible modulo p.
+        '''
+        try:
+            inverse = pow(self.norm_squared(), -1, self.modulus)
+        except ValueError:
+            raise ZeroDivisionError(
+                f'{self!r} is not invertible: its norm has no inverse modulo {self.modulus}'
+            ) from None
+        return self._reduce(self.scalar * inverse, -self.i * inverse,
+                            -self.j * inverse, -self.k * inverse)
+
+    def to_quaternionic_integer(self) -> QuaternionicInteger:
+        '''The representative with components in [0, p) as a QuaternionicInteger'''
+        return QuaternionicInteger._make(self.scalar, self.i, self.j, self.k)
+
+
+# Products of two residues plus the three others in a component must fit in an int64
+MAX_ARRAY_MODULUS = 2 ** 30
+
+
+class ModularQuaternionArray:
+    '''A sequence of quaternions modulo p stored as the rows of an (N, 4) int64 NumPy array.
+
+    Arithmetic is applied elementwise with the same semantics as ModularQuaternion.
+    The other operand may be a ModularQuaternionArray with the same modulus and the
+    same length (or of length 1), a ModularQuaternion of the same family,
+    a quaternionic integer or an integer.  The modulus may be at most
+    MAX_ARRAY_MODULUS, so that fused products never overflow.
+
+        >>> qa = ModularQuaternionArray([[1, 2, 3, 4], [0, 1, 0, 0]], 7)
+        >>> qa * qa
+        ModularQuaternionArray([0 + 4i + 6j + 1k (mod 7),
+                                6 + 0i + 0j + 0k (mod 7)])
+    '''
+
+    __array_ufunc__ = None
+
+    def __init__(self, components=(), modulus: int = 2):
+        if not isinstance(modulus, Integral) or not 2 <= modulus <= MAX_ARRAY_MODULUS:
+            raise ValueError(f'Modulus must be an integer between 2 and {MAX_ARRAY_MODULUS}')
+        arr = np.array(components, dtype=np.int64)
+        if arr.size == 0:
+            arr = arr.reshape(0, 4)
+        if arr.ndim != 2 or arr.shape[1] != 4:
+            raise ValueError(f'{type(self).__name__} components must have shape (N, 4)')
+        self._components: np.ndarray = arr % modulus
+        self._modulus: int = int(modulus)
+
+    @classmethod
+    def _wrap(cls, arr: np.ndarray, modulus: int) -> ModularQuaternionArray:
+        '''Create an instance around an existing reduced (N, 4) int64 array without copying'''
+        obj = cls.__new__(cls)
+        obj._components = arr
+        obj._modulus = modulus
+        return obj
+
+    @classmethod
+    def from_quaternions(cls, quaternions: Iterable, modulus: int) -> ModularQuaternionArray:
+        '''Create an array from an iterable of modular quaternions,
+        quaternionic integers or integers
+        '''
+        rows: list[tuple] = []
+        for q in quaternions:
+            if isinstance(q, Integral):
+                rows.append((int(q), 0, 0, 0))
+            elif isinstance(q, (ModularQuaternion, QuaternionicInteger)):
+                rows.append((q.scalar, q.i, q.j, q.k))
+            else:
+                raise TypeError(f'{cls.__name__}.from_quaternions() items must be '
+                                'modular quaternions, quaternionic integers or integers')
+        return cls(np.array(rows, dtype=np.int64).reshape(-1, 4), modulus)
+
+    def to_quaternions(self) -> list[ModularQuaternion]:
+        '''The array as a list of ModularQuaternion instances'''
+        family = ModularQuaternion.modulo(self._modulus)
+        return [family._make(*row) for row in self._components.tolist()]
+
+    @property
+    def components(self) -> np.ndarray:
+        '''The underlying (N, 4) array of reduced components'''
+        return self._components
+
+    @property
+    def modulus(self) -> int:
+        '''The modulus p'''
+        return self._modulus
+
+    def __len__(self) -> int:
+        return len(self._components)
+
+    def __iter__(self):
+        return iter(self.to_quaternions())
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return ModularQuaternion.modulo(self._modulus)._make(*self._components[index].tolist())
+        return self._wrap(self._components[index].reshape(-1, 4), self._modulus)
+
+    def __repr__(self) -> str:
+        body = (',\n' + ' ' * (len(type(self).__name__) + 2)).join(
+            repr(q) for q in self
+        )
+        return f'{type(self).__name__}([{body}])'
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ModularQuaternionArray):
+            return (self._modulus == other._modulus
+                    and bool(np.array_equal(self._components, other._components)))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def _components_of(self, other) -> Union[np.ndarray, None]:
+        '''The reduced components of another operand as an int64 array,
+        or None if it cannot be combined
+        '''
+        p = self._modulus
+        if isinstance(other, ModularQuaternionArray):
+            if other._modulus != p:
+                return None
+            return other._components
+        if isinstance(other, Integral):
+            return np.array([int(other) % p, 0, 0, 0], dtype=np.int64)
+        if isinstance(other, ModularQuaternion):
+            if other.modulus != p:
+                return None
+            return np.array([other.scalar, other.i, other.j, other.k], dtype=np.int64)
+        if isinstance(other, QuaternionicInteger):
+            return np.array([other.scalar % p, other.i % p, other.j % p, other.k % p],
+                            dtype=np.int64)
+        return None
+
+    def __add__(self, other) -> ModularQuaternionArray:
+        arr = self._components_of(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap((self._components + arr) % self._modulus, self._modulus)
+
+    def __radd__(self, other) -> ModularQuaternionArray:
+        return self.__add__(other)
+
+    def __neg__(self) -> ModularQuaternionArray:
+        return self._wrap(-self._components % self._modulus, self._modulus)
+
+    def __sub__(self, other) -> ModularQuaternionArray:
+        arr = self._components_of(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap((self._components - arr) % self._modulus, self._modulus)
+
+    def __rsub__(self, other) -> ModularQuaternionArray:
+        arr = self._components_of(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap((arr - self._components) % self._modulus, self._modulus)
+
+    def __mul__(self, other) -> ModularQuaternionArray:
+        arr = self._components_of(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap(_hamilton_mod(self._components, arr, self._modulus), self._modulus)
+
+    def __rmul__(self, other) -> ModularQuaternionArray:
+        arr = self._components_of(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap(_hamilton_mod(arr, self._components, self._modulus), self._modulus)
+
+    def __truediv__(self, other) -> ModularQuaternionArray:
+        arr = self._components_of(other)
+        if arr is None:
+            return NotImplemented
+        return self * self._wrap(arr.reshape(-1, 4), self._modulus).reciprocal()
+
+    def __pow__(self, exponent) -> ModularQuaternionArray:
+        '''Elementwise exponentiation by squaring; negative exponents use the reciprocal'''
+        if not isinstance(exponent, Integral):
+            return NotImplemented
+        n = int(exponent)
+        p = self._modulus
+        square = (self if n >= 0 else self.reciprocal())._components
+        result = np.zeros_like(square)
+        result[:, 0] = 1 % p
+        n = abs(n)
+        while n:
+            if n & 1:
+                result = _hamilton_mod(result, square, p)
+            n >>= 1
+            if n:
+                square = _hamilton_mod(square, square, p)
+        return self._wrap(result, p)
+
+    def norm_squared(self) -> np.ndarray:
+        '''The squared norm of each quaternion reduced modulo p'''
+        return np.einsum('ij,ij->i', self._components, self._components) % self._modulus
+
+    def conjugate(self) -> ModularQuaternionArray:
+        return self._wrap(self._components * _CONJUGATE % self._modulus, self._modulus)
+
+    def reciprocal(self) -> ModularQuaternionArray:
+        '''The multiplicative inverse of each quaternion.
+
+        Raises ZeroDivisionError if any norm is not invertible modulo p.
+        '''
+        p = self._modulus
+        inverse = _inverse_mod(self.norm_squared(), p)
+        return self._wrap(self._components * _CONJUGATE % p * inverse[:, np.newaxis] % p, p)
+
+
+_CONJUGATE = np.array([1, -1, -1, -1], dtype=np.int64)
+
+
+def _hamilton_mod(a: np.ndarray, b: np.ndarray, p: int) -> np.ndarray:
+    '''The reduced Hamilton product of two broadcastable (..., 4) arrays of residues.
+
+    Each component is accumulated from residues below p <= MAX_ARRAY_MODULUS,
+    so it stays within int64 and is reduced once.
+    '''
+    a0, a1, a2, a3 = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+    b0, b1, b2, b3 = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+    out = np.empty(np.broadcast_shapes(a.shape, b.shape), dtype=np.int64)
+    out[..., 0] = a0 * b0 - a1 * b1 - a2 * b2 - a3 * b3
+    out[..., 1] = a0 * b1 + a1 * b0 + a2 * b3 - a3 * b2
+    out[..., 2] = a0 * b2 - a1 * b3 + a2 * b0 + a3 * b1
+    out[..., 3] = a0 * b3 + a1 * b2 - a2 * b1 + a3 * b0
+    out %= p
+    return out
+
+
+def _inverse_mod(a: np.ndarray, p: int) -> np.ndarray:
+    '''Elementwise modular inverses by the extended Euclidean algorithm,
+    iterating only over the elements that have not finished
+    '''
+    gcd, inverse = np.empty_like(a), np.empty_like(a)
+    index = np.arange(len(a))
+    r0, r1 = np.full_like(a, p), a.copy()
+    t0, t1 = np.zeros_like(a), np.ones_like(a)
+    while len(index):
+        done = r1 == 0
+        if done.any():
+            gcd[index[done]], inverse[index[done]] = r0[done], t0[done]
+            keep = ~done
+            index, r0, r1, t0, t1 = index[keep], r0[keep], r1[keep], t0[keep], t1[keep]
+        q = r0 // r1
+        r0, r1 = r1, r0 - q * r1
+        t0, t1 = t1, t0 - q * t1
+    if np.any(gcd != 1):
+        raise ZeroDivisionError(f'A norm has no inverse modulo {p}')
+    return inverse % p
@@ -4,16 +4,71 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import annotations
 
-from numbers import Number, Complex, Real
+from numbers import Number, Complex, Integral, Real
 import re
 import math
+import sys
 from collections.abc import Mapping, Iterable
-from typing import Union
+from typing import Union, TypeVar
 from dataclasses import dataclass
 
+_QuaternionT = TypeVar('_QuaternionT', bound='Quaternion')
 
-@dataclass(frozen=True)
-class Quaternion(Number):
+# The least distinguishable distance between rotations, for tolerances in
+# QuaternionDict and quaternion_clustering.deduplicate: cos(MIN_TOLERANCE) is
+# 1 - 4 epsilon, so rounding in the dot product of two unit quaternions cannot
+# separate exact duplicates
+MIN_TOLERANCE = math.sqrt(8 * sys.float_info.epsilon)
+
+_MALFORMED_CHARACTERS = re.compile(r"[^\dijk+-.\s]")
+_TERM = re.compile(r"[+-]?\s*\d*[.]?\d*[ijk]?\w")
+_WHITESPACE = re.compile(r'\s')
+
+
+def parse_components(string: str) -> tuple[float, float, float, float]:
+    '''Parse a string such as '3.6 - 5i + 100k + 4.6j' into its four components.
+
+    Raises ValueError if the string is malformed.
+    '''
+
+    scalar, i, j, k = 0.0, 0.0, 0.0, 0.0
+
+    if _MALFORMED_CHARACTERS.search(string):
+        raise ValueError(f'malformed quaternion string: {string!r}')
+
+    for x in _TERM.findall(string):
+        if x[-1] == 'i':
+            i = float(_WHITESPACE.sub('', x[:-1]))
+        elif x[-1] == 'j':
+            j = float(_WHITESPACE.sub('', x[:-1]))
+        elif x[-1] == 'k':
+            k = float(_WHITESPACE.sub('', x[:-1]))
+        else:
+            scalar = float(x.replace(' ', ''))
+
+    return scalar, i, j, k
+
+
+def hamilton_components(a, b) -> tuple:
+    '''The Hamilton product of two 4-tuples of components, which may be of any
+    numeric type: integers stay exact and fractions stay fractions.
+    '''
+    return (a[0] * b[0] - a[1] * b[1] - a[2] * b[2] - a[3] * b[3],
+            a[0] * b[1] + a[1] * b[0] + a[2] * b[3] - a[3] * b[2],
+            a[0] * b[2] - a[1] * b[3] + a[2] * b[0] + a[3] * b[1],
+            a[0] * b[3] + a[1] * b[2] - a[2] * b[1] + a[3] * b[0])
+
+
+class _Derived:
+    '''Base holding one slot, outside the dataclass fields, for the quantities
+    derived from a quaternion's components: a dict created on first use
+    '''
+
+    __slots__ = ('_derived',)
+
+
+@dataclass(frozen=True, slots=True)
+class Quaternion(_Derived, Number):
     '''A quaternion is a number in a four-dimensional mathematical system.
     It can be described as the sum of a scalar and a three-dimensional vector.
     '''
@@ -24,25 +79,23 @@ class Quaternion(Number):
     k:      float = 0.0
 
     @classmethod
-    def from_string(cls, string: str) -> Quaternion:
+    def _make(cls: type[_QuaternionT], scalar, i, j, k) -> _QuaternionT:
+        '''Fast internal constructor that sets the slots directly,
+        bypassing the generated dataclass __init__
+        '''
+        obj = _new(cls)
+        _set_scalar(obj, scalar)
+        _set_i(obj, i)
+        _set_j(obj, j)
+        _set_k(obj, k)
+        _set_derived(obj, None)
+        return obj
 
-        scalar, i, j, k = 0.0, 0.0, 0.0, 0.0
+    @classmethod
+    def from_string(cls, string: str) -> Quaternion:
 
         try:
-
-            if re.search(r"[^\dijk+-.\s]", string):
-                raise ValueError
-
-            for x in re.findall(r"[+-]?\s*\d*[.]?\d*[ijk]?\w", string):
-                if x[-1] == 'i':
-                    i = float(re.sub(r'\s', '', x[:-1]))
-                elif x[-1] == 'j':
-                    j = float(re.sub(r'\s', '', x[:-1]))
-                elif x[-1] == 'k':
-                    k = float(re.sub(r'\s', '', x[:-1]))
-                else:
-                    scalar = float(x.replace(' ', ''))
-
+            scalar, i, j, k = parse_components(string)
         except ValueError as exc:
             raise ValueError(
                 f'{cls.__name__} arg is a malformed string'
@@ -50,6 +103,24 @@ class Quaternion(Number):
 
         return cls(scalar, i, j, k)
 
+    @classmethod
+    def parse_many(cls, lines: Iterable[str]) -> tuple[list[Quaternion], list[tuple[int, str]]]:
+        '''Parse an iterable of strings, such as an open file, into quaternions.
+
+        Blank lines are skipped.  Malformed lines do not stop parsing; they are
+        returned as (index, line) pairs alongside the parsed quaternions.
+        '''
+        quaternions = []
+        malformed = []
+        for index, line in enumerate(lines):
+            if not line or line.isspace():
+                continue
+            try:
+                quaternions.append(cls(*parse_components(line)))
+            except ValueError:
+                malformed.append((index, line))
+        return quaternions, malformed
+
     def __repr__(self) -> str:
 
         i_sign = '-' if self.i < 0 else '+'
@@ -81,7 +152,7 @@ class Quaternion(Number):
             k = self.k + other.k
         else:
             return NotImplemented
-        return Quaternion(s, i, j, k)
+        return Quaternion._make(s, i, j, k)
 
     def __radd__(self, other: Union[float, Quaternion]) -> Quaternion:
         if isinstance(other, Real):
@@ -96,10 +167,10 @@ class Quaternion(Number):
             k = self.k
         else:
             return NotImplemented
-        return Quaternion(s, i, j, k)
+        return Quaternion._make(s, i, j, k)
 
     def __neg__(self) -> Quaternion:
-        return Quaternion(-self.scalar, -self.i, -self.j, -self.k)
+        return Quaternion._make(-self.scalar, -self.i, -self.j, -self.k)
 
     def __pos__(self) -> Quaternion:
         return self
@@ -128,7 +199,7 @@ class Quaternion(Number):
             k = self.scalar * other.k + self.i * other.j - self.j * other.i + self.k * other.scalar
         else:
             return NotImplemented
-        return Quaternion(s, i, j, k)
+        return Quaternion._make(s, i, j, k)
 
     def __rmul__(self, other: Union[float, Quaternion]) -> Quaternion:
         if isinstance(other, Real):
@@ -143,32 +214,37 @@ class Quaternion(Number):
             k = float(other.real) * self.k + float(other.imag) * self.j
         else:
             return NotImplemented
-        return Quaternion(s, i, j, k)
+        return Quaternion._make(s, i, j, k)
 
     def __truediv__(self, other: Union[complex, Quaternion]) -> Quaternion:
         if isinstance(other, Real):
-            return Quaternion(
+            return Quaternion._make(
                 self.scalar / float(other),
                 self.i / float(other),
                 self.j / float(other),
                 self.k / float(other)
             )
         if isinstance(other, Complex):
-            return self / Quaternion(float(other.real), float(other.imag))
+            return self / Quaternion._make(float(other.real), float(other.imag), 0.0, 0.0)
         if isinstance(other, Quaternion):
             return self * other.reciprocal()
         return NotImplemented
 
     def __rtruediv__(self, other: Union[float, Real, Complex, Quaternion]) -> Quaternion:
         if isinstance(other, Complex):
-            return Quaternion(float(other.real), float(other.imag)) * self.reciprocal()
+            return Quaternion._make(float(other.real), float(other.imag), 0.0, 0.0) * self.reciprocal()
         return NotImplemented
 
-    def __pow__(self, exponent: Union[float, Real, Complex, Quaternion]):
+    def __pow__(self, exponent: Union[float, Real, Complex, Quaternion], modulo=None):
+        if modulo is not None:
+            return NotImplemented
+        if isinstance(exponent, Integral):
+            return _power_by_squaring(self, int(exponent))
         if isinstance(exponent, Real):
+            angle = float(exponent) * self.angle()
             a = self.norm() ** float(exponent)
-            b = math.cos(float(exponent) * self.angle())
-            c = self.unit_vector() * math.sin(float(exponent) * self.angle())
+            b = math.cos(angle)
+            c = self.unit_vector() * math.sin(angle)
             return a * (b + c)
         return NotImplemented
 
@@ -185,27 +261,37 @@ class Quaternion(Number):
 
     def vector(self) -> Quaternion:
         '''The quaternion's vector component'''
-        return Quaternion(0, self.i, self.j, self.k)
+        return Quaternion._make(0, self.i, self.j, self.k)
+
+    def norm_squared(self):
+        '''The square of the quaternion's norm, in the components' own number type'''
+        return self.scalar * self.scalar + self.i * self.i + self.j * self.j + self.k * self.k
 
     def norm(self) -> float:
-        '''The "length" of the quaternion'''
-        return math.sqrt(self.scalar ** 2 + self.i ** 2 + self.j ** 2 + self.k ** 2)
+        '''The "length" of the quaternion, computed on first use'''
+        derived = _derived_values(self)
+        if 'norm' not in derived:
+            derived['norm'] = _sqrt(self.norm_squared())
+        return derived['norm']
 
     def conjugate(self) -> Quaternion:
         '''The conjugate of the quaternion,
         with the same scalar component and the vector numbers negated
         '''
-        return Quaternion(self.scalar, -self.i, -self.j, -self.k)
+        return Quaternion._make(self.scalar, -self.i, -self.j, -self.k)
 
     def reciprocal(self) -> Quaternion:
         '''The multiplicative inverse of the quaternion'''
-        return self.conjugate() / (self.norm() ** 2)
+        return self.conjugate() / self.norm_squared()
 
     def unit(self) -> Quaternion:
-        '''The unit quaternion is the quaternion divided by its norm'''
+        '''The unit quaternion is the quaternion divided by its norm, computed on first use'''
         if self == 0:
             return self
-        return self / self.norm()
+        derived = _derived_values(self)
+        if 'unit' not in derived:
+            derived['unit'] = self / self.norm()
+        return derived['unit']
 
     def angle(self) -> float:
         '''The angle of rotation associated with the quaternion,
@@ -219,6 +305,27 @@ class Quaternion(Number):
         '''
         return self.vector().unit()
 
+    def rotation_matrix(self) -> tuple[tuple[float, float, float], ...]:
+        '''The 3 x 3 matrix, as a tuple of rows, of the rotation v -> q * v * q.reciprocal(),
+        computed on first use.  The quaternion need not be a unit quaternion.
+        '''
+        derived = _derived_values(self)
+        if 'rotation_matrix' not in derived:
+            derived['rotation_matrix'] = _rotation_matrix(float(self.scalar), float(self.i),
+                                                          float(self.j), float(self.k))
+        return derived['rotation_matrix']
+
+    def axis_angle(self) -> tuple[tuple[float, float, float], float]:
+        '''The rotation represented by the quaternion as (unit axis, angle in radians),
+        with the angle in [0, 2 pi], computed on first use.  The axis of a
+        rotation by 0 is (1.0, 0.0, 0.0).
+        '''
+        derived = _derived_values(self)
+        if 'axis_angle' not in derived:
+            derived['axis_angle'] = _axis_angle(float(self.scalar), float(self.i),
+                                                float(self.j), float(self.k))
+        return derived['axis_angle']
+
     def complex_pair(self) -> tuple[complex, complex]:
         '''The quaternion as a 2-tuple of complex numbers'''
         return (complex(self.scalar, self.i), complex(self.j, self.k))
@@ -235,6 +342,30 @@ class Quaternion(Number):
     def __bool__(self) -> bool:
         return self != 0
 
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        '''Apply NumPy ufuncs to quaternions as object scalars rather than converting
+        them with __array__, so that arrays and NumPy scalars combine with a
+        quaternion elementwise through the quaternion operators:
+        numpy.array([1.0, 2.0]) * q is an object array of quaternions.
+        '''
+        import numpy  # pylint: disable=import-outside-toplevel
+        boxed = []
+        for x in inputs:
+            # numbers, including NumPy scalars, are registered as quaternions too
+            if isinstance(x, Quaternion) and not isinstance(x, Complex):
+                box = numpy.empty((), dtype=object)
+                box[()] = x
+                x = box
+            boxed.append(x)
+        return getattr(ufunc, method)(*boxed, **kwargs)
+
+    def __array__(self, dtype=None, copy=None):
+        '''The components as a NumPy array of shape (4,), for np.asarray(q)'''
+        if copy is False:
+            raise ValueError('A quaternion cannot be converted to an array without copying')
+        import numpy  # pylint: disable=import-outside-toplevel
+        return numpy.array(self.to_list(), dtype=dtype)
+
     def __eq__(self, other: object) -> bool:
         if isinstance(other, Real):
             if self.scalar == other \
@@ -274,6 +405,32 @@ class Quaternion(Number):
             return hash(complex(self.scalar, self.i))
         return hash((self.scalar, self.i, self.j, self.k))
 
+    def canonical_components(self) -> tuple[float, float, float, float]:
+        '''The components of the unit quaternion representing the same rotation,
+        q / |q| or -q / |q|, whichever has a positive first non-zero component
+        '''
+        w, x, y, z = float(self.scalar), float(self.i), float(self.j), float(self.k)
+        norm = math.hypot(w, x, y, z)
+        if not norm:
+            raise ZeroDivisionError('A zero quaternion does not represent a rotation')
+        if (w or x or y or z) < 0:
+            norm = -norm
+        return (w / norm, x / norm, y / norm, z / norm)
+
+    def bucket_key(self, resolution: float) -> tuple[int, int, int, int]:
+        '''A key for grouping nearby rotations: the cell, in a grid of spacing
+        resolution over the four components, holding canonical_components().
+        q, -q and every positive multiple of q, which all represent the same
+        rotation, share a key.  Close rotations usually share a key too, but can
+        fall either side of a cell boundary; QuaternionDict also probes the
+        neighbouring cells for that reason.
+        '''
+        if not resolution > 0:
+            raise ValueError('Resolution must be positive')
+        w, x, y, z = self.canonical_components()
+        return (math.floor(w / resolution), math.floor(x / resolution),
+                math.floor(y / resolution), math.floor(z / resolution))
+
     @classmethod
     def from_iterable(cls, it) -> Quaternion:
         '''Create a quaternion instance from an iterable'''
@@ -283,4 +440,68 @@ class Quaternion(Number):
             return cls(*it)
         raise TypeError(f'{cls.__name__}.from_iterable() argument must be an iterable')
 
+def _power_by_squaring(q: Quaternion, n: int) -> Quaternion:
+    '''q ** n for an integer n by repeated squaring, using q's own multiplication,
+    so integral and rational quaternions stay exact.  Negative powers are powers
+    of the reciprocal.
+    '''
+    if n < 0:
+        q, n = q.reciprocal(), -n
+    result: Union[Quaternion, None] = None
+    while n:
+        if n & 1:
+            result = q if result is None else result * q
+        n >>= 1
+        if n:
+            q = q * q
+    if result is None:
+        return type(q)(1.0)
+    return result
+
+def _sqrt(n) -> float:
+    '''The square root of a non-negative number as a float.  Large integers are scaled
+    down first, as converting them to a float overflows above 2**1024.
+    '''
+    if isinstance(n, int) and n.bit_length() > 1000:
+        shift = (n.bit_length() - 2 * 53) // 2
+        return math.ldexp(math.sqrt(n >> (2 * shift)), shift)
+    return math.sqrt(n)
+
+_new = object.__new__
+_set_scalar = Quaternion.__dict__['scalar'].__set__
+_set_i = Quaternion.__dict__['i'].__set__
+_set_j = Quaternion.__dict__['j'].__set__
+_set_k = Quaternion.__dict__['k'].__set__
+_set_derived = _Derived.__dict__['_derived'].__set__
+
+def _derived_values(q: Quaternion) -> dict:
+    '''The dict of quantities derived from q, created on first use.  Being a slot
+    of the base class rather than a field, it is left out of comparison, repr,
+    dataclasses.fields and pickling, and is written through the slot descriptor
+    because the dataclass is frozen.
+    '''
+    # _make sets the slot to None; instances from __init__ or unpickling leave it unset
+    derived = getattr(q, '_derived', None)
+    if derived is None:
+        derived = {}
+        _set_derived(q, derived)
+    return derived
+
+def _rotation_matrix(w: float, x: float, y: float, z: float) -> tuple[tuple[float, float, float], ...]:
+    norm_squared = w * w + x * x + y * y + z * z
+    if not norm_squared:
+        raise ZeroDivisionError('Cannot rotate by a zero quaternion')
+    s = 2.0 / norm_squared
+    return ((1.0 - s * (y * y + z * z), s * (x * y - w * z), s * (x * z + w * y)),
+            (s * (x * y + w * z), 1.0 - s * (x * x + z * z), s * (y * z - w * x)),
+            (s * (x * z - w * y), s * (y * z + w * x), 1.0 - s * (x * x + y * y)))
+
+def _axis_angle(w: float, x: float, y: float, z: float) -> tuple[tuple[float, float, float], float]:
+    sine = math.sqrt(x * x + y * y + z * z)
+    if not sine:
+        if not w:
+            raise ZeroDivisionError('A zero quaternion does not represent a rotation')
+        return ((1.0, 0.0, 0.0), 0.0 if w > 0 else 2.0 * math.pi)
+    return ((x / sine, y / sine, z / sine), 2.0 * math.atan2(sine, w))
+
 Quaternion.register(Complex)  # type: ignore[type-abstract]
@@ -0,0 +1,431 @@
+'''Defines QuaternionArray class'''
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import annotations
+
+import math
+from array import array
+from itertools import chain
+from numbers import Complex, Real
+from operator import attrgetter
+from collections.abc import Iterable, Sized
+from typing import Union
+
+import numpy as np
+from quaternion import Quaternion, parse_components
+
+
+def hamilton_product(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    '''The Hamilton product of two broadcastable (..., 4) component arrays'''
+    a0, a1, a2, a3 = a[..., 0], a[..., 1], a[..., 2], a[..., 3]
+    b0, b1, b2, b3 = b[..., 0], b[..., 1], b[..., 2], b[..., 3]
+    out = np.empty(np.broadcast_shapes(a.shape, b.shape), dtype=np.float64)
+    out[..., 0] = a0 * b0 - a1 * b1 - a2 * b2 - a3 * b3
+    out[..., 1] = a0 * b1 + a1 * b0 + a2 * b3 - a3 * b2
+    out[..., 2] = a0 * b2 - a1 * b3 + a2 * b0 + a3 * b1
+    out[..., 3] = a0 * b3 + a1 * b2 - a2 * b1 + a3 * b0
+    return out
+
+
+def cumulative_product(a: np.ndarray) -> np.ndarray:
+    '''The running Hamilton products a[0], a[0] * a[1], ... along the first axis
+    of an (N, ..., 4) component array.
+
+    Short arrays are scanned in log2(N) vectorized rounds (Hillis and Steele's
+    scan).  Longer ones are split into about sqrt(N) blocks that are scanned
+    side by side, one position at a time, before each block is multiplied by
+    the product of the blocks before it, which does O(N) work in O(sqrt(N))
+    vectorized steps.  Both need only associativity, so the factors keep
+    their order.
+    '''
+    products = np.array(a, dtype=np.float64)
+    n = len(products)
+
+    if n <= _BLOCKED_SCAN_THRESHOLD:
+        offset = 1
+        while offset < n:
+            products[offset:] = hamilton_product(products[:-offset], products[offset:])
+            offset *= 2
+        return products
+
+    width = math.isqrt(n - 1) + 1
+    rows = -(-n // width)
+    padded = np.zeros((rows * width,) + products.shape[1:], dtype=np.float64)
+    padded[..., 0] = 1.0
+    padded[:n] = products
+    blocks = padded.reshape((rows, width) + products.shape[1:])
+    for position in range(1, width):
+        blocks[:, position] = hamilton_product(blocks[:, position - 1], blocks[:, position])
+    totals = cumulative_product(blocks[:, -1])
+    blocks[1:] = hamilton_product(totals[:-1, np.newaxis], blocks[1:])
+    return padded[:n]
+
+
+def unit_components(a: np.ndarray) -> np.ndarray:
+    '''Divide each quaternion of a (..., 4) component array by its norm, leaving
+    zero quaternions unchanged'''
+    norms = np.sqrt(np.einsum('...i,...i->...', a, a))[..., np.newaxis]
+    return a / np.where(norms == 0, 1.0, norms)
+
+
+def principal_eigenvector(matrix: np.ndarray) -> np.ndarray:
+    '''The unit eigenvector, with a non-negative first component, for the largest
+    eigenvalue of each symmetric (..., 4, 4) matrix'''
+    # eigh sorts eigenvalues in ascending order
+    vector = np.linalg.eigh(matrix)[1][..., -1]
+    return np.where(vector[..., :1] < 0, -vector, vector)
+
+
+def pairwise_angles(a: np.ndarray, b: np.ndarray, rotations: bool = False) -> np.ndarray:
+    '''The angles between every row u of the (N, 4) unit components a and every
+    row v of the (M, 4) unit components b, as an (N, M) array, equal to
+    2 atan2(|u - v|, |u + v|).  With rotations, v is replaced by the nearer of v
+    and -v, which represent the same rotation, so the angles are at most pi / 2.
+
+    The cosines come from a single matrix product of all pairs, but arccos loses
+    digits near 1 and -1, so close and opposite pairs are recomputed from their
+    components as 2 arcsin(|u - v| / 2), and equal rows are exactly 0 apart.
+    '''
+    cosines = a @ b.T
+    if rotations:
+        np.abs(cosines, out=cosines)
+    np.clip(cosines, -1.0, 1.0, out=cosines)
+    rows, columns = np.nonzero(cosines > _ARCCOS_LIMIT)
+    opposite = np.nonzero(cosines < -_ARCCOS_LIMIT)
+    angles = np.arccos(cosines, out=cosines)
+    if len(rows):
+        near = b[columns]
+        if rotations:
+            near *= np.where(np.einsum('ij,ij->i', a[rows], near) < 0, -1.0, 1.0)[:, np.newaxis]
+        angles[rows, columns] = 2 * np.arcsin(np.linalg.norm(a[rows] - near, axis=-1) / 2)
+    rows, columns = opposite
+    if len(rows):
+        angles[rows, columns] = np.pi - 2 * np.arcsin(np.linalg.norm(a[rows] + b[columns], axis=-1) / 2)
+    return angles
+
+
+class QuaternionArray:
+    '''A sequence of quaternions stored as the rows of an (N, 4) float64 NumPy array.
+
+    Arithmetic is applied elementwise with the same semantics as Quaternion.
+    The other operand may be a QuaternionArray of the same length (or of length 1),
+    a Quaternion, or a real or complex number.
+
+        >>> qa = QuaternionArray.from_quaternions([Quaternion(1, 2, 3, 4), Quaternion(0, 1, 0, 0)])
+        >>> qa * Quaternion(0, 0, 1, 0)
+        QuaternionArray([-3.0000 - 4.0000i + 1.0000j + 2.0000k,
+                         0.0000 + 0.0000i + 0.0000j + 1.0000k])
+    '''
+
+    __array_ufunc__ = None
+
+    def __init__(self, components=()):
+        arr = np.array(components, dtype=np.float64)
+        if arr.size == 0:
+            arr = arr.reshape(0, 4)
+        if arr.ndim != 2 or arr.shape[1] != 4:
+            raise ValueError(f'{type(self).__name__} components must have shape (N, 4)')
+        self._components = arr
+
+    @classmethod
+    def _wrap(cls, arr: np.ndarray) -> QuaternionArray:
+        '''Create an instance around an existing (N, 4) float64 array without copying'''
+        obj = cls.__new__(cls)
+        obj._components = arr
+        return obj
+
+    @classmethod
+    def from_quaternions(cls, quaternions: Iterable) -> QuaternionArray:
+        '''Create a quaternion array from an iterable of quaternions or numbers'''
+        try:
+            return cls._wrap(to_numpy(quaternions))
+        except TypeError:
+            raise TypeError(f'{cls.__name__}.from_quaternions() items must be quaternions or numbers') from None
+
+    @classmethod
+    def from_strings(cls, lines: Iterable[str]) -> tuple[QuaternionArray, list[tuple[int, str]]]:
+        '''Parse an iterable of strings, such as an open file, into a quaternion array.
+
+        Components are streamed into a flat buffer without creating Quaternion instances.
+        Blank lines are skipped.  Malformed lines do not stop parsing; they are
+        returned as (index, line) pairs alongside the array.
+        '''
+        buffer = array('d')
+        malformed = []
+        for index, line in enumerate(lines):
+            if not line or line.isspace():
+                continue
+            try:
+                buffer.extend(parse_components(line))
+            except ValueError:
+                malformed.append((index, line))
+        return cls._wrap(np.frombuffer(buffer, dtype=np.float64).reshape(-1, 4)), malformed
+
+    def to_quaternions(self) -> list[Quaternion]:
+        '''The array as a list of Quaternion instances'''
+        return _quaternions(self._components)
+
+    @property
+    def components(self) -> np.ndarray:
+        '''The underlying (N, 4) array of components, shared rather than copied.
+        NumPy reads them in place through __array__ on every supported Python.
+        __buffer__ needs Python 3.12, so before that memoryview(qa.components) is
+        how buffer protocol consumers such as struct read them without copying.
+        '''
+        return self._components
+
+    @property
+    def scalar(self) -> np.ndarray:
+        '''The scalar components'''
+        return self._components[:, 0]
+
+    @property
+    def i(self) -> np.ndarray:
+        '''The i components'''
+        return self._components[:, 1]
+
+    @property
+    def j(self) -> np.ndarray:
+        '''The j components'''
+        return self._components[:, 2]
+
+    @property
+    def k(self) -> np.ndarray:
+        '''The k components'''
+        return self._components[:, 3]
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        '''The (N, 4) components, without copying unless a copy or another dtype is requested'''
+        if copy:
+            return self._components.astype(self._components.dtype if dtype is None else dtype)
+        if dtype is None or np.dtype(dtype) == self._components.dtype:
+            return self._components
+        if copy is False:
+            raise ValueError(f'{type(self).__name__} cannot be converted to {dtype} without copying')
+        return self._components.astype(dtype)
+
+    def __buffer__(self, flags: int) -> memoryview:
+        '''Expose the components through the buffer protocol (Python 3.12 and later)
+        as a C-contiguous (N, 4) float64 buffer, copied only if the array is a
+        non-contiguous slice
+        '''
+        view = memoryview(np.ascontiguousarray(self._components))  # type: ignore[arg-type]
+        if flags & _PYBUF_WRITABLE and view.readonly:
+            raise BufferError(f'{type(self).__name__} components are read-only')
+        return view
+
+    def __len__(self) -> int:
+        return len(self._components)
+
+    def __iter__(self):
+        return iter(self.to_quaternions())
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Quaternion(*self._components[index].tolist())
+        return self._wrap(self._components[index].reshape(-1, 4))
+
+    def __repr__(self) -> str:
+        body = (',\n' + ' ' * (len(type(self).__name__) + 2)).join(
+            repr(q) for q in self
+        )
+        return f'{type(self).__name__}([{body}])'
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, QuaternionArray):
+            return bool(np.array_equal(self._components, other._components))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __add__(self, other) -> QuaternionArray:
+        arr = _to_components(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap(self._components + arr)
+
+    def __radd__(self, other) -> QuaternionArray:
+        arr = _to_components(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap(arr + self._components)
+
+    def __neg__(self) -> QuaternionArray:
+        return self._wrap(-self._components)
+
+    def __pos__(self) -> QuaternionArray:
+        return self
+
+    def __sub__(self, other) -> QuaternionArray:
+        arr = _to_components(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap(self._components - arr)
+
+    def __rsub__(self, other) -> QuaternionArray:
+        arr = _to_components(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap(arr - self._components)
+
+    def __mul__(self, other) -> QuaternionArray:
+        if isinstance(other, Real):
+            return self._wrap(self._components * float(other))
+        arr = _to_components(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap(hamilton_product(self._components, arr))
+
+    def __rmul__(self, other) -> QuaternionArray:
+        if isinstance(other, Real):
+            return self._wrap(float(other) * self._components)
+        arr = _to_components(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap(hamilton_product(arr, self._components))
+
+    def __truediv__(self, other) -> QuaternionArray:
+        if isinstance(other, Real):
+            return self._wrap(self._components / float(other))
+        arr = _to_components(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap(hamilton_product(self._components, _reciprocal(arr)))
+
+    def __rtruediv__(self, other) -> QuaternionArray:
+        arr = _to_components(other)
+        if arr is None:
+            return NotImplemented
+        return self._wrap(hamilton_product(arr, _reciprocal(self._components)))
+
+    def __abs__(self) -> np.ndarray:
+        return self.norm()
+
+    def vector(self) -> QuaternionArray:
+        '''The quaternions' vector components'''
+        out = self._components.copy()
+        out[:, 0] = 0.0
+        return self._wrap(out)
+
+    def norm_squared(self) -> np.ndarray:
+        '''The squared norm of each quaternion'''
+        return np.einsum('ij,ij->i', self._components, self._components)
+
+    def norm(self) -> np.ndarray:
+        '''The "length" of each quaternion'''
+        return np.sqrt(self.norm_squared())
+
+    def conjugate(self) -> QuaternionArray:
+        '''The conjugate of each quaternion'''
+        return self._wrap(self._components * CONJUGATE)
+
+    def reciprocal(self) -> QuaternionArray:
+        '''The multiplicative inverse of each quaternion'''
+        return self._wrap(_reciprocal(self._components))
+
+    def unit(self) -> QuaternionArray:
+        '''Each quaternion divided by its norm.  Zero quaternions are left unchanged.'''
+        return self._wrap(unit_components(self._components))
+
+
+# The signs that conjugate a (..., 4) component array when multiplied into it,
+# read-only as it is shared
+CONJUGATE = np.array([1.0, -1.0, -1.0, -1.0])
+CONJUGATE.flags.writeable = False
+
+# Length above which cumulative_product scans in blocks
+_BLOCKED_SCAN_THRESHOLD = 16384
+
+# Cosine above which pairwise_angles recomputes a pair from its components,
+# an angle of about 1e-3
+_ARCCOS_LIMIT = 1 - 5e-7
+
+# inspect.BufferFlags.WRITABLE, which only exists from Python 3.12
+_PYBUF_WRITABLE = 0x1
+
+_COMPONENTS = attrgetter('scalar', 'i', 'j', 'k')
+
+
+def to_numpy(quaternions: Iterable, dtype=np.float64) -> np.ndarray:
+    '''The components of a sequence of quaternions or numbers as an (N, 4) NumPy array.
+
+    The components are streamed into a single preallocated buffer, without
+    building a list per quaternion.
+
+        >>> to_numpy([Quaternion(1, 2, 3, 4), 5, 6j])
+        array([[1., 2., 3., 4.],
+               [5., 0., 0., 0.],
+               [0., 6., 0., 0.]])
+    '''
+    if isinstance(quaternions, QuaternionArray):
+        return quaternions.components.astype(dtype)
+    if not isinstance(quaternions, Sized):
+        quaternions = list(quaternions)
+    count = 4 * len(quaternions)
+    try:
+        flat = np.fromiter(chain.from_iterable(map(_COMPONENTS, quaternions)), dtype, count)
+    except AttributeError:
+        # Not every item is a Quaternion instance, so convert them one by one
+        flat = np.fromiter(chain.from_iterable(map(_component_tuple, quaternions)), dtype, count)
+    return flat.reshape(-1, 4)
+
+
+def from_numpy(arr) -> Union[Quaternion, list[Quaternion]]:
+    '''The quaternions whose components are the rows of an (N, 4) array, as a list,
+    or a single Quaternion from a (4,) array; the inverse of to_numpy
+    '''
+    arr = np.asarray(arr)
+    if arr.shape == (4,):
+        return Quaternion._make(*arr.tolist())
+    if arr.ndim != 2 or arr.shape[1] != 4:
+        raise ValueError('Quaternion components must have shape (N, 4) or (4,)')
+    return _quaternions(arr)
+
+
+def _quaternions(arr: np.ndarray) -> list[Quaternion]:
+    '''The rows of an (N, 4) array as Quaternion instances'''
+    return list(map(Quaternion._make, *arr.T.tolist()))
+
+
+def as_components(value) -> np.ndarray:
+    '''The components of a quaternion or number as a (4,) array,
+    or of a QuaternionArray as its (N, 4) array
+    '''
+    arr = _to_components(value)
+    if arr is None:
+        raise TypeError('Argument must be quaternion, quaternion subclass or QuaternionArray')
+    return arr
+
+
+def _reciprocal(arr: np.ndarray) -> np.ndarray:
+    '''The multiplicative inverses of a (..., 4) component array'''
+    return arr * CONJUGATE / np.sum(arr * arr, axis=-1, keepdims=True)
+
+
+def _component_tuple(value) -> tuple:
+    '''The components of a quaternion or number as a tuple'''
+    if isinstance(value, Complex):
+        return (value.real, value.imag, 0.0, 0.0)
+    if isinstance(value, Quaternion):
+        return (value.scalar, value.i, value.j, value.k)
+    raise TypeError('Items must be quaternions or numbers')
+
+
+def _to_components(value) -> Union[np.ndarray, None]:
+    '''The components of a quaternion, number or quaternion array as a NumPy array,
+    or None if the value cannot be interpreted as a quaternion
+    '''
+    if isinstance(value, QuaternionArray):
+        return value.components
+    if isinstance(value, Real):
+        return np.array([float(value), 0.0, 0.0, 0.0])
+    if isinstance(value, Complex):
+        return np.array([float(value.real), float(value.imag), 0.0, 0.0])
+    if isinstance(value, Quaternion):
+        return np.array([value.scalar, value.i, value.j, value.k], dtype=np.float64)
+    return None
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
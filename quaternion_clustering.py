@@ -0,0 +1,283 @@
+'''Defines clustering and deduplication of rotations given as quaternions.
+
+A rotation is represented by both q and -q, so all functions here identify the
+two: the distance between two rotations is the geodesic distance on the unit
+sphere from one quaternion to the nearer of the other and its negative,
+arccos(|u . v|) for unit quaternions u and v, which is at most pi / 2.  It is
+measured like quaternion_utils.geodesic_distance, as half the angle of the
+rotation taking one orientation to the other.  Quaternions may be given as a
+QuaternionArray, an (N, 4) array of components or an iterable of quaternions,
+and are normalized first.
+
+    >>> qs = [Quaternion(1, 0, 0, 0), Quaternion(-1, 0, 0, 0.001), Quaternion(0, 1, 0, 0)]
+    >>> kept, labels = deduplicate(qs, tolerance=0.01)
+    >>> kept.tolist(), labels.tolist()
+    ([0, 2], [0, 0, 1])
+    >>> centers, labels = kmeans(qs, 2, seed=1)
+    >>> labels.tolist()
+    [0, 0, 1]
+'''
+
+from __future__ import absolute_import, annotations
+
+import math
+from collections.abc import Iterable
+from typing import Union
+
+import numpy as np
+from quaternion import MIN_TOLERANCE, Quaternion
+from quaternion_array import QuaternionArray, pairwise_angles, principal_eigenvector, to_numpy
+from quaternion_array import unit_components
+
+
+def distance_matrix(a, b=None) -> np.ndarray:
+    '''The distances between every rotation in a and every rotation in b, or in a
+    again when b is omitted, as an (N, M) array
+    '''
+    ua = _units(a)
+    ub = ua if b is None else _units(b)
+    return pairwise_angles(ua, ub, rotations=True)
+
+
+def kmeans(quaternions, k: int, max_iterations: int = 100,
+           seed: Union[int, None] = None) -> tuple[QuaternionArray, np.ndarray]:
+    '''Partition rotations into k clusters by Lloyd's algorithm on the sphere.
+
+    Each rotation is assigned to the nearest center, and each center is then
+    moved to the Markley mean of its cluster, the principal eigenvector of
+    sum u u^T, which is unchanged by the sign of each u.  The matrices of all
+    clusters are accumulated together in one pass, so an iteration costs O(N k).
+    Initial centers are chosen by k-means++ from a generator seeded with seed,
+    and a center left without rotations is moved to the rotation farthest from
+    its own center.  Returns the k centers, with non-negative scalar parts, and
+    an array of N labels, the index of the center of each rotation.
+    '''
+    units = _units(quaternions)
+    rng = np.random.default_rng(seed)
+    _check_k(k, len(units))
+    centers = units[_initial_centers(units, k, rng)]
+    labels, similarity = _assign(units, centers)
+    for _ in range(max_iterations):
+        centers = _cluster_means(units, labels, similarity, k)
+        new_labels, similarity = _assign(units, centers)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    return QuaternionArray(centers), labels
+
+
+def kmedoids(quaternions, k: int, max_iterations: int = 100,
+             seed: Union[int, None] = None) -> tuple[np.ndarray, np.ndarray]:
+    '''Partition rotations into k clusters around k of the rotations themselves.
+
+    The rotations are assigned to the nearest medoid, and each medoid is then
+    replaced by the member of its cluster with the least total distance to the
+    others, until the medoids no longer change.  Unlike kmeans, this minimizes
+    the geodesic distance itself rather than a chordal one, and is less swayed
+    by outliers, but an iteration costs O(sum n^2) over the cluster sizes n, so
+    for very large sets kmeans is the better choice.  Initial medoids are chosen
+    by k-means++.  Returns the indices of the k medoids and an array of N
+    labels, the position in the indices of the medoid of each rotation.
+    '''
+    units = _units(quaternions)
+    rng = np.random.default_rng(seed)
+    _check_k(k, len(units))
+    medoids = _initial_centers(units, k, rng)
+    labels = _assign(units, units[medoids])[0]
+    for _ in range(max_iterations):
+        new_medoids = medoids.copy()
+        order = np.argsort(labels, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=k))])
+        for cluster in range(k):
+            members = order[bounds[cluster]:bounds[cluster + 1]]
+            if len(members):
+                new_medoids[cluster] = members[np.argmin(_total_distances(units[members]))]
+        if np.array_equal(new_medoids, medoids):
+            break
+        medoids = new_medoids
+        labels = _assign(units, units[medoids])[0]
+    return medoids, labels
+
+
+def deduplicate(quaternions, tolerance: float) -> tuple[np.ndarray, np.ndarray]:
+    '''Reduce rotations to representatives at least tolerance apart.
+
+    The rotations are taken in order, and each becomes a representative unless
+    an earlier representative lies within tolerance, in which case it is
+    labelled with the nearest such one.  So every rotation is within tolerance
+    of its representative, no two representatives are within tolerance of each
+    other, and earlier rotations take precedence: sort candidates by score
+    first to keep the best ones.  As in QuaternionDict, tolerances below
+    MIN_TOLERANCE, where rounding decides whether rotations match, act as it.
+
+    Representatives are indexed by a grid over the unit quaternions with cells
+    twice the chord length of the tolerance, so each rotation is compared only
+    with the representatives in the 16 cells it may reach, and the cost grows
+    linearly with the number of rotations.  Returns the indices of the
+    representatives, in order, and an array of N labels, the position in the
+    indices of the representative of each rotation.
+    '''
+    if tolerance < 0:
+        raise ValueError('Tolerance must not be negative')
+    units = _units(quaternions)
+    count = len(units)
+    if not count or tolerance >= math.pi / 2:
+        return np.zeros(min(count, 1), dtype=np.int64), np.zeros(count, dtype=np.int64)
+
+    tolerance = max(tolerance, MIN_TOLERANCE)
+    chord = 2 * math.sin(tolerance / 2)
+    threshold = math.cos(tolerance)
+    units = np.where(units[:, :1] < 0, -units, units)
+    grid = _Grid(max(2 * chord, _Grid.MIN_CELL))
+    probes = grid.probes(units).tolist()
+    cells = grid.cells(units).tolist()
+    # A representative near the equator u0 = 0 can also be near the negatives
+    # of rotations on the other side, so it is indexed under its negative too
+    flipped = np.where(units[:, 0] <= chord, grid.cells(-units), -1).tolist()
+    rows = units.tolist()
+
+    index: dict = {}
+    kept: list = []
+    labels = np.empty(count, dtype=np.int64)
+    for n, row in enumerate(rows):
+        w, x, y, z = row
+        best, best_dot = -1, threshold
+        for key in probes[n]:
+            for label in index.get(key, ()):
+                a, b, c, d = rows[kept[label]]
+                dot = abs(w * a + x * b + y * c + z * d)
+                if dot >= best_dot:
+                    best, best_dot = label, dot
+        if best < 0:
+            best = len(kept)
+            kept.append(n)
+            index.setdefault(cells[n], []).append(best)
+            if flipped[n] >= 0:
+                index.setdefault(flipped[n], []).append(best)
+        labels[n] = best
+    return np.array(kept, dtype=np.int64), labels
+
+
+class _Grid:
+    '''A grid of cubic cells over the four-dimensional box holding the unit
+    quaternions, each cell identified by a single integer
+    '''
+
+    # Cells small enough that the identifiers would overflow int64 are enlarged
+    MIN_CELL = 1e-4
+
+    # The 16 corners of the unit four-cube
+    _CORNERS = np.array([[(m >> axis) & 1 for axis in range(4)] for m in range(16)], dtype=np.int64)
+
+    def __init__(self, size: float):
+        self.size = size
+        self._offset = math.ceil(1 / size) + 1
+        base = 2 * self._offset + 1
+        self._strides = np.array([base ** 3, base ** 2, base, 1], dtype=np.int64)
+
+    def cells(self, units: np.ndarray) -> np.ndarray:
+        '''The identifiers of the cells holding (N, 4) points'''
+        return (np.floor(units / self.size).astype(np.int64) + self._offset) @ self._strides
+
+    def probes(self, units: np.ndarray) -> np.ndarray:
+        '''The identifiers of the 16 cells holding every point within half a cell
+        of each of (N, 4) points: its own and, along each axis, the neighbour on
+        the side of the nearer face
+        '''
+        scaled = units / self.size
+        steps = np.where(scaled - np.floor(scaled) < 0.5, -self._strides, self._strides)
+        return self.cells(units)[:, np.newaxis] + steps @ self._CORNERS.T
+
+
+def _units(quaternions) -> np.ndarray:
+    '''The normalized (N, 4) float64 components of a QuaternionArray, array or
+    iterable of quaternions
+    '''
+    if isinstance(quaternions, QuaternionArray):
+        arr = quaternions.components
+    elif isinstance(quaternions, np.ndarray):
+        arr = quaternions.astype(np.float64, copy=False)
+        if arr.size == 0:
+            arr = arr.reshape(0, 4)
+    elif isinstance(quaternions, Iterable):
+        arr = to_numpy(quaternions)
+    else:
+        raise TypeError('Argument must be a QuaternionArray, an array or an iterable of quaternions')
+    if arr.ndim != 2 or arr.shape[1] != 4:
+        raise ValueError('Quaternion components must have shape (N, 4)')
+    if not np.all(arr.any(axis=1)):
+        raise ValueError('A zero quaternion does not represent a rotation')
+    return unit_components(arr)
+
+
+def _check_k(k: int, count: int) -> None:
+    if not 1 <= k <= count:
+        raise ValueError('Number of clusters must be between 1 and the number of quaternions')
+
+
+def _initial_centers(units: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    '''The indices of k starting centers chosen by k-means++: each is drawn with
+    probability proportional to the squared distance to the nearest center so far
+    '''
+    indices = np.empty(k, dtype=np.int64)
+    indices[0] = rng.integers(len(units))
+    similarity = np.abs(units @ units[indices[0]])
+    for n in range(1, k):
+        weights = np.arccos(np.clip(similarity, 0.0, 1.0)) ** 2
+        total = weights.sum()
+        indices[n] = rng.choice(len(units), p=weights / total) if total > 0 else rng.integers(len(units))
+        np.maximum(similarity, np.abs(units @ units[indices[n]]), out=similarity)
+    return indices
+
+
+def _assign(units: np.ndarray, centers: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''The index of the nearest center to each rotation, and |u . c| for that
+    center, computed in blocks of rows small enough to stay in cache
+    '''
+    labels = np.empty(len(units), dtype=np.int64)
+    similarity = np.empty(len(units))
+    block = max(256, (1 << 18) // len(centers))
+    for start in range(0, len(units), block):
+        products = units[start:start + block] @ centers.T
+        np.abs(products, out=products)
+        best = np.argmax(products, axis=1)
+        labels[start:start + block] = best
+        similarity[start:start + block] = products[np.arange(len(best)), best]
+    return labels, similarity
+
+
+_UPPER = np.triu_indices(4)
+
+
+def _cluster_means(units: np.ndarray, labels: np.ndarray, similarity: np.ndarray,
+                   k: int) -> np.ndarray:
+    '''The Markley mean of each cluster, with empty clusters moved to the
+    rotations farthest from their centers
+    '''
+    matrices = np.empty((k, 4, 4))
+    for i, j in zip(*_UPPER):
+        matrices[:, i, j] = matrices[:, j, i] = np.bincount(labels, units[:, i] * units[:, j], k)
+    centers = principal_eigenvector(matrices)
+
+    empty = np.flatnonzero(np.bincount(labels, minlength=k) == 0)
+    if len(empty):
+        farthest = np.argsort(similarity)[:len(empty)]
+        centers[empty] = units[farthest]
+    return centers
+
+
+def _total_distances(members: np.ndarray) -> np.ndarray:
+    '''The sum of the distances from each of (n, 4) unit quaternions to all of
+    them, computed in blocks of rows to bound the memory used
+    '''
+    totals = np.empty(len(members))
+    block = max(1, (1 << 22) // len(members))
+    for start in range(0, len(members), block):
+        totals[start:start + block] = pairwise_angles(members[start:start + block], members,
+                                                      rotations=True).sum(axis=1)
+    return totals
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,182 @@
+'''Defines QuaternionDict, a mapping keyed by rotations that matches keys within
+an angular tolerance.
+
+Exact hashing, as in a dict keyed by quaternions, misses keys that differ only
+by rounding, and treats q and -q, which represent the same rotation, as
+different keys.  A QuaternionDict finds the stored key nearest to the one looked
+up, in the distance of quaternion_clustering, arccos(|u . v|) for the unit
+quaternions u and v, provided it is within the tolerance.  Keys are indexed by
+Quaternion.bucket_key, so a lookup only inspects a few grid cells and takes
+constant time however many keys are stored.
+
+    >>> cache = QuaternionDict(tolerance=1e-6)
+    >>> cache[Quaternion(0, 1, 0, 0)] = 'half turn about x'
+    >>> cache[Quaternion(0, -1, 1e-9, 0)]
+    'half turn about x'
+    >>> Quaternion(0, 1, 0.1, 0) in cache
+    False
+'''
+
+from __future__ import absolute_import, annotations
+
+import math
+from collections.abc import Iterable, Iterator, MutableMapping
+from itertools import count, product
+from numbers import Complex
+from typing import Any, Union
+
+from quaternion import MIN_TOLERANCE, Quaternion
+
+
+class QuaternionDict(MutableMapping):
+    '''A mutable mapping whose keys are rotations, matched within tolerance.
+
+    Looking up a quaternion finds the nearest stored key within tolerance of
+    it, or of its negative; assigning to a quaternion within tolerance of a
+    stored key replaces that key's value and keeps the stored key.  Keys may be
+    quaternions or real or complex numbers, but not zero, and iteration yields
+    the stored keys in insertion order.
+
+    Rounding in the unit quaternions makes distances below about 4e-8 radians,
+    sqrt(8 epsilon), meaningless, so smaller tolerances, including zero, act as
+    that; tolerance still reports the value given.
+
+    Keys are bucketed by Quaternion.bucket_key at a resolution of four times
+    the chord length of the tolerance.  A lookup inspects the bucket of the
+    quaternion looked up and the neighbouring buckets across those faces that
+    are within tolerance of it, on average about five.  bucket_key gives q and
+    -q the same bucket by making the first non-zero component positive, so keys
+    whose scalar part is near zero are also stored in the bucket of their
+    negative.
+
+        >>> orientations = QuaternionDict(0.01, [(Quaternion(1), 'rest')])
+        >>> orientations.setdefault(Quaternion(-1, 0, 0, 0.001), 'new')
+        'rest'
+        >>> len(orientations)
+        1
+    '''
+
+    def __init__(self, tolerance: float, items: Union[Iterable, None] = None):
+        if not tolerance >= 0:
+            raise ValueError('Tolerance must not be negative')
+        self._tolerance = tolerance
+        tolerance = max(tolerance, MIN_TOLERANCE)
+        self._chord = 2 * math.sin(min(tolerance, math.pi) / 2)
+        self._resolution = 4 * self._chord
+        self._threshold = math.cos(min(tolerance, math.pi / 2))
+        self._entries: dict = {}
+        self._buckets: dict = {}
+        self._counter = count()
+        if items is not None:
+            self.update(items)
+
+    @property
+    def tolerance(self) -> float:
+        '''The greatest distance at which a quaternion matches a stored key'''
+        return self._tolerance
+
+    def find(self, q) -> Union[Quaternion, None]:
+        '''The stored key nearest to q within tolerance, or None'''
+        entry = self._find(_as_quaternion(q))
+        return None if entry is None else self._entries[entry][0]
+
+    def __getitem__(self, q) -> Any:
+        entry = self._find(_as_quaternion(q))
+        if entry is None:
+            raise KeyError(q)
+        return self._entries[entry][1]
+
+    def __setitem__(self, q, value: Any) -> None:
+        q = _as_quaternion(q)
+        entry = self._find(q)
+        if entry is not None:
+            self._entries[entry][1] = value
+            return
+        entry = next(self._counter)
+        cells = self._cells(q)
+        self._entries[entry] = [q, value, q.canonical_components(), cells]
+        for cell in cells:
+            self._buckets.setdefault(cell, []).append(entry)
+
+    def __delitem__(self, q) -> None:
+        entry = self._find(_as_quaternion(q))
+        if entry is None:
+            raise KeyError(q)
+        for cell in self._entries.pop(entry)[3]:
+            bucket = self._buckets[cell]
+            bucket.remove(entry)
+            if not bucket:
+                del self._buckets[cell]
+
+    def __iter__(self) -> Iterator[Quaternion]:
+        return (stored[0] for stored in list(self._entries.values()))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, q) -> bool:
+        return self._find(_as_quaternion(q)) is not None
+
+    def __repr__(self) -> str:
+        items = ', '.join(f'{key!r}: {value!r}' for key, value, *_ in self._entries.values())
+        return f'{type(self).__name__}({self._tolerance!r}, {{{items}}})'
+
+    def _find(self, q: Quaternion) -> Union[int, None]:
+        '''The entry of the stored key nearest to q within tolerance, or None'''
+        u = q.canonical_components()
+        w, x, y, z = u
+        best, best_dot = None, self._threshold
+        for cell in self._probes(self._key(u), u):
+            for entry in self._buckets.get(cell, ()):
+                a, b, c, d = self._entries[entry][2]
+                dot = abs(w * a + x * b + y * c + z * d)
+                if dot >= best_dot:
+                    best, best_dot = entry, dot
+        return best
+
+    def _probes(self, key: tuple, u: tuple) -> Iterator[tuple]:
+        '''The buckets that may hold keys within tolerance of the unit quaternion u
+        in bucket key: its own and, along each axis, the neighbours across faces
+        nearer than the tolerance
+        '''
+        steps = []
+        for cell, component in zip(key, u):
+            below = component - cell * self._resolution
+            above = (cell + 1) * self._resolution - component
+            steps.append((cell - 1,) * (below <= self._chord) + (cell,)
+                         + (cell + 1,) * (above <= self._chord))
+        return product(*steps)
+
+    def _key(self, u: tuple) -> tuple:
+        '''The bucket of the unit quaternion u, Quaternion.bucket_key of u'''
+        return tuple(math.floor(x / self._resolution) for x in u)
+
+    def _cells(self, q: Quaternion) -> tuple:
+        '''The buckets a new key is stored in.  bucket_key makes the scalar part of
+        the unit quaternion non-negative, so a key with a scalar part within the
+        chord of zero can be within tolerance of the negatives of quaternions
+        placed on the other side, and is stored in the bucket of its own
+        negative too.
+        '''
+        u = q.canonical_components()
+        key = self._key(u)
+        if u[0] > self._chord:
+            return (key,)
+        other = self._key(tuple(-x for x in u))
+        return (key,) if other == key else (key, other)
+
+
+def _as_quaternion(q) -> Quaternion:
+    '''Convert a real or complex number to a quaternion'''
+    if type(q) is Quaternion:
+        return q
+    if isinstance(q, Complex):
+        return Quaternion(float(q.real), float(q.imag))
+    if not isinstance(q, Quaternion):
+        raise TypeError('Key must be quaternion, quaternion subclass or number')
+    return q
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,323 @@
+'''Defines a compact binary file format for quaternions, with streaming
+QuaternionWriter and QuaternionReader classes.
+
+A file is a 32-byte header followed by the packed components, four per
+quaternion, scalar first.  The header holds the magic bytes b'QUAT', a format
+version, the NumPy type string of the components (for example '<f8') and the
+number of quaternions, so the body can be mapped with numpy.memmap as an (N, 4)
+array without reading or copying it.  Components are float64, float32 or, for
+quaternionic integers, int64, in either byte order.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'q.quat')
+    >>> save(path, [Quaternion(1, 2, 3, 4), Quaternion(0, 1, 0, 0)], dtype='float32')
+    2
+    >>> read_header(path)
+    (dtype('float32'), 2)
+    >>> load(path)
+    QuaternionArray([1.0000 + 2.0000i + 3.0000j + 4.0000k,
+                     0.0000 + 1.0000i + 0.0000j + 0.0000k])
+'''
+
+from __future__ import absolute_import, annotations
+
+import os
+import struct
+from collections.abc import Iterable, Iterator
+from numbers import Complex, Integral
+from typing import Union
+
+import numpy as np
+from quaternion import Quaternion
+from quaternion_array import QuaternionArray
+from quaternionic_integer import QuaternionicInteger
+
+
+MAGIC = b'QUAT'
+VERSION = 1
+DTYPES = ('float64', 'float32', 'int64')
+
+_HEADER = struct.Struct('<4sB3sQ16x')
+HEADER_SIZE = _HEADER.size
+
+_DEFAULT_CHUNK_SIZE = 65536
+
+
+class QuaternionWriter:
+    '''Stream quaternions into a new file without holding them all in memory.
+
+    Quaternions are buffered and written in blocks of buffer_size; the count in
+    the header is brought up to date whenever the buffer is flushed, so a file
+    whose writer was not closed is still readable up to the last flush.  With
+    dtype 'int64' only quaternions with integral components can be written.
+
+        with QuaternionWriter('orientations.quat', dtype='float32') as writer:
+            for q in source:
+                writer.write(q)
+    '''
+
+    def __init__(self, path: Union[str, os.PathLike], dtype='float64', byteorder: str = '<',
+                 buffer_size: int = _DEFAULT_CHUNK_SIZE):
+        self._dtype = _file_dtype(dtype, byteorder)
+        self._integral = self._dtype.kind == 'i'
+        self._buffer_size = max(1, int(buffer_size))
+        self._rows: list = []
+        self._count = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    @property
+    def dtype(self) -> np.dtype:
+        '''The data type of the stored components'''
+        return self._dtype
+
+    @property
+    def count(self) -> int:
+        '''The number of quaternions written so far, including buffered ones'''
+        return self._count + len(self._rows)
+
+    @property
+    def closed(self) -> bool:
+        '''Whether the writer has been closed'''
+        return self._file.closed
+
+    def write(self, q) -> None:
+        '''Write a single quaternion or number'''
+        row = _row(q, self._integral)
+        if row is None:
+            raise TypeError('Argument must be quaternion, quaternion subclass or number')
+        self._rows.append(row)
+        if len(self._rows) >= self._buffer_size:
+            self.flush()
+
+    def write_array(self, quaternions) -> None:
+        '''Write a QuaternionArray, an (N, 4) array of components or an iterable
+        of quaternions in one block
+        '''
+        if isinstance(quaternions, (QuaternionArray, np.ndarray)):
+            arr = _as_array(quaternions, self._dtype)
+        else:
+            for q in quaternions:
+                self.write(q)
+            return
+        self.flush()
+        self._file.write(arr.tobytes())
+        self._count += len(arr)
+        self._write_header()
+
+    def flush(self) -> None:
+        '''Write the buffered quaternions and update the header'''
+        if self._rows:
+            arr = np.array(self._rows, dtype=self._dtype).reshape(-1, 4)
+            self._rows = []
+            self._file.write(arr.tobytes())
+            self._count += len(arr)
+            self._write_header()
+        self._file.flush()
+
+    def close(self) -> None:
+        '''Flush the buffer and close the file'''
+        if not self._file.closed:
+            try:
+                self.flush()
+            finally:
+                self._file.close()
+
+    def __enter__(self) -> QuaternionWriter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _write_header(self) -> None:
+        position = self._file.tell()
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, VERSION, self._dtype.str.encode('ascii'), self._count))
+        self._file.seek(max(position, HEADER_SIZE))
+
+
+class QuaternionReader:
+    '''Stream the quaternions of a file written by save or QuaternionWriter.
+
+    The file is memory-mapped, so only the parts that are read are loaded.
+    Iterating yields Quaternion instances, or QuaternionicInteger instances for
+    int64 files; chunks() yields QuaternionArrays, which share the mapped memory
+    when the file holds native-endian float64 components.
+
+        with QuaternionReader('orientations.quat') as reader:
+            for chunk in reader.chunks(100000):
+                process(chunk)
+    '''
+
+    def __init__(self, path: Union[str, os.PathLike], chunk_size: int = _DEFAULT_CHUNK_SIZE):
+        self._dtype, self._count = read_header(path)
+        self._chunk_size = max(1, int(chunk_size))
+        self._components: Union[np.ndarray, None] = open_memmap(path)
+
+    @property
+    def dtype(self) -> np.dtype:
+        '''The data type of the stored components'''
+        return self._dtype
+
+    @property
+    def components(self) -> np.ndarray:
+        '''The stored (N, 4) components as a read-only memory map'''
+        if self._components is None:
+            raise ValueError('I/O operation on closed reader')
+        return self._components
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Quaternion]:
+        make = QuaternionicInteger._make if self._dtype.kind == 'i' else Quaternion._make
+        components = self.components
+        for start in range(0, self._count, self._chunk_size):
+            for row in components[start:start + self._chunk_size].tolist():
+                yield make(*row)
+
+    def chunks(self, size: Union[int, None] = None) -> Iterator[QuaternionArray]:
+        '''Yield the quaternions as QuaternionArrays of up to size rows each'''
+        size = self._chunk_size if size is None else max(1, int(size))
+        components = self.components
+        for start in range(0, self._count, size):
+            yield _as_quaternion_array(components[start:start + size])
+
+    def close(self) -> None:
+        '''Release the memory map'''
+        self._components = None
+
+    def __enter__(self) -> QuaternionReader:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def save(path: Union[str, os.PathLike], quaternions, dtype=None, byteorder: str = '<') -> int:
+    '''Write quaternions to a new file and return how many were written.
+
+    quaternions may be a QuaternionArray, an (N, 4) array of components or an
+    iterable of quaternions.  By default the components are stored as int64 if
+    they are all quaternionic integers or the array has an integer type, and as
+    float64 otherwise.
+    '''
+    if not isinstance(quaternions, (QuaternionArray, np.ndarray)):
+        quaternions = list(quaternions)
+    if dtype is None:
+        dtype = _default_dtype(quaternions)
+    with QuaternionWriter(path, dtype, byteorder) as writer:
+        writer.write_array(quaternions)
+        return writer.count
+
+
+def load(path: Union[str, os.PathLike]) -> QuaternionArray:
+    '''Read a file as a QuaternionArray.
+
+    Native-endian float64 files are memory-mapped rather than read, so the array
+    is read-only and loading is immediate regardless of size; other files are
+    converted to float64 in memory.
+    '''
+    return _as_quaternion_array(open_memmap(path))
+
+
+def open_memmap(path: Union[str, os.PathLike], mode: str = 'r') -> np.ndarray:
+    '''The components stored in a file as an (N, 4) numpy.memmap of the stored
+    data type, without copying.  mode is 'r' or 'r+', as for numpy.memmap.
+    '''
+    if mode not in ('r', 'r+'):
+        raise ValueError("Mode must be 'r' or 'r+'")
+    dtype, count = read_header(path)
+    if not count:
+        return np.empty((0, 4), dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r+' if mode == 'r+' else 'r', offset=HEADER_SIZE,
+                     shape=(count, 4))
+
+
+def read_header(path: Union[str, os.PathLike]) -> tuple[np.dtype, int]:
+    '''The data type of the components and the number of quaternions in a file'''
+    with open(path, 'rb') as file:
+        header = file.read(HEADER_SIZE)
+        size = file.seek(0, os.SEEK_END)
+    if len(header) < HEADER_SIZE:
+        raise ValueError('File is too short to be a quaternion file')
+    magic, version, type_string, count = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError('File is not a quaternion file')
+    if version != VERSION:
+        raise ValueError(f'Unsupported quaternion file version {version}')
+    try:
+        dtype = np.dtype(type_string.decode('ascii'))
+    except (TypeError, UnicodeDecodeError) as error:
+        raise ValueError('Quaternion file has an invalid data type') from error
+    if dtype.name not in DTYPES:
+        raise ValueError(f'Unsupported quaternion file data type {dtype.name}')
+    if size < HEADER_SIZE + count * 4 * dtype.itemsize:
+        raise ValueError('Quaternion file is truncated')
+    return dtype, count
+
+
+def _file_dtype(dtype, byteorder: str) -> np.dtype:
+    '''The explicitly ordered NumPy data type for stored components'''
+    if byteorder not in ('<', '>', '='):
+        raise ValueError("Byte order must be '<', '>' or '='")
+    file_dtype = np.dtype(dtype)
+    if file_dtype.name not in DTYPES:
+        raise ValueError(f'Data type must be one of {", ".join(DTYPES)}')
+    file_dtype = file_dtype.newbyteorder(byteorder)
+    if file_dtype.byteorder == '=':
+        file_dtype = file_dtype.newbyteorder('<' if np.little_endian else '>')
+    return file_dtype
+
+
+def _default_dtype(quaternions) -> str:
+    if isinstance(quaternions, np.ndarray):
+        return 'int64' if quaternions.dtype.kind in 'iu' else 'float64'
+    if isinstance(quaternions, list) and quaternions and \
+            all(isinstance(q, QuaternionicInteger) for q in quaternions):
+        return 'int64'
+    return 'float64'
+
+
+def _row(q, integral: bool) -> Union[list, None]:
+    '''The components of a quaternion or number as a list of ints or floats,
+    or None if the value cannot be interpreted as a quaternion
+    '''
+    components: list
+    if isinstance(q, Complex):
+        components = [q.real, q.imag, 0, 0]
+    elif isinstance(q, Quaternion):
+        components = [q.scalar, q.i, q.j, q.k]
+    else:
+        return None
+    if not integral:
+        return [float(x) for x in components]
+    if not all(isinstance(x, Integral) or float(x).is_integer() for x in components):
+        raise ValueError('Only quaternions with integral components can be stored as int64')
+    return [int(x) for x in components]
+
+
+def _as_array(quaternions, dtype: np.dtype) -> np.ndarray:
+    '''A QuaternionArray or (N, 4) component array converted to the stored data type'''
+    arr = quaternions.components if isinstance(quaternions, QuaternionArray) else quaternions
+    if arr.size == 0:
+        arr = arr.reshape(0, 4)
+    if arr.ndim != 2 or arr.shape[1] != 4:
+        raise ValueError('Quaternion components must have shape (N, 4)')
+    if dtype.kind == 'i' and arr.dtype.kind not in 'iu' and not np.array_equal(arr, np.trunc(arr)):
+        raise ValueError('Only quaternions with integral components can be stored as int64')
+    return np.ascontiguousarray(arr, dtype=dtype)
+
+
+def _as_quaternion_array(components: np.ndarray) -> QuaternionArray:
+    '''Wrap stored components in a QuaternionArray, copying only if they are not
+    native-endian float64
+    '''
+    if components.dtype == np.float64 and components.dtype.isnative:
+        return QuaternionArray._wrap(components)
+    return QuaternionArray._wrap(components.astype(np.float64))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -3,31 +3,256 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
+import heapq
+import math
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, count
+from numbers import Complex
 from quaternion import Quaternion
 
 class QuaternionNode:
     '''Node in quaternion list'''
 
     def __init__(self, q):
-        self.quaternion = Quaternion(q)
+        self.quaternion = _as_quaternion(q)
         self.previous = None
         self.next = None
+        self.entry = None
 
     def insert(self, node, compare):
-        '''Insert node into list'''
-        if compare(self.quaternion, node.quaternion):
-            if self.next:
-                self.next = self.next.insert(node, compare)
+        '''Insert node into the list starting at this node, before the first node
+        whose quaternion q does not satisfy compare(q, node.quaternion), and return
+        the new first node.  QuaternionList locates nodes through its ordered index
+        instead; this walks the list, without recursion.
+        '''
+        current = self
+        while compare(current.quaternion, node.quaternion):
+            if not current.next:
+                current.next = node
+                node.previous = current
+                return self
+            current = current.next
+        node.next = current
+        if current.previous:
+            current.previous.next = node
+            node.previous = current.previous
+        current.previous = node
+        return node if current is self else self
+
+def _as_quaternion(q):
+    '''Convert a real or complex number to a quaternion'''
+    if isinstance(q, Complex):
+        return Quaternion(float(q.real), float(q.imag))
+    return q
+
+class _OrderedIndex:
+    '''Sorted sequence of entries stored as a list of bounded sorted blocks.
+
+    This is a two-level B-tree: the last entry of each block is kept in a separate
+    list, so a search is two bisections and an insertion or removal only shifts
+    entries within one block.  Block start positions are computed lazily for
+    rank and positional lookups.
+    '''
+
+    _LOAD = 256
+
+    def __init__(self):
+        self._blocks = []
+        self._maxes = []
+        self._offsets = None
+        self._len = 0
+
+    @classmethod
+    def from_sorted(cls, entries):
+        '''Build an index from a list of entries that is already sorted'''
+        index = cls()
+        index._blocks = [entries[i:i + cls._LOAD] for i in range(0, len(entries), cls._LOAD)]
+        index._maxes = [block[-1] for block in index._blocks]
+        index._len = len(entries)
+        return index
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for block in self._blocks:
+            yield from block
+
+    def insert(self, entry):
+        '''Insert entry and return the entry now preceding it, or None'''
+        self._offsets = None
+        self._len += 1
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._maxes.append(entry)
+            return None
+        i = min(bisect_left(self._maxes, entry), len(self._blocks) - 1)
+        block = self._blocks[i]
+        position = bisect_left(block, entry)
+        block.insert(position, entry)
+        self._maxes[i] = block[-1]
+        if position:
+            predecessor = block[position - 1]
+        elif i:
+            predecessor = self._blocks[i - 1][-1]
+        else:
+            predecessor = None
+        if len(block) > 2 * self._LOAD:
+            self._blocks[i:i + 1] = [block[:self._LOAD], block[self._LOAD:]]
+            self._maxes[i:i + 1] = [block[self._LOAD - 1], block[-1]]
+        return predecessor
+
+    def remove(self, entry):
+        '''Remove entry, which must be present'''
+        i = bisect_left(self._maxes, entry)
+        block = self._blocks[i]
+        del block[bisect_left(block, entry)]
+        self._offsets = None
+        self._len -= 1
+        if not block:
+            del self._blocks[i]
+            del self._maxes[i]
+        elif len(block) < self._LOAD // 2 and len(self._blocks) > 1:
+            j = i - 1 if i else i
+            merged = self._blocks[j] + self._blocks[j + 1]
+            self._blocks[j:j + 2] = [merged]
+            self._maxes[j:j + 2] = [merged[-1]]
+            if len(merged) > 2 * self._LOAD:
+                self._blocks[j:j + 1] = [merged[:self._LOAD], merged[self._LOAD:]]
+                self._maxes[j:j + 1] = [merged[self._LOAD - 1], merged[-1]]
+        else:
+            self._maxes[i] = block[-1]
+
+    def _block_offsets(self):
+        if self._offsets is None:
+            self._offsets = [0] + list(accumulate(len(block) for block in self._blocks))
+        return self._offsets
+
+    def bisect_left(self, key):
+        '''Position of the first entry not less than key'''
+        i = bisect_left(self._maxes, key)
+        if i == len(self._blocks):
+            return self._len
+        return self._block_offsets()[i] + bisect_left(self._blocks[i], key)
+
+    def bisect_right(self, key):
+        '''Position after the last entry not greater than key'''
+        i = bisect_right(self._maxes, key)
+        if i == len(self._blocks):
+            return self._len
+        return self._block_offsets()[i] + bisect_right(self._blocks[i], key)
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self._len
+        if not 0 <= position < self._len:
+            raise IndexError('index out of range')
+        offsets = self._block_offsets()
+        i = bisect_right(offsets, position) - 1
+        return self._blocks[i][position - offsets[i]]
+
+def _geodesic_distance(u, v):
+    '''Angle between two unit quaternions given as component tuples,
+    equal to utils.quaternion_utils.geodesic_distance of the original quaternions.
+    2 atan2(|u - v|, |u + v|) is used rather than acos(u . v), which loses
+    precision near 1 and puts equal quaternions about 1e-8 apart.
+    '''
+    difference = math.sqrt((u[0] - v[0]) ** 2 + (u[1] - v[1]) ** 2 +
+                           (u[2] - v[2]) ** 2 + (u[3] - v[3]) ** 2)
+    total = math.sqrt((u[0] + v[0]) ** 2 + (u[1] + v[1]) ** 2 +
+                      (u[2] + v[2]) ** 2 + (u[3] + v[3]) ** 2)
+    return 2 * math.atan2(difference, total)
+
+def _euclidean_distance(u, v):
+    '''Norm of the difference of two quaternions given as component tuples'''
+    return math.sqrt((u[0] - v[0]) ** 2 + (u[1] - v[1]) ** 2 +
+                     (u[2] - v[2]) ** 2 + (u[3] - v[3]) ** 2)
+
+def _unit_tuple(q):
+    # A zero quaternion has no direction, and no distance that keeps the
+    # triangle inequality the vantage-point tree relies on
+    norm = q.norm()
+    if not norm:
+        raise ValueError('Geodesic distance is undefined for a zero quaternion')
+    return (q.scalar / norm, q.i / norm, q.j / norm, q.k / norm)
+
+def _component_tuple(q):
+    return (q.scalar, q.i, q.j, q.k)
+
+# metric name -> (point function, distance function)
+_METRICS = {
+    'geodesic': (_unit_tuple, _geodesic_distance),
+    'euclidean': (_component_tuple, _euclidean_distance),
+}
+
+class _VPTree:
+    '''Vantage-point tree over (point, quaternion) items for metric range and
+    nearest-neighbour search.
+
+    Each node splits the remaining items at the median distance from its vantage
+    point, so whole subtrees can be skipped using the triangle inequality.
+    '''
+
+    def __init__(self, items, distance):
+        self._distance = distance
+        self._root = self._build(list(items))
+
+    def _build(self, items):
+        if not items:
+            return None
+        point, q = items.pop()
+        if not items:
+            return (point, q, 0.0, None, None)
+        distance = self._distance
+        items.sort(key=lambda item: distance(point, item[0]))
+        middle = len(items) // 2
+        radius = distance(point, items[middle][0])
+        return (point, q, radius, self._build(items[:middle]), self._build(items[middle:]))
+
+    def within(self, target, limit):
+        '''(distance, quaternion) pairs for every item within limit of target'''
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            point, q, radius, inside, outside = node
+            d = self._distance(target, point)
+            if d <= limit:
+                found.append((d, q))
+            if d - limit <= radius:
+                stack.append(inside)
+            if d + limit >= radius:
+                stack.append(outside)
+        return found
+
+    def nearest(self, target, k):
+        '''(distance, quaternion) pairs for the k items closest to target, nearest first'''
+        heap = []  # max-heap of (-distance, tiebreak, quaternion)
+        tiebreak = count()
+        limit = math.inf
+        stack = [(self._root, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if node is None or bound > limit:
+                continue
+            point, q, radius, inside, outside = node
+            d = self._distance(target, point)
+            if d < limit:
+                heapq.heappush(heap, (-d, next(tiebreak), q))
+                if len(heap) > k:
+                    heapq.heappop(heap)
+                if len(heap) == k:
+                    limit = -heap[0][0]
+            # Push the side containing the target last so it is searched first
+            if d < radius:
+                stack.append((outside, radius - d))
+                stack.append((inside, 0.0))
             else:
-                self.next = node
-                node.previous = self
-            return self
-        node.next = self
-        if self.previous:
-            self.previous.next = node
-            node.previous = self.previous
-        self.previous = node
-        return node
+                stack.append((inside, d - radius))
+                stack.append((outside, 0.0))
+        return sorted(((-d, q) for d, _, q in heap), key=lambda pair: pair[0])
 
 class QuaternionList:
     '''Can use either alphabetical (ordering='alpha') or norm-based (ordering='norm') ordering.
@@ -90,6 +315,38 @@ class QuaternionList:
         self.ordering = ordering
         self.nodes = {}
         self.head = None
+        self._sort_key = self.alpha_key if ordering == 'alpha' else self.norm_key
+        self._index = _OrderedIndex()
+        self._counter = count()
+        self._spatial_indexes = {}
+        self._norm_index = None
+
+    @classmethod
+    def from_iterable(cls, quaternions, ordering='alpha'):
+        '''Create a list from an iterable of quaternions, sorting once
+        instead of inserting each quaternion separately
+        '''
+        qlist = cls(ordering)
+        sort_key = qlist._sort_key
+        entries = []
+        for q in quaternions:
+            if not isinstance(q, Quaternion):
+                raise TypeError('Items must be quaternions or quaternion sublclasses')
+            node = QuaternionNode(q)
+            node.entry = (sort_key(node.quaternion), -next(qlist._counter), node)
+            entries.append(node.entry)
+            qlist.nodes[q] = node
+        entries.sort()
+        qlist._index = _OrderedIndex.from_sorted(entries)
+        previous = None
+        for entry in entries:
+            node = entry[2]
+            node.previous = previous
+            if previous:
+                previous.next = node
+            previous = node
+        qlist.head = entries[0][2] if entries else None
+        return qlist
 
     @staticmethod
     def alpha_compare(q1, q2):
@@ -101,31 +358,131 @@ class QuaternionList:
         '''Compare the two quaternions based on their norms'''
         return q1.norm() < q2.norm()
 
+    @staticmethod
+    def alpha_key(q):
+        '''Sort key for alphabetical order'''
+        return (q.scalar, q.i, q.j, q.k)
+
+    @staticmethod
+    def norm_key(q):
+        '''Sort key for norm-based order, the squared norm'''
+        return q.scalar * q.scalar + q.i * q.i + q.j * q.j + q.k * q.k
+
     def add(self, q):
         '''Add quaternion q to the list based on the defined ordering'''
         if not isinstance(q, Quaternion):
             raise TypeError('Argument must be quaternion or quaternion sublclass')
         node = QuaternionNode(q)
-        self.nodes[q] = node
-        if self.head:
-            if self.ordering == 'alpha':
-                self.head = self.head.insert(node, self.alpha_compare)
-            if self.ordering == 'norm':
-                self.head = self.head.insert(node, self.norm_compare)
-        else:
+        # A newer node sorts before older nodes with an equal key
+        node.entry = (self._sort_key(node.quaternion), -next(self._counter), node)
+        predecessor = self._index.insert(node.entry)
+        if predecessor is None:
+            node.next = self.head
             self.head = node
+        else:
+            node.previous = predecessor[2]
+            node.next = node.previous.next
+            node.previous.next = node
+        if node.next:
+            node.next.previous = node
+        self.nodes[q] = node
+        self._invalidate()
 
     def remove(self, q):
         '''Remove quaterion q from the list'''
         node = self.nodes[q]
+        self._index.remove(node.entry)
         if node is self.head:
             self.head = node.next
-            node.next.previous = None
         else:
             node.previous.next = node.next
+        if node.next:
             node.next.previous = node.previous
         del self.nodes[q]
         del node
+        self._invalidate()
+
+    def _invalidate(self):
+        '''Discard search indexes that are built lazily by the queries below'''
+        self._spatial_indexes.clear()
+        self._norm_index = None
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        for entry in self._index:
+            yield entry[2].quaternion
+
+    def __getitem__(self, index):
+        '''The quaternion at the given position in the ordering'''
+        return self._index[index][2].quaternion
+
+    def rank(self, q):
+        '''The number of quaternions in the list that sort before q'''
+        return self._index.bisect_left((self._sort_key(_as_quaternion(q)),))
+
+    def bisect_right(self, q):
+        '''The number of quaternions in the list that sort before or equal to q'''
+        return self._index.bisect_right((self._sort_key(_as_quaternion(q)), _MAX_SEQUENCE))
+
+    def irange(self, minimum=None, maximum=None):
+        '''Iterate over the quaternions between minimum and maximum, inclusive,
+        in list order.  Either bound may be None to leave that end open.
+        '''
+        start = 0 if minimum is None else self.rank(minimum)
+        stop = len(self) if maximum is None else self.bisect_right(maximum)
+        if start >= stop:
+            return
+        node = self._index[start][2]
+        for _ in range(stop - start):
+            yield node.quaternion
+            node = node.next
+
+    def range_by_norm(self, low, high):
+        '''The quaternions with norms between low and high, inclusive, in order of norm'''
+        if high < 0:
+            return []
+        low_key = max(low, 0) ** 2
+        high_key = high ** 2
+        if self.ordering == 'norm':
+            start = self._index.bisect_left((low_key,))
+            stop = self._index.bisect_right((high_key, _MAX_SEQUENCE))
+            return [self._index[position][2].quaternion for position in range(start, stop)]
+        if self._norm_index is None:
+            self._norm_index = sorted((self.norm_key(q), position, q)
+                                      for position, q in enumerate(self))
+        start = bisect_left(self._norm_index, (low_key,))
+        stop = bisect_right(self._norm_index, (high_key, _MAX_SEQUENCE))
+        return [q for _, _, q in self._norm_index[start:stop]]
+
+    def _spatial_index(self, metric):
+        if metric not in _METRICS:
+            raise ValueError(f"Metric must be one of {', '.join(_METRICS)}")
+        if metric not in self._spatial_indexes:
+            to_point, distance = _METRICS[metric]
+            self._spatial_indexes[metric] = _VPTree(((to_point(q), q) for q in self), distance)
+        return self._spatial_indexes[metric]
+
+    def nearest(self, q, k=1, metric='geodesic'):
+        '''The k quaternions closest to q, nearest first, as (distance, quaternion) pairs.
+
+        The geodesic metric is the angle between the unit quaternions, as computed by
+        utils.quaternion_utils.geodesic_distance, and raises ValueError if q or a
+        quaternion in the list is zero; the euclidean metric is the norm of the
+        difference.  Queries use a vantage-point tree that is built on first use
+        and rebuilt after the list changes.
+        '''
+        tree = self._spatial_index(metric)
+        if k <= 0:
+            return []
+        return tree.nearest(_METRICS[metric][0](_as_quaternion(q)), k)
+
+    def within(self, q, distance, metric='geodesic'):
+        '''All quaternions within distance of q, nearest first, as (distance, quaternion) pairs'''
+        tree = self._spatial_index(metric)
+        found = tree.within(_METRICS[metric][0](_as_quaternion(q)), distance)
+        return sorted(found, key=lambda pair: pair[0])
 
     def print_quaternions(self):
         '''Print the list quatnerions in order'''
@@ -134,6 +491,8 @@ class QuaternionList:
             print(node.quaternion)
             node = node.next
 
+_MAX_SEQUENCE = float('inf')
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
@@ -0,0 +1,190 @@
+'''Defines pmap and preduce, which spread work over large batches of quaternions
+across a pool of processes.
+
+The components are copied once into a shared memory block, and each worker
+reads its own slice of it, so only the chunk boundaries and the results are
+sent between processes.
+
+    >>> qs = [Quaternion(1, 1, 0, 0), Quaternion(0, 0, 1, 0), Quaternion(1, 0, 0, 1)]
+    >>> preduce(qs, workers=2, chunk_size=1) == qs[0] * qs[1] * qs[2]
+    True
+    >>> pmap(abs, qs, workers=2)
+    [1.4142135623730951, 1.0, 1.4142135623730951]
+'''
+
+from __future__ import absolute_import, annotations
+
+import math
+import os
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Union
+
+import numpy as np
+from quaternion import Quaternion
+from quaternion_array import QuaternionArray, hamilton_product, to_numpy
+
+
+def pmap(func: Callable, quaternions, workers: Union[int, None] = None,
+         chunk_size: Union[int, None] = None) -> list:
+    '''[func(q) for q in quaternions], computed in a pool of worker processes.
+
+    quaternions may be a QuaternionArray, an (N, 4) array of components or an
+    iterable of quaternions.  Each worker receives float-valued Quaternion
+    instances rebuilt from the shared float64 components, so func must be
+    picklable, that is, defined at the top level of a module.  The results are
+    returned in order.  workers defaults to the number of CPUs, and chunk_size
+    to an even split into four chunks per worker.
+    '''
+    components = _components(quaternions)
+    workers = _workers(workers)
+    count = len(components)
+    chunk_size = _chunk_size(chunk_size, count, 4 * workers)
+
+    if workers == 1 or chunk_size >= count:
+        return [func(q) for q in QuaternionArray._wrap(components).to_quaternions()]
+
+    results = []
+    with _SharedComponents(components) as shared, ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_map_chunk, func, shared.name, count, start, start + chunk_size)
+                   for start in range(0, count, chunk_size)]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def preduce(quaternions, workers: Union[int, None] = None,
+            chunk_size: Union[int, None] = None) -> Quaternion:
+    '''The ordered Hamilton product q0 * q1 * ... * qn of many quaternions,
+    computed in a pool of worker processes.
+
+    Each worker multiplies one contiguous chunk, pairing neighbours in
+    vectorized rounds, and the partial products are multiplied in chunk order,
+    since the product is associative but not commutative.  Because the
+    products are grouped differently, the result can differ from a
+    left-to-right loop in the last few bits.  The product of no quaternions is
+    1.  workers defaults to the number of CPUs, and chunk_size to an even split
+    into one chunk per worker.
+    '''
+    components = _components(quaternions)
+    workers = _workers(workers)
+    count = len(components)
+    chunk_size = _chunk_size(chunk_size, count, workers)
+
+    if workers == 1 or chunk_size >= count:
+        return Quaternion._make(*_product(components).tolist())
+
+    with _SharedComponents(components) as shared, ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(_reduce_chunk, shared.name, count, start, start + chunk_size)
+                   for start in range(0, count, chunk_size)]
+        partials = np.array([future.result() for future in futures])
+    return Quaternion._make(*_product(partials).tolist())
+
+
+class _SharedComponents:
+    '''A shared memory block holding a copy of an (N, 4) float64 component array,
+    released when the context exits
+    '''
+
+    def __init__(self, components: np.ndarray):
+        self._memory = shared_memory.SharedMemory(create=True, size=max(components.nbytes, 1))
+        try:
+            np.ndarray(components.shape, dtype=np.float64, buffer=self._memory.buf)[:] = components
+        except BaseException:
+            self._release()
+            raise
+
+    @property
+    def name(self) -> str:
+        '''The name that workers attach to'''
+        return self._memory.name
+
+    def __enter__(self) -> _SharedComponents:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._release()
+
+    def _release(self) -> None:
+        self._memory.close()
+        self._memory.unlink()
+
+
+def _map_chunk(func: Callable, name: str, count: int, start: int, stop: int) -> list:
+    '''Apply func to each quaternion in a slice of the shared components'''
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        quaternions = QuaternionArray._wrap(_chunk(memory, count, start, stop)).to_quaternions()
+    finally:
+        memory.close()
+    return [func(q) for q in quaternions]
+
+
+def _reduce_chunk(name: str, count: int, start: int, stop: int) -> list:
+    '''The product of a slice of the shared components'''
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        product = _product(_chunk(memory, count, start, stop))
+    finally:
+        memory.close()
+    return product.tolist()
+
+
+def _chunk(memory: shared_memory.SharedMemory, count: int, start: int, stop: int) -> np.ndarray:
+    '''A copy of rows start to stop of the components in a shared memory block.
+    Copying leaves no views of the block behind, so that it can be closed.
+    '''
+    return np.ndarray((count, 4), dtype=np.float64, buffer=memory.buf)[start:stop].copy()
+
+
+def _product(components: np.ndarray) -> np.ndarray:
+    '''The ordered product of an (N, 4) component array, multiplying adjacent
+    pairs in vectorized rounds
+    '''
+    if not len(components):
+        return np.array([1.0, 0.0, 0.0, 0.0])
+    while len(components) > 1:
+        pairs = len(components) // 2
+        product = hamilton_product(components[0:2 * pairs:2], components[1:2 * pairs:2])
+        if len(components) % 2:
+            product = np.concatenate([product, components[-1:]])
+        components = product
+    return components[0]
+
+
+def _components(quaternions) -> np.ndarray:
+    '''The (N, 4) float64 components of a QuaternionArray, array or iterable of quaternions'''
+    if isinstance(quaternions, QuaternionArray):
+        return quaternions.components
+    if isinstance(quaternions, np.ndarray):
+        arr = quaternions.astype(np.float64, copy=False)
+        if arr.size == 0:
+            arr = arr.reshape(0, 4)
+        if arr.ndim != 2 or arr.shape[1] != 4:
+            raise ValueError('Quaternion components must have shape (N, 4)')
+        return arr
+    if isinstance(quaternions, Iterable):
+        return to_numpy(quaternions)
+    raise TypeError('Argument must be a QuaternionArray, an array or an iterable of quaternions')
+
+
+def _workers(workers: Union[int, None]) -> int:
+    if workers is None:
+        return os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError('Number of workers must be at least 1')
+    return int(workers)
+
+
+def _chunk_size(chunk_size: Union[int, None], count: int, chunks: int) -> int:
+    if chunk_size is None:
+        return max(1, math.ceil(count / chunks))
+    if chunk_size < 1:
+        raise ValueError('Chunk size must be at least 1')
+    return int(chunk_size)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
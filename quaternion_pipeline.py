@@ -0,0 +1,215 @@
+'''Defines an asyncio pipeline for streams of quaternion samples, such as sensor feeds.
+
+A pipeline is a source, a sequence of stages and an optional sink, run
+concurrently as tasks connected by bounded queues, so a slow stage makes the
+ones before it wait rather than letting samples pile up.  Samples are
+micro-batched as they enter: each batch holds whatever has arrived, up to
+batch_size samples, and travels between stages as a QuaternionArray, so the
+stages do vectorized work.
+
+    >>> import asyncio
+    >>> lines = ['0 + 2i + 0j + 0k', 'bad sample', '0 + 0i + 3j + 0k']
+    >>> asyncio.run(run_pipeline(lines, [parse(), normalize(), compose()]))
+    QuaternionArray([0.0000 + 1.0000i + 0.0000j + 0.0000k,
+                     0.0000 + 0.0000i + 0.0000j + 1.0000k])
+'''
+
+from __future__ import absolute_import, annotations
+
+import asyncio
+import inspect
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable
+from typing import Union
+
+import numpy as np
+from quaternion import Quaternion
+from quaternion_array import QuaternionArray, cumulative_product, hamilton_product
+
+
+def parse(on_malformed: Union[Callable, None] = None) -> Callable:
+    '''A stage parsing batches of strings, such as '1 + 2i + 3j + 4k', into
+    QuaternionArrays.  It must be the first stage for sources of strings or bytes.
+    Malformed samples are dropped; on_malformed, if given, is called with the
+    list of malformed strings in each batch.
+    '''
+    return _Parse(on_malformed)
+
+
+def normalize() -> Callable:
+    '''A stage dividing every quaternion by its norm'''
+    return QuaternionArray.unit
+
+
+def keep(predicate: Callable) -> Callable:
+    '''A stage keeping the quaternions for which predicate is true.  predicate
+    takes a QuaternionArray and returns a boolean array with one value per
+    quaternion, e.g. lambda qa: qa.norm() > 0.5
+    '''
+    def keep_batch(qa: QuaternionArray) -> QuaternionArray:
+        return qa[np.asarray(predicate(qa), dtype=bool)]
+    return keep_batch
+
+
+def compose(initial: Quaternion = Quaternion(1.0), renormalize: bool = False) -> Composition:
+    '''A stage accumulating the Hamilton product of the stream, replacing each
+    quaternion q_n with initial * q_1 * ... * q_n.  See Composition.
+    '''
+    return Composition(initial, renormalize)
+
+
+class Composition:
+    '''The stage returned by compose().
+
+    Each batch is combined with a vectorized prefix product, and the last
+    product is carried over to the next batch and available as .state.  With
+    renormalize, every product is divided by its norm, which keeps a long
+    composition of rotations from drifting away from unit length.
+    '''
+
+    def __init__(self, initial: Quaternion = Quaternion(1.0), renormalize: bool = False):
+        self._state = np.array(QuaternionArray.from_quaternions([initial]).components[0])
+        self._renormalize = renormalize
+
+    @property
+    def state(self) -> Quaternion:
+        '''The product of all quaternions seen so far'''
+        return Quaternion._make(*self._state.tolist())
+
+    def __call__(self, qa: QuaternionArray) -> QuaternionArray:
+        if not len(qa):
+            return qa
+        products = hamilton_product(self._state, cumulative_product(qa.components))
+        if self._renormalize:
+            products /= np.linalg.norm(products, axis=1)[:, np.newaxis]
+        self._state = products[-1].copy()
+        return QuaternionArray._wrap(products)
+
+
+class _Parse:
+    '''The stage returned by parse()'''
+
+    def __init__(self, on_malformed: Union[Callable, None]):
+        self._on_malformed = on_malformed
+
+    def __call__(self, lines: list) -> QuaternionArray:
+        lines = [line.decode() if isinstance(line, bytes) else line for line in lines]
+        qa, malformed = QuaternionArray.from_strings(lines)
+        if malformed and self._on_malformed is not None:
+            self._on_malformed([line for _, line in malformed])
+        return qa
+
+
+async def read_lines(reader: asyncio.StreamReader) -> AsyncIterator[str]:
+    '''The lines of a stream, such as one from asyncio.open_unix_connection or
+    asyncio.open_connection, without line endings; a source for parse()
+    '''
+    async for line in reader:
+        yield line.decode().rstrip('\r\n')
+
+
+async def run_pipeline(source: Union[Iterable, AsyncIterable], stages: Iterable[Callable],
+                       sink: Union[Callable, None] = None, batch_size: int = 256,
+                       queue_size: int = 8) -> Union[QuaternionArray, None]:
+    '''Run samples from source through the stages and into sink.
+
+    source is an iterable or async iterable of strings or bytes, for which the
+    first stage must be parse(), or of quaternions.  Each stage is a function,
+    or coroutine function, taking a batch and returning the next batch; all
+    stages after the first take and return QuaternionArrays.  Empty batches are
+    not passed on.  sink, if given, is called, and awaited if it returns an
+    awaitable, with each final batch; otherwise the final batches are collected
+    and returned as one QuaternionArray.
+
+    Each queue between tasks holds at most queue_size batches, or
+    queue_size * batch_size samples at the source.  If any stage raises, the
+    pipeline is cancelled and the exception propagates.
+    '''
+    if batch_size < 1 or queue_size < 1:
+        raise ValueError('Batch size and queue size must be at least 1')
+
+    batches: list[QuaternionArray] = []
+    collect = sink is None
+    if sink is None:
+        sink = batches.append
+
+    stages = list(stages)
+    parses = bool(stages) and isinstance(stages[0], _Parse)
+
+    queues: list[asyncio.Queue] = [asyncio.Queue(queue_size * batch_size)]
+    tasks = [asyncio.ensure_future(_feed(source, queues[0]))]
+    queues.append(asyncio.Queue(queue_size))
+    tasks.append(asyncio.ensure_future(_batch(queues[0], queues[1], batch_size, parses)))
+    for stage in stages:
+        queues.append(asyncio.Queue(queue_size))
+        tasks.append(asyncio.ensure_future(_stage(stage, queues[-2], queues[-1])))
+    tasks.append(asyncio.ensure_future(_drain(queues[-1], sink)))
+
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    if not collect:
+        return None
+    if not batches:
+        return QuaternionArray()
+    return QuaternionArray._wrap(np.concatenate([qa.components for qa in batches]))
+
+
+_DONE = object()
+
+
+async def _feed(source: Union[Iterable, AsyncIterable], queue: asyncio.Queue) -> None:
+    '''Put the samples of a source into a queue, followed by _DONE'''
+    if isinstance(source, AsyncIterable):
+        async for sample in source:
+            await queue.put(sample)
+    else:
+        for sample in source:
+            await queue.put(sample)
+    await queue.put(_DONE)
+
+
+async def _batch(samples: asyncio.Queue, batches: asyncio.Queue, batch_size: int,
+                 parses: bool) -> None:
+    '''Group samples into batches of whatever has arrived, up to batch_size.
+    Batches of strings are left for parse() if it is the next stage.
+    '''
+    done = False
+    while not done:
+        items = [await samples.get()]
+        while len(items) < batch_size and not samples.empty():
+            items.append(samples.get_nowait())
+        if items[-1] is _DONE:
+            items.pop()
+            done = True
+        if items:
+            await batches.put(items if parses else QuaternionArray.from_quaternions(items))
+    await batches.put(_DONE)
+
+
+async def _stage(stage: Callable, inputs: asyncio.Queue, outputs: asyncio.Queue) -> None:
+    '''Apply a stage to each batch from one queue and put the results on the next'''
+    while (batch := await inputs.get()) is not _DONE:
+        result = stage(batch)
+        if inspect.isawaitable(result):
+            result = await result
+        if len(result):
+            await outputs.put(result)
+    await outputs.put(_DONE)
+
+
+async def _drain(batches: asyncio.Queue, sink: Callable) -> None:
+    '''Pass each batch from a queue to the sink'''
+    while (batch := await batches.get()) is not _DONE:
+        result = sink(batch)
+        if inspect.isawaitable(result):
+            await result
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -1,10 +1,15 @@
-'''Defines QuaternionicInteger class'''
+'''Defines QuaternionicInteger and HurwitzInteger classes'''
 
 from __future__ import absolute_import, annotations
 
-from numbers import Integral, Complex, Real
-from quaternion import Quaternion
+import math
+import random
+from fractions import Fraction
+from numbers import Integral, Complex, Rational, Real
+from quaternion import Quaternion, hamilton_components
+from rational_quaternion import RationalQuaternion, rational_components, as_rational_quaternion
 from dataclasses import dataclass
+from typing import Union
 
 
 @dataclass(frozen=True)
@@ -14,6 +19,8 @@ class QuaternionicInteger(Quaternion):
     quaternionic integers are quaternions with integer coefficients.
     '''
 
+    __slots__ = ()
+
     def __post_init__(self):
         object.__setattr__(self, 'scalar', int(self.scalar))
         object.__setattr__(self, 'i', int(self.i))
@@ -63,13 +70,19 @@ class QuaternionicInteger(Quaternion):
     def __add__(self, other: object) -> Quaternion:
 
         if isinstance(other, Integral):
-            return QuaternionicInteger(self.scalar + int(other), self.i, self.j, self.k)
+            return QuaternionicInteger._make(self.scalar + int(other), self.i, self.j, self.k)
 
         if isinstance(other, QuaternionicInteger):
-            return QuaternionicInteger(self.scalar + other.scalar,
-                                       self.i + other.i,
-                                       self.j + other.j,
-                                       self.k + other.k)
+            return QuaternionicInteger._make(self.scalar + other.scalar,
+                                             self.i + other.i,
+                                             self.j + other.j,
+                                             self.k + other.k)
+
+        if isinstance(other, HurwitzInteger):
+            return NotImplemented
+
+        if isinstance(other, (Rational, RationalQuaternion)):
+            return self.to_rational_quaternion() + as_rational_quaternion(other)
 
         if isinstance(other, Complex):
             return Quaternion(self.scalar + float(other.real), self.i + float(other.imag), self.j, self.k)
@@ -88,13 +101,19 @@ class QuaternionicInteger(Quaternion):
     def __radd__(self, other: object) -> Quaternion:
 
         if isinstance(other, Integral):
-            return QuaternionicInteger(int(other) + self.scalar, self.i, self.j, self.k)
+            return QuaternionicInteger._make(int(other) + self.scalar, self.i, self.j, self.k)
 
         if isinstance(other, QuaternionicInteger):
-            return QuaternionicInteger(other.scalar + self.scalar,
-                                       other.i + self.i,
-                                       other.j + self.j,
-                                       other.k + self.k)
+            return QuaternionicInteger._make(other.scalar + self.scalar,
+                                             other.i + self.i,
+                                             other.j + self.j,
+                                             other.k + self.k)
+
+        if isinstance(other, HurwitzInteger):
+            return NotImplemented
+
+        if isinstance(other, (Rational, RationalQuaternion)):
+            return as_rational_quaternion(other) + self.to_rational_quaternion()
 
         if isinstance(other, Complex):
             return Quaternion(float(other.real) + self.scalar, float(other.imag) + self.i, self.j, self.k)
@@ -111,19 +130,25 @@ class QuaternionicInteger(Quaternion):
         return NotImplemented
 
     def __neg__(self) -> QuaternionicInteger:
-        return QuaternionicInteger(-self.scalar, -self.i, -self.j, -self.k)
+        return QuaternionicInteger._make(-self.scalar, -self.i, -self.j, -self.k)
 
     def __mul__(self, other: object) -> Quaternion:
 
         if isinstance(other, Integral):
-            return QuaternionicInteger(self.scalar * int(other), self.i * int(other), self.j * int(other), self.k * int(other))
+            return QuaternionicInteger._make(self.scalar * int(other), self.i * int(other), self.j * int(other), self.k * int(other))
 
         if isinstance(other, QuaternionicInteger):
             s = self.scalar * other.scalar - self.i * other.i - self.j * other.j - self.k * other.k
             i = self.scalar * other.i + self.i * other.scalar + self.j * other.k - self.k * other.j
             j = self.scalar * other.j - self.i * other.k + self.j * other.scalar + self.k * other.i
             k = self.scalar * other.k + self.i * other.j - self.j * other.i + self.k * other.scalar
-            return QuaternionicInteger(s, i, j, k)
+            return QuaternionicInteger._make(s, i, j, k)
+
+        if isinstance(other, HurwitzInteger):
+            return NotImplemented
+
+        if isinstance(other, (Rational, RationalQuaternion)):
+            return self.to_rational_quaternion() * as_rational_quaternion(other)
 
         if isinstance(other, Complex):
             return super().__mul__(Quaternion(float(other.real), float(other.imag)))
@@ -139,14 +164,20 @@ class QuaternionicInteger(Quaternion):
     def __rmul__(self, other: object) -> Quaternion:
 
         if isinstance(other, Integral):
-            return QuaternionicInteger(int(other) * self.scalar, int(other) * self.i, int(other) * self.j, int(other) * self.k)
+            return QuaternionicInteger._make(int(other) * self.scalar, int(other) * self.i, int(other) * self.j, int(other) * self.k)
 
         if isinstance(other, QuaternionicInteger):
             s = other.scalar * self.scalar - other.i * self.i - other.j * self.j - other.k * self.k
             i = other.scalar * self.i + other.i * self.scalar + other.j * self.k - other.k * self.j
             j = other.scalar * self.j - other.i * self.k + other.j * self.scalar + other.k * self.i
             k = other.scalar * self.k + other.i * self.j - other.j * self.i + other.k * self.scalar
-            return QuaternionicInteger(s, i, j, k)
+            return QuaternionicInteger._make(s, i, j, k)
+
+        if isinstance(other, HurwitzInteger):
+            return NotImplemented
+
+        if isinstance(other, (Rational, RationalQuaternion)):
+            return as_rational_quaternion(other) * self.to_rational_quaternion()
 
         if isinstance(other, Complex):
             return Quaternion(float(other.real), float(other.imag)) * Quaternion(self.scalar, self.i, self.j, self.k)
@@ -163,13 +194,13 @@ class QuaternionicInteger(Quaternion):
 
         if isinstance(other, Integral):
             # exact integer division -> return QuaternionicInteger
-            s = self.scalar / int(other)
-            i = self.i / int(other)
-            j = self.j / int(other)
-            k = self.k / int(other)
-            if all(float(x).is_integer() for x in (s, i, j, k)):
-                return QuaternionicInteger(int(s), int(i), int(j), int(k))
-            return Quaternion(s, i, j, k)
+            n = int(other)
+            if n and not (self.scalar % n or self.i % n or self.j % n or self.k % n):
+                return QuaternionicInteger._make(self.scalar // n, self.i // n, self.j // n, self.k // n)
+            return _exact(self.to_rational_quaternion() / n)
+
+        if rational_components(other) is not None:
+            return _exact(self.to_rational_quaternion() / as_rational_quaternion(other))
 
         if isinstance(other, Quaternion) or isinstance(other, complex):
             return super().__truediv__(other)
@@ -178,6 +209,9 @@ class QuaternionicInteger(Quaternion):
 
     def __rtruediv__(self, other: object) -> Quaternion:
 
+        if rational_components(other) is not None:
+            return _exact(as_rational_quaternion(other) / self.to_rational_quaternion())
+
         if isinstance(other, Real):
             return Quaternion(float(other)) / Quaternion(self.scalar, self.i, self.j, self.k)
 
@@ -192,11 +226,604 @@ class QuaternionicInteger(Quaternion):
             return numerator / denominator
         return NotImplemented
 
+    def __pow__(self, exponent, modulo=None):
+        '''Integer powers are computed exactly by repeated squaring.
+
+        pow(q, n, m) reduces every product modulo m and returns the representative
+        with components reduced modulo m.  A negative n uses the conjugate times
+        the modular inverse of the norm, and raises ValueError if there is none.
+        '''
+        if modulo is None:
+            return super().__pow__(exponent)
+        if not isinstance(exponent, Integral) or not isinstance(modulo, Integral):
+            return NotImplemented
+        m, n = int(modulo), int(exponent)
+        if not m:
+            raise ValueError('pow() 3rd argument cannot be 0')
+        base = (self.scalar % m, self.i % m, self.j % m, self.k % m)
+        if n < 0:
+            try:
+                inverse = pow(_norm_squared(base), -1, m)
+            except ValueError:
+                raise ValueError('base is not invertible for the given modulus') from None
+            base = tuple(x * inverse % m for x in _conjugate(base))
+            n = -n
+        result = (1 % m, 0, 0, 0)
+        while n:
+            if n & 1:
+                result = tuple(x % m for x in hamilton_components(result, base))
+            n >>= 1
+            if n:
+                base = tuple(x % m for x in hamilton_components(base, base))
+        return QuaternionicInteger._make(*result)
+
+    def __divmod__(self, other: object) -> tuple[QuaternionicInteger, QuaternionicInteger]:
+        '''Division with remainder, self = q * other + r, with q the right quotient
+        self / other rounded to the nearest integer components.
+
+        The remainder's norm is at most the norm of other, and strictly smaller
+        unless every component of the exact quotient is an odd half.  Use
+        HurwitzInteger for a division that always reduces the norm.
+        '''
+        b = _integer_components(other)
+        if b is None:
+            return NotImplemented
+        a = (self.scalar, self.i, self.j, self.k)
+        q = _round_quotient(hamilton_components(a, _conjugate(b)), _norm_squared(b))
+        r = tuple(x - y for x, y in zip(a, hamilton_components(q, b)))
+        return QuaternionicInteger._make(*q), QuaternionicInteger._make(*r)
+
+    def __rdivmod__(self, other: object) -> tuple[QuaternionicInteger, QuaternionicInteger]:
+        if isinstance(other, Integral):
+            return divmod(QuaternionicInteger._make(int(other), 0, 0, 0), self)
+        return NotImplemented
+
+    def __floordiv__(self, other: object) -> QuaternionicInteger:
+        result = self.__divmod__(other)
+        return result if result is NotImplemented else result[0]
+
+    def __rfloordiv__(self, other: object) -> QuaternionicInteger:
+        result = self.__rdivmod__(other)
+        return result if result is NotImplemented else result[0]
+
+    def __mod__(self, other: object) -> QuaternionicInteger:
+        result = self.__divmod__(other)
+        return result if result is NotImplemented else result[1]
+
+    def __rmod__(self, other: object) -> QuaternionicInteger:
+        result = self.__rdivmod__(other)
+        return result if result is NotImplemented else result[1]
+
+    def ldivmod(self, other: object) -> tuple[QuaternionicInteger, QuaternionicInteger]:
+        '''Left division with remainder, self = other * q + r, rounding as in divmod'''
+        b = _integer_components(other)
+        if b is None:
+            raise TypeError('Divisor must be an integer or quaternionic integer')
+        a = (self.scalar, self.i, self.j, self.k)
+        q = _round_quotient(hamilton_components(_conjugate(b), a), _norm_squared(b))
+        r = tuple(x - y for x, y in zip(a, hamilton_components(b, q)))
+        return QuaternionicInteger._make(*q), QuaternionicInteger._make(*r)
+
     def conjugate(self) -> QuaternionicInteger:
-        return QuaternionicInteger(self.scalar, -self.i, -self.j, -self.k)
+        return QuaternionicInteger._make(self.scalar, -self.i, -self.j, -self.k)
+
+    def reciprocal(self) -> RationalQuaternion:
+        '''The exact multiplicative inverse of the quaternion'''
+        return self.to_rational_quaternion().reciprocal()
 
     def to_float_quaternion(self) -> Quaternion:
         '''Covert to a quaternion with floating-point components'''
-        return Quaternion(self.scalar, self.i, self.j, self.k)
+        return Quaternion._make(float(self.scalar), float(self.i), float(self.j), float(self.k))
+
+    def to_rational_quaternion(self) -> RationalQuaternion:
+        '''Convert to a quaternion with Fraction components'''
+        return RationalQuaternion._make(Fraction(self.scalar), Fraction(self.i),
+                                        Fraction(self.j), Fraction(self.k))
 
 QuaternionicInteger.register(Integral) # type: ignore[type-abstract]
+
+
+@dataclass(frozen=True)
+class HurwitzInteger(Quaternion):
+
+    '''The Hurwitz integers are the quaternions whose components are either all
+    integers or all halves of odd integers.  They contain the quaternionic integers
+    and, unlike them, admit a Euclidean algorithm: division with remainder always
+    leaves a remainder of at most half the divisor's norm.
+
+    Half-integer components are stored as Fractions, so arithmetic stays exact.
+
+        >>> h = HurwitzInteger(Fraction(1, 2), Fraction(1, 2), Fraction(1, 2), Fraction(1, 2))
+        >>> h * h
+        -1/2 + 1/2i + 1/2j + 1/2k
+        >>> divmod(HurwitzInteger(3, 5, 7, 9), 2)
+        (3/2 + 5/2i + 7/2j + 9/2k, 0 + 0i + 0j + 0k)
+    '''
+
+    __slots__ = ()
+
+    def __post_init__(self):
+        doubled = tuple(_double(x) for x in (self.scalar, self.i, self.j, self.k))
+        if len({d % 2 for d in doubled}) != 1:
+            raise ValueError('Components must be all integers or all halves of odd integers')
+        for name, d in zip(('scalar', 'i', 'j', 'k'), doubled):
+            object.__setattr__(self, name, _halve(d))
+
+    __repr__ = QuaternionicInteger.__repr__
+    __eq__ = Quaternion.__eq__
+    __hash__ = Quaternion.__hash__
+
+    @classmethod
+    def _from_doubled(cls, doubled) -> HurwitzInteger:
+        return cls._make(*(_halve(d) for d in doubled))
+
+    def _doubled(self) -> tuple[int, int, int, int]:
+        return (_double(self.scalar), _double(self.i), _double(self.j), _double(self.k))
+
+    def __add__(self, other: Quaternion) -> Quaternion:
+        b = _hurwitz_doubled(other)
+        if isinstance(other, (Rational, RationalQuaternion)):
+            return self.to_rational_quaternion() + as_rational_quaternion(other)
+        if b is None:
+            return super().__add__(other)
+        return HurwitzInteger._from_doubled(tuple(x + y for x, y in zip(self._doubled(), b)))
+
+    def __radd__(self, other: Union[float, Quaternion]) -> Quaternion:
+        b = _hurwitz_doubled(other)
+        if isinstance(other, (Rational, RationalQuaternion)):
+            return as_rational_quaternion(other) + self.to_rational_quaternion()
+        if b is None:
+            return super().__radd__(other)
+        return HurwitzInteger._from_doubled(tuple(y + x for x, y in zip(self._doubled(), b)))
+
+    def __neg__(self) -> HurwitzInteger:
+        return HurwitzInteger._make(-self.scalar, -self.i, -self.j, -self.k)
+
+    def __mul__(self, other: Union[float, Quaternion]) -> Quaternion:
+        b = _hurwitz_doubled(other)
+        if isinstance(other, (Rational, RationalQuaternion)):
+            return self.to_rational_quaternion() * as_rational_quaternion(other)
+        if b is None:
+            return super().__mul__(other)
+        return HurwitzInteger._from_doubled(_doubled_product(self._doubled(), b))
+
+    def __rmul__(self, other: Union[float, Quaternion]) -> Quaternion:
+        b = _hurwitz_doubled(other)
+        if isinstance(other, (Rational, RationalQuaternion)):
+            return as_rational_quaternion(other) * self.to_rational_quaternion()
+        if b is None:
+            return super().__rmul__(other)
+        return HurwitzInteger._from_doubled(_doubled_product(b, self._doubled()))
+
+    def __divmod__(self, other: object) -> tuple[HurwitzInteger, HurwitzInteger]:
+        '''Euclidean division, self = q * other + r with r.norm() <= other.norm() / sqrt(2)'''
+        b = _hurwitz_doubled(other)
+        if b is None:
+            return NotImplemented
+        q, r = _hurwitz_divmod(self._doubled(), b, 'right')
+        return HurwitzInteger._from_doubled(q), HurwitzInteger._from_doubled(r)
+
+    def __rdivmod__(self, other: object) -> tuple[HurwitzInteger, HurwitzInteger]:
+        a = _hurwitz_doubled(other)
+        if a is None:
+            return NotImplemented
+        q, r = _hurwitz_divmod(a, self._doubled(), 'right')
+        return HurwitzInteger._from_doubled(q), HurwitzInteger._from_doubled(r)
+
+    def __floordiv__(self, other: object) -> HurwitzInteger:
+        result = self.__divmod__(other)
+        return result if result is NotImplemented else result[0]
+
+    def __rfloordiv__(self, other: object) -> HurwitzInteger:
+        result = self.__rdivmod__(other)
+        return result if result is NotImplemented else result[0]
+
+    def __mod__(self, other: object) -> HurwitzInteger:
+        result = self.__divmod__(other)
+        return result if result is NotImplemented else result[1]
+
+    def __rmod__(self, other: object) -> HurwitzInteger:
+        result = self.__rdivmod__(other)
+        return result if result is NotImplemented else result[1]
+
+    def ldivmod(self, other: object) -> tuple[HurwitzInteger, HurwitzInteger]:
+        '''Euclidean left division, self = other * q + r'''
+        b = _hurwitz_doubled(other)
+        if b is None:
+            raise TypeError('Divisor must be an integer, quaternionic integer or Hurwitz integer')
+        q, r = _hurwitz_divmod(self._doubled(), b, 'left')
+        return HurwitzInteger._from_doubled(q), HurwitzInteger._from_doubled(r)
+
+    def __truediv__(self, other: Union[complex, Quaternion]) -> Quaternion:
+        if rational_components(other) is not None:
+            return _exact(self.to_rational_quaternion() / as_rational_quaternion(other))
+        return super().__truediv__(other)
+
+    def __rtruediv__(self, other: Union[float, Real, Complex, Quaternion]) -> Quaternion:
+        if rational_components(other) is not None:
+            return _exact(as_rational_quaternion(other) / self.to_rational_quaternion())
+        return super().__rtruediv__(other)
+
+    def conjugate(self) -> HurwitzInteger:
+        return HurwitzInteger._make(self.scalar, -self.i, -self.j, -self.k)
+
+    def norm_squared(self) -> int:
+        '''The squared norm, which is always an integer'''
+        return _norm_squared(self._doubled()) // 4
+
+    def reciprocal(self) -> RationalQuaternion:
+        '''The exact multiplicative inverse of the quaternion'''
+        return self.to_rational_quaternion().reciprocal()
+
+    def is_lipschitz(self) -> bool:
+        '''Whether every component is an integer'''
+        return isinstance(self.scalar, int)
+
+    def to_quaternionic_integer(self) -> QuaternionicInteger:
+        '''Convert to a QuaternionicInteger, if every component is an integer'''
+        if not self.is_lipschitz():
+            raise ValueError('Hurwitz integer has half-integer components')
+        return QuaternionicInteger._make(self.scalar, self.i, self.j, self.k)
+
+    def to_rational_quaternion(self) -> RationalQuaternion:
+        '''Convert to a quaternion with Fraction components'''
+        return RationalQuaternion._make(Fraction(self.scalar), Fraction(self.i),
+                                        Fraction(self.j), Fraction(self.k))
+
+
+def gcd(a, b, side='right'):
+    '''Greatest common right (side='right') or left (side='left') divisor of two
+    quaternionic or Hurwitz integers, computed with the Euclidean algorithm in the
+    Hurwitz order.
+
+    The gcd is unique up to multiplication by a unit; the associate returned has
+    integer components and a non-negative scalar.
+    '''
+    return extended_gcd(a, b, side)[0]
+
+
+def extended_gcd(a, b, side='right'):
+    '''Greatest common divisor g of a and b with Bezout coefficients x and y,
+    returned as Hurwitz integers (g, x, y).
+
+    For side='right', g right-divides a and b and g = x * a + y * b.
+    For side='left', g left-divides a and b and g = a * x + b * y.
+    '''
+    if side not in ('right', 'left'):
+        raise ValueError('Side must be either right or left')
+    r0, r1 = _hurwitz_doubled(a), _hurwitz_doubled(b)
+    if r0 is None or r1 is None:
+        raise TypeError('Arguments must be integers, quaternionic integers or Hurwitz integers')
+
+    zero, one = (0, 0, 0, 0), (2, 0, 0, 0)
+    x0, x1, y0, y1 = one, zero, zero, one
+    while any(r1):
+        q, r = _hurwitz_divmod(r0, r1, side)
+        if side == 'right':
+            x0, x1 = x1, _subtract(x0, _doubled_product(q, x1))
+            y0, y1 = y1, _subtract(y0, _doubled_product(q, y1))
+        else:
+            x0, x1 = x1, _subtract(x0, _doubled_product(x1, q))
+            y0, y1 = y1, _subtract(y0, _doubled_product(y1, q))
+        r0, r1 = r1, r
+
+    u = _lipschitz_unit(r0, side)
+    if side == 'right':
+        g, x, y = _doubled_product(u, r0), _doubled_product(u, x0), _doubled_product(u, y0)
+    else:
+        g, x, y = _doubled_product(r0, u), _doubled_product(x0, u), _doubled_product(y0, u)
+    return (HurwitzInteger._from_doubled(g),
+            HurwitzInteger._from_doubled(x),
+            HurwitzInteger._from_doubled(y))
+
+
+def four_square(n):
+    '''A quaternionic integer whose squared norm is n, i.e. a representation of n
+    as a sum of four squares, found with the randomized algorithm of Rabin and Shallit.
+
+    Random x and y are drawn until n - x² - y² is a prime p ≡ 1 (mod 4), which is then
+    split into two squares by the Euclidean algorithm.  The expected running time
+    is polynomial in the number of digits of n.
+    '''
+    if not isinstance(n, Integral) or n < 0:
+        raise ValueError('Argument must be a non-negative integer')
+    n = int(n)
+    if n == 0:
+        return QuaternionicInteger._make(0, 0, 0, 0)
+    scale = 1
+    while n % 4 == 0:
+        n //= 4
+        scale *= 2
+    return QuaternionicInteger._make(*(scale * x for x in _four_square(n)))
+
+
+def factor(q):
+    '''Factor a quaternionic integer into quaternionic integers of prime norm.
+
+    Returns a list of factors whose product, in order, is q.  The norm of q is
+    factored over the integers, and each prime p is lifted to a factor of norm p
+    as the right gcd of the remaining quotient and p in the Hurwitz order.  Units
+    are then moved between neighbouring factors so that every factor has integer
+    components.  A unit is returned as a single factor.
+    '''
+    components = _integer_components(q)
+    if components is None:
+        raise TypeError('Argument must be an integer or quaternionic integer')
+    if not any(components):
+        raise ValueError('Cannot factor zero')
+
+    content = math.gcd(*components)
+    factors = []
+    for p in _prime_factors(content):
+        pi = four_square(p)
+        factors.extend((pi, pi.conjugate()))
+
+    # Peel factors off the right, leaving any factor of norm 2 on the left
+    h = tuple(2 * x // content for x in components)
+    primes = _prime_factors(_norm_squared(h) // 4)
+    primes.sort(key=lambda p: (p == 2, -p))
+    peeled = []
+    for p in primes:
+        pi = _right_gcd((2 * p, 0, 0, 0), h)
+        if _norm_squared(pi) != 4 * p:
+            # p divides h, so any element of norm p is a right divisor
+            pi = tuple(2 * x for x in _four_square(p))
+        h = _hurwitz_divmod(h, pi, 'right')[0]
+        peeled.append(pi)
+    if not peeled:
+        unit = QuaternionicInteger._make(*(x // 2 for x in h))
+        if factors:
+            factors[-1] = factors[-1] * unit
+            return factors
+        return [unit]
+    peeled.reverse()
+    peeled[0] = _doubled_product(h, peeled[0])
+
+    return factors + [QuaternionicInteger._make(*(x // 2 for x in pi))
+                      for pi in _migrate_units(peeled)]
+
+
+def _exact(q):
+    '''An exact quotient, as a QuaternionicInteger if it has integer components'''
+    if isinstance(q, RationalQuaternion) and q.is_integral():
+        return QuaternionicInteger._make(int(q.scalar), int(q.i), int(q.j), int(q.k))
+    return q
+
+# Arithmetic on 4-tuples of integer components
+
+def _conjugate(a):
+    return (a[0], -a[1], -a[2], -a[3])
+
+def _norm_squared(a):
+    return a[0] * a[0] + a[1] * a[1] + a[2] * a[2] + a[3] * a[3]
+
+def _subtract(a, b):
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2], a[3] - b[3])
+
+def _round_quotient(numerator, denominator):
+    '''Each component of numerator / denominator rounded to the nearest integer'''
+    if not denominator:
+        raise ZeroDivisionError('Quaternionic integer division by zero')
+    return tuple((2 * x + denominator) // (2 * denominator) for x in numerator)
+
+def _integer_components(value):
+    '''Components of an integer or quaternionic integer, or None'''
+    if isinstance(value, Integral):
+        return (int(value), 0, 0, 0)
+    if isinstance(value, QuaternionicInteger):
+        return (value.scalar, value.i, value.j, value.k)
+    return None
+
+# Hurwitz integers are handled as "doubled" components, twice the actual values,
+# which are always integers
+
+def _double(x):
+    if isinstance(x, int):
+        return 2 * x
+    d = Fraction(x) * 2
+    if d.denominator != 1:
+        raise ValueError('Components must be all integers or all halves of odd integers')
+    return d.numerator
+
+def _halve(d):
+    return d // 2 if d % 2 == 0 else Fraction(d, 2)
+
+def _hurwitz_doubled(value):
+    '''Doubled components of an integer, quaternionic or Hurwitz integer, or None'''
+    if isinstance(value, Integral):
+        return (2 * int(value), 0, 0, 0)
+    if isinstance(value, QuaternionicInteger):
+        return (2 * value.scalar, 2 * value.i, 2 * value.j, 2 * value.k)
+    if isinstance(value, HurwitzInteger):
+        return value._doubled()
+    return None
+
+def _doubled_product(a, b):
+    '''Doubled components of the product of two doubled Hurwitz integers'''
+    return tuple(x // 2 for x in hamilton_components(a, b))
+
+def _hurwitz_divmod(a, b, side):
+    '''Doubled quotient and remainder with a = q * b + r (right) or a = b * q + r (left),
+    where q is the Hurwitz integer nearest to the exact quotient
+    '''
+    m = _norm_squared(b)
+    if not m:
+        raise ZeroDivisionError('Hurwitz integer division by zero')
+    # The exact quotient is p / m in ordinary, not doubled, components
+    p = hamilton_components(a, _conjugate(b)) if side == 'right' else hamilton_components(_conjugate(b), a)
+    lipschitz = tuple(2 * ((2 * x + m) // (2 * m)) for x in p)
+    half = tuple(2 * (x // m) + 1 for x in p)
+    q = min((lipschitz, half), key=lambda c: sum((2 * x - y * m) ** 2 for x, y in zip(p, c)))
+    if side == 'right':
+        r = _subtract(a, _doubled_product(q, b))
+    else:
+        r = _subtract(a, _doubled_product(b, q))
+    return q, r
+
+# Doubled Hurwitz units, the integer units first
+_UNITS = ((2, 0, 0, 0), (0, 2, 0, 0), (0, 0, 2, 0), (0, 0, 0, 2)) + tuple(
+    (s, i, j, k) for s in (1, -1) for i in (1, -1) for j in (1, -1) for k in (1, -1))
+
+def _lipschitz_unit(a, side):
+    '''A doubled unit u such that u * a (right) or a * u (left) has integer
+    components and a non-negative scalar
+    '''
+    for u in _UNITS:
+        product = _doubled_product(u, a) if side == 'right' else _doubled_product(a, u)
+        if all(x % 2 == 0 for x in product):
+            if product[0] < 0:
+                u = tuple(-x for x in u)
+            return u
+    return _UNITS[0]
+
+def _right_gcd(a, b):
+    '''A doubled greatest common right divisor of two doubled Hurwitz integers'''
+    while any(b):
+        a, b = b, _hurwitz_divmod(a, b, 'right')[1]
+    return a
+
+def _migrate_units(factors):
+    '''Doubled factors with integer components and the same ordered product,
+    obtained by replacing each factor f with conj(v) * f * u for units v, u, where
+    u is the unit chosen for the previous boundary.
+    '''
+    # layers[n] maps each unit u that can follow factor n to (previous unit, factor)
+    layers = []
+    incoming = {_UNITS[0]: None}
+    for n, f in enumerate(factors):
+        outgoing = {}
+        for v in incoming:
+            vf = _doubled_product(_conjugate(v), f)
+            for u in (_UNITS if n < len(factors) - 1 else _UNITS[:1]):
+                if u in outgoing:
+                    continue
+                candidate = _doubled_product(vf, u)
+                if all(x % 2 == 0 for x in candidate):
+                    outgoing[u] = (v, candidate)
+        layers.append(outgoing)
+        incoming = outgoing
+    if _UNITS[0] not in incoming:
+        raise ArithmeticError('No factorization with integer components in this order')
+
+    result = []
+    u = _UNITS[0]
+    for layer in reversed(layers):
+        u, f = layer[u]
+        result.append(f)
+    result.reverse()
+    return result
+
+# Integer number theory
+
+_SMALL_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+# Bases _SMALL_PRIMES make Miller-Rabin deterministic below this bound
+_DETERMINISTIC_BOUND = 3317044064679887385961981
+_PROBABILISTIC_ROUNDS = 16
+# Below this bound four-square representations are found by exhaustive search
+_SEARCH_BOUND = 1024
+
+_random = random.Random()
+
+def _is_prime(n):
+    '''Miller-Rabin primality test, deterministic below _DETERMINISTIC_BOUND'''
+    if n < 2:
+        return False
+    for p in _SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    bases = list(_SMALL_PRIMES)
+    if n >= _DETERMINISTIC_BOUND:
+        bases += [_random.randrange(2, n - 1) for _ in range(_PROBABILISTIC_ROUNDS)]
+    for a in bases:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def _pollard_brent(n):
+    '''A non-trivial factor of an odd composite n, by Brent's variant of Pollard's rho'''
+    while True:
+        y, c, m = _random.randrange(1, n), _random.randrange(1, n), 128
+        g = r = q = 1
+        x = ys = y
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = math.gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = math.gcd(abs(x - ys), n)
+        if g != n:
+            return g
+
+def _prime_factors(n):
+    '''The prime factors of a positive integer with multiplicity, in ascending order'''
+    factors = []
+    for p in _SMALL_PRIMES:
+        while n % p == 0:
+            factors.append(p)
+            n //= p
+    stack = [n] if n > 1 else []
+    while stack:
+        m = stack.pop()
+        if _is_prime(m):
+            factors.append(m)
+            continue
+        root = math.isqrt(m)
+        d = root if root * root == m else _pollard_brent(m)
+        stack.extend((d, m // d))
+    factors.sort()
+    return factors
+
+def _two_square_prime(p):
+    '''(a, b) with a² + b² = p for p = 1 or a prime p ≡ 1 (mod 4)'''
+    if p == 1:
+        return 1, 0
+    while True:
+        t = pow(_random.randrange(2, p - 1), (p - 1) // 4, p)
+        if t * t % p == p - 1:
+            break
+    a, b = p, t
+    limit = math.isqrt(p)
+    while b > limit:
+        a, b = b, a % b
+    return b, math.isqrt(p - b * b)
+
+def _four_square(n):
+    '''Four integers whose squares sum to n, where n is not divisible by 4'''
+    if n < _SEARCH_BOUND:
+        for a in range(math.isqrt(n), -1, -1):
+            for b in range(math.isqrt(n - a * a), -1, -1):
+                for c in range(math.isqrt(n - a * a - b * b), -1, -1):
+                    rest = n - a * a - b * b - c * c
+                    d = math.isqrt(rest)
+                    if d * d == rest:
+                        return a, b, c, d
+    root = math.isqrt(n)
+    while True:
+        x = _random.randint(0, root)
+        y = _random.randint(0, math.isqrt(n - x * x))
+        p = n - x * x - y * y
+        if p % 4 == 1 and (p == 1 or _is_prime(p)):
+            return (x, y) + _two_square_prime(p)
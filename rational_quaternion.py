@@ -0,0 +1,130 @@
+'''Defines RationalQuaternion class'''
+
+from __future__ import absolute_import, annotations
+
+from dataclasses import dataclass
+from fractions import Fraction
+from numbers import Complex, Rational, Real
+from typing import Union
+
+from quaternion import Quaternion, hamilton_components
+
+
+@dataclass(frozen=True)
+class RationalQuaternion(Quaternion):
+
+    '''Quaternions with rational coefficients, stored as Fractions.
+
+    Arithmetic with integers, Fractions, quaternionic integers and other rational
+    quaternions is exact, and so is division, which makes this the result type of
+    exact division of quaternionic integers.  Arithmetic with floats or
+    float-valued quaternions falls back to Quaternion.
+
+        >>> q = RationalQuaternion(1, 2, 3, 4)
+        >>> q.reciprocal()
+        1/30 - 1/15i - 1/10j - 2/15k
+        >>> q * q.reciprocal() == 1
+        True
+    '''
+
+    __slots__ = ()
+
+    def __post_init__(self):
+        object.__setattr__(self, 'scalar', Fraction(self.scalar))
+        object.__setattr__(self, 'i', Fraction(self.i))
+        object.__setattr__(self, 'j', Fraction(self.j))
+        object.__setattr__(self, 'k', Fraction(self.k))
+
+    def __repr__(self):
+
+        i_sign = '-' if self.i < 0 else '+'
+        j_sign = '-' if self.j < 0 else '+'
+        k_sign = '-' if self.k < 0 else '+'
+
+        i_part = f'{i_sign} {abs(self.i)}i'
+        j_part = f'{j_sign} {abs(self.j)}j'
+        k_part = f'{k_sign} {abs(self.k)}k'
+
+        return ' '.join([str(self.scalar), i_part, j_part, k_part])
+
+    __eq__ = Quaternion.__eq__
+    __hash__ = Quaternion.__hash__
+
+    def __add__(self, other: Quaternion) -> Quaternion:
+        b = rational_components(other)
+        if b is None:
+            return super().__add__(other)
+        return RationalQuaternion._make(self.scalar + b[0], self.i + b[1], self.j + b[2], self.k + b[3])
+
+    def __radd__(self, other: Union[float, Quaternion]) -> Quaternion:
+        b = rational_components(other)
+        if b is None:
+            return super().__radd__(other)
+        return RationalQuaternion._make(b[0] + self.scalar, b[1] + self.i, b[2] + self.j, b[3] + self.k)
+
+    def __neg__(self) -> RationalQuaternion:
+        return RationalQuaternion._make(-self.scalar, -self.i, -self.j, -self.k)
+
+    def __mul__(self, other: Union[float, Quaternion]) -> Quaternion:
+        b = rational_components(other)
+        if b is None:
+            return super().__mul__(other)
+        return RationalQuaternion._make(*hamilton_components((self.scalar, self.i, self.j, self.k), b))
+
+    def __rmul__(self, other: Union[float, Quaternion]) -> Quaternion:
+        b = rational_components(other)
+        if b is None:
+            return super().__rmul__(other)
+        return RationalQuaternion._make(*hamilton_components(b, (self.scalar, self.i, self.j, self.k)))
+
+    def __truediv__(self, other: Union[complex, Quaternion]) -> Quaternion:
+        b = rational_components(other)
+        if b is None:
+            return super().__truediv__(other)
+        return self * _reciprocal(b)
+
+    def __rtruediv__(self, other: Union[float, Real, Complex, Quaternion]) -> Quaternion:
+        b = rational_components(other)
+        if b is None:
+            return super().__rtruediv__(other)
+        return RationalQuaternion._make(*b) * self.reciprocal()
+
+    def conjugate(self) -> RationalQuaternion:
+        return RationalQuaternion._make(self.scalar, -self.i, -self.j, -self.k)
+
+    def reciprocal(self) -> RationalQuaternion:
+        '''The exact multiplicative inverse of the quaternion'''
+        return _reciprocal((self.scalar, self.i, self.j, self.k))
+
+    def is_integral(self) -> bool:
+        '''Whether every component is an integer'''
+        return all(int(x) == x for x in (self.scalar, self.i, self.j, self.k))
+
+
+def rational_components(value) -> Union[tuple[Fraction, Fraction, Fraction, Fraction], None]:
+    '''The components of a rational number, or of a quaternion whose components are all
+    rational, as Fractions; None for anything else, including floats
+    '''
+    if isinstance(value, Rational):
+        return (Fraction(value), Fraction(0), Fraction(0), Fraction(0))
+    if isinstance(value, Quaternion) and not isinstance(value, Complex):
+        components = (value.scalar, value.i, value.j, value.k)
+        if all(isinstance(x, Rational) for x in components):
+            return (Fraction(components[0]), Fraction(components[1]),
+                    Fraction(components[2]), Fraction(components[3]))
+    return None
+
+
+def as_rational_quaternion(value) -> RationalQuaternion:
+    '''A rational number or rational-valued quaternion as a RationalQuaternion'''
+    components = rational_components(value)
+    if components is None:
+        raise TypeError('Argument must be a rational number or have rational components')
+    return RationalQuaternion._make(*components)
+
+
+def _reciprocal(a) -> RationalQuaternion:
+    n = a[0] * a[0] + a[1] * a[1] + a[2] * a[2] + a[3] * a[3]
+    if not n:
+        raise ZeroDivisionError('RationalQuaternion reciprocal of zero')
+    return RationalQuaternion._make(a[0] / n, -a[1] / n, -a[2] / n, -a[3] / n)
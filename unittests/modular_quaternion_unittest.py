@@ -0,0 +1,145 @@
+'''Unit tests for modular_quaternion.py'''
+
+from __future__ import absolute_import
+from __future__ import division
+
+import random
+import unittest
+import numpy
+from modular_quaternion import ModularQuaternion, ModularQuaternionArray, MAX_ARRAY_MODULUS
+from quaternionic_integer import QuaternionicInteger
+from quaternion import Quaternion
+
+
+class ModularQuaternionTestCase(unittest.TestCase):
+    '''Unit tests for ModularQuaternion'''
+
+    def setUp(self):
+        self.Z7 = ModularQuaternion.modulo(7)
+        self.Z11 = ModularQuaternion.modulo(11)
+        self.q1 = self.Z7(1, 2, 3, 4)
+        self.q2 = self.Z7(6, 0, 5, 1)
+        self.iq1 = QuaternionicInteger(1, 2, 3, 4)
+        self.iq2 = QuaternionicInteger(6, 0, 5, 1)
+
+    def reduce(self, iq, family):
+        return family(iq.scalar, iq.i, iq.j, iq.k)
+
+    def test_instantiation(self):
+        self.assertIs(ModularQuaternion.modulo(7), self.Z7)
+        self.assertEqual(self.Z7(8, -1, 14, 22), self.Z7(1, 6, 0, 1))
+        self.assertIsInstance(self.q1, Quaternion)
+        self.assertEqual(repr(self.q1), '1 + 2i + 3j + 4k (mod 7)')
+        with self.assertRaises(ValueError):
+            ModularQuaternion.modulo(1)
+        with self.assertRaises(TypeError):
+            ModularQuaternion(1, 2, 3, 4)
+
+    def test_arithmetic(self):
+        self.assertEqual(self.q1 * self.q2, self.reduce(self.iq1 * self.iq2, self.Z7))
+        self.assertEqual(self.q2 * self.q1, self.reduce(self.iq2 * self.iq1, self.Z7))
+        self.assertEqual(self.q1 + self.q2, self.reduce(self.iq1 + self.iq2, self.Z7))
+        self.assertEqual(self.q1 - self.q2, self.reduce(self.iq1 - self.iq2, self.Z7))
+        self.assertEqual(3 - self.q1, self.reduce(3 - self.iq1, self.Z7))
+        self.assertEqual(-self.q1, self.reduce(-self.iq1, self.Z7))
+        self.assertEqual(self.q1 * self.iq2, self.q1 * self.q2)
+        self.assertEqual(10 * self.q1, 3 * self.q1)
+        self.assertEqual(self.q1.conjugate(), self.reduce(self.iq1.conjugate(), self.Z7))
+        self.assertEqual(self.q1 + 6, self.Z7(0, 2, 3, 4))
+
+    def test_incompatible_operands(self):
+        with self.assertRaises(TypeError):
+            self.q1 + self.Z11(1)  # pylint: disable=pointless-statement
+        with self.assertRaises(TypeError):
+            self.q1 * 1.5  # pylint: disable=pointless-statement
+        with self.assertRaises(TypeError):
+            self.q1 * Quaternion(1.5)  # pylint: disable=pointless-statement
+        self.assertNotEqual(self.Z7(1), self.Z11(1))
+
+    def test_reciprocal(self):
+        self.assertEqual(self.q1 * self.q1.reciprocal(), self.Z7(1))
+        self.assertEqual(self.q1.reciprocal() * self.q1, self.Z7(1))
+        self.assertEqual((self.q1 * self.q2) / self.q2, self.q1)
+        self.assertEqual(1 / self.q2, self.q2.reciprocal())
+        self.assertEqual(self.q1.norm_squared(), 30 % 7)
+        # norm 1 + 4 + 1 + 1 = 7 = 0 (mod 7)
+        with self.assertRaises(ZeroDivisionError):
+            self.Z7(1, 2, 1, 1).reciprocal()
+
+    def test_power(self):
+        expected = self.Z7(1)
+        for n in range(12):
+            self.assertEqual(self.q1 ** n, expected)
+            expected = expected * self.q1
+        self.assertEqual(self.q1 ** -3, (self.q1 ** 3).reciprocal())
+        big = ModularQuaternion.modulo(2 ** 127 - 1)(3, 1, 4, 1)
+        self.assertEqual(big ** (2 ** 100) * big ** 5, big ** (2 ** 100 + 5))
+
+    def test_hash(self):
+        self.assertEqual(len({self.Z7(1, 2, 3, 4), self.Z7(8, 9, 10, 11), self.Z11(1, 2, 3, 4)}), 2)
+        # Equal values hash equally, so only quaternions of the same family are equal
+        for other in (1, 8, 1.0, 1 + 0j, Quaternion(1), self.Z11(1)):
+            self.assertNotEqual(self.Z7(1), other)
+            self.assertNotEqual(other, self.Z7(1))
+            self.assertEqual(len({self.Z7(1), other}), 2)
+        self.assertEqual(self.Z7(1) + 7, self.Z7(8))
+
+
+class ModularQuaternionArrayTestCase(unittest.TestCase):
+    '''Unit tests for ModularQuaternionArray'''
+
+    def setUp(self):
+        self.p = 1000003
+        rng = random.Random(5)
+        self.rows1 = [[rng.randrange(self.p) for _ in range(4)] for _ in range(50)]
+        self.rows2 = [[rng.randrange(self.p) for _ in range(4)] for _ in range(50)]
+        self.family = ModularQuaternion.modulo(self.p)
+        self.qa1 = ModularQuaternionArray(self.rows1, self.p)
+        self.qa2 = ModularQuaternionArray(self.rows2, self.p)
+        self.qs1 = [self.family(*row) for row in self.rows1]
+        self.qs2 = [self.family(*row) for row in self.rows2]
+
+    def test_instantiation(self):
+        self.assertEqual(self.qa1.components.dtype, numpy.int64)
+        self.assertEqual(len(ModularQuaternionArray([], 7)), 0)
+        self.assertEqual(ModularQuaternionArray([[8, -1, 0, 0]], 7)[0], ModularQuaternion.modulo(7)(1, 6))
+        self.assertEqual(ModularQuaternionArray.from_quaternions(self.qs1, self.p), self.qa1)
+        self.assertEqual(self.qa1.to_quaternions(), self.qs1)
+        with self.assertRaises(ValueError):
+            ModularQuaternionArray([[1, 2, 3, 4]], MAX_ARRAY_MODULUS + 1)
+        with self.assertRaises(ValueError):
+            ModularQuaternionArray([1, 2, 3], 7)
+        with self.assertRaises(TypeError):
+            ModularQuaternionArray.from_quaternions([1.5], 7)
+
+    def test_arithmetic(self):
+        self.assertEqual(list(self.qa1 * self.qa2), [a * b for a, b in zip(self.qs1, self.qs2)])
+        self.assertEqual(list(self.qa1 + self.qa2), [a + b for a, b in zip(self.qs1, self.qs2)])
+        self.assertEqual(list(self.qa1 - self.qa2), [a - b for a, b in zip(self.qs1, self.qs2)])
+        self.assertEqual(list(self.qs2[0] * self.qa1), [self.qs2[0] * a for a in self.qs1])
+        self.assertEqual(list(5 - self.qa1), [5 - a for a in self.qs1])
+        self.assertEqual(list(-self.qa1), [-a for a in self.qs1])
+        self.assertEqual(list(self.qa1.conjugate()), [a.conjugate() for a in self.qs1])
+        with self.assertRaises(TypeError):
+            self.qa1 * ModularQuaternionArray(self.rows1, 7)  # pylint: disable=pointless-statement
+
+    def test_extreme_modulus(self):
+        p = MAX_ARRAY_MODULUS
+        qa = ModularQuaternionArray([[p - 1] * 4], p)
+        q = ModularQuaternion.modulo(p)(*[p - 1] * 4)
+        self.assertEqual(qa * qa, ModularQuaternionArray.from_quaternions([q * q], p))
+
+    def test_power(self):
+        self.assertEqual(list(self.qa1 ** 1000), [a ** 1000 for a in self.qs1])
+        self.assertEqual(list(self.qa1 ** 0), [self.family(1)] * 50)
+
+    def test_reciprocal(self):
+        self.assertEqual(list(self.qa1.reciprocal()), [a.reciprocal() for a in self.qs1])
+        self.assertEqual(list(self.qa1 / self.qa2), [a / b for a, b in zip(self.qs1, self.qs2)])
+        self.assertEqual(list(self.qa1.norm_squared()), [a.norm_squared() for a in self.qs1])
+        with self.assertRaises(ZeroDivisionError):
+            ModularQuaternionArray([[1, 2, 1, 1], [1, 0, 0, 0]], 7).reciprocal()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+'''Unit tests for quaternion_array.py'''
+
+from __future__ import absolute_import
+from __future__ import division
+
+import struct
+import sys
+import unittest
+import numpy
+from quaternion import Quaternion
+from quaternion_array import QuaternionArray, to_numpy, from_numpy, cumulative_product, hamilton_product
+from quaternion_array import pairwise_angles, principal_eigenvector, unit_components
+
+
+class QuaternionArrayTestCase(unittest.TestCase):
+    '''Unit tests for quaternion_array.py'''
+
+    def setUp(self):
+        self.q1 = Quaternion(3.7, 17.1, -2.4, 4.8)
+        self.q2 = Quaternion(-5, 0, 10, -5)
+        self.q3 = Quaternion(12.4, -10, -41.23, -1.213)
+        self.qa1 = QuaternionArray.from_quaternions([self.q1, self.q2, self.q3])
+        self.qa2 = QuaternionArray.from_quaternions([self.q3, self.q1, self.q2])
+        self.c = 10 - 5.3j #complex
+        self.i = 8 #int
+        self.f = -2.4 #float
+
+    #determines if each quaternion in the array is equal to the corresponding
+    #quaternion in the list to a significance of 1e-7
+    def assert_array_equal(self, qa, quaternions):
+        self.assertIsInstance(qa, QuaternionArray)
+        self.assertEqual(len(qa), len(quaternions))
+        for q1, q2 in zip(qa, quaternions):
+            self.assertAlmostEqual(q1.scalar, q2.scalar)
+            self.assertAlmostEqual(q1.i, q2.i)
+            self.assertAlmostEqual(q1.j, q2.j)
+            self.assertAlmostEqual(q1.k, q2.k)
+
+    def test_instantiation(self):
+        self.assertEqual(self.qa1.components.shape, (3, 4))
+        self.assertEqual(len(QuaternionArray()), 0)
+        self.assertEqual(QuaternionArray([[1, 2, 3, 4]])[0], Quaternion(1, 2, 3, 4))
+        with self.assertRaises(ValueError):
+            QuaternionArray([1, 2, 3])
+        with self.assertRaises(TypeError):
+            QuaternionArray.from_quaternions(['a'])
+
+    def test_round_trip(self):
+        self.assertEqual(self.qa1.to_quaternions(), [self.q1, self.q2, self.q3])
+        self.assertEqual(list(self.qa1), [self.q1, self.q2, self.q3])
+        self.assertEqual(self.qa1[1], self.q2)
+        self.assertEqual(self.qa1[1:], QuaternionArray.from_quaternions([self.q2, self.q3]))
+
+    def test_to_from_numpy(self):
+        arr = to_numpy([self.q1, self.q2, self.q3])
+        self.assertTrue(numpy.array_equal(arr, self.qa1.components))
+        self.assertTrue(numpy.array_equal(to_numpy(iter([self.q1, 2, 1 - 3j])),
+                                          [self.q1.to_list(), [2, 0, 0, 0], [1, -3, 0, 0]]))
+        self.assertEqual(to_numpy([]).shape, (0, 4))
+        self.assertEqual(to_numpy([self.q1], dtype=numpy.float32).dtype, numpy.float32)
+        self.assertEqual(from_numpy(arr), [self.q1, self.q2, self.q3])
+        self.assertEqual(from_numpy(arr[0]), self.q1)
+        self.assertEqual(from_numpy(numpy.empty((0, 4))), [])
+        with self.assertRaises(TypeError):
+            to_numpy([self.q1, 'a'])
+        with self.assertRaises(ValueError):
+            from_numpy(numpy.zeros((2, 3)))
+
+    def test_array_protocols(self):
+        arr = numpy.asarray(self.qa1)
+        self.assertIs(arr, self.qa1.components)
+        self.assertEqual(numpy.asarray(self.qa1, dtype=numpy.float32).dtype, numpy.float32)
+        self.assertIsNot(numpy.array(self.qa1), self.qa1.components)
+        if numpy.lib.NumpyVersion(numpy.__version__) >= '2.0.0':
+            with self.assertRaises(ValueError):
+                numpy.asarray(self.qa1, dtype=numpy.float32, copy=False)
+
+    def test_zero_copy_access(self):
+        #__array__ and the components' buffer work on every supported Python
+        for qa in (self.qa1, self.qa1[::2]):
+            self.assertTrue(numpy.shares_memory(numpy.asarray(qa), self.qa1.components))
+        view = memoryview(self.qa1.components)
+        self.assertEqual(struct.unpack_from('4d', view, 8 * 4), tuple(self.q2.to_list()))
+        self.assertTrue(numpy.shares_memory(numpy.frombuffer(view), self.qa1.components))
+
+    @unittest.skipIf(sys.version_info < (3, 12), '__buffer__ needs Python 3.12')
+    def test_buffer_protocol(self):
+        view = memoryview(self.qa1)
+        self.assertEqual((view.format, view.shape), ('d', (3, 4)))
+        self.assertEqual(view.tolist(), self.qa1.components.tolist())
+        self.assertTrue(numpy.shares_memory(numpy.frombuffer(view), self.qa1.components))
+        self.assertEqual(memoryview(self.qa1[::2]).tolist(), self.qa1.components[::2].tolist())
+
+    def test_from_strings(self):
+        lines = [repr(self.q1), 'q', '', repr(self.q2), '4 + x']
+        qa, malformed = QuaternionArray.from_strings(iter(lines))
+        self.assertEqual(qa, QuaternionArray.from_quaternions([self.q1, self.q2]))
+        self.assertEqual(malformed, [(1, 'q'), (4, '4 + x')])
+        qa, malformed = QuaternionArray.from_strings([])
+        self.assertEqual(len(qa), 0)
+        self.assertEqual(malformed, [])
+
+    def test_addition(self):
+        self.assert_array_equal(self.qa1 + self.qa2,
+                                [self.q1 + self.q3, self.q2 + self.q1, self.q3 + self.q2])
+        self.assert_array_equal(self.qa1 + self.q2, [q + self.q2 for q in self.qa1])
+        self.assert_array_equal(self.q2 + self.qa1, [self.q2 + q for q in self.qa1])
+        self.assert_array_equal(self.qa1 + self.c, [q + self.c for q in self.qa1])
+        self.assert_array_equal(self.c + self.qa1, [self.c + q for q in self.qa1])
+        self.assert_array_equal(self.i + self.qa1, [self.i + q for q in self.qa1])
+
+    def test_subtraction(self):
+        self.assert_array_equal(self.qa1 - self.qa2,
+                                [self.q1 - self.q3, self.q2 - self.q1, self.q3 - self.q2])
+        self.assert_array_equal(self.qa1 - self.f, [q - self.f for q in self.qa1])
+        self.assert_array_equal(self.f - self.qa1, [self.f - q for q in self.qa1])
+        self.assert_array_equal(-self.qa1, [-q for q in self.qa1])
+
+    def test_multiplication(self):
+        self.assert_array_equal(self.qa1 * self.qa2,
+                                [self.q1 * self.q3, self.q2 * self.q1, self.q3 * self.q2])
+        self.assert_array_equal(self.qa1 * self.q2, [q * self.q2 for q in self.qa1])
+        self.assert_array_equal(self.q2 * self.qa1, [self.q2 * q for q in self.qa1])
+        self.assert_array_equal(self.qa1 * self.c, [q * self.c for q in self.qa1])
+        self.assert_array_equal(self.c * self.qa1, [self.c * q for q in self.qa1])
+        self.assert_array_equal(self.f * self.qa1, [self.f * q for q in self.qa1])
+        self.assert_array_equal(numpy.float64(self.f) * self.qa1, [self.f * q for q in self.qa1])
+
+    def test_division(self):
+        self.assert_array_equal(self.qa1 / self.qa2,
+                                [self.q1 / self.q3, self.q2 / self.q1, self.q3 / self.q2])
+        self.assert_array_equal(self.qa1 / self.q2, [q / self.q2 for q in self.qa1])
+        self.assert_array_equal(self.qa1 / self.c, [q / self.c for q in self.qa1])
+        self.assert_array_equal(self.c / self.qa1, [self.c / q for q in self.qa1])
+        self.assert_array_equal(self.qa1 / self.i, [q / self.i for q in self.qa1])
+
+    def test_norm(self):
+        norms = self.qa1.norm()
+        for norm, q in zip(norms, self.qa1):
+            self.assertAlmostEqual(norm, q.norm())
+        self.assertTrue(numpy.array_equal(abs(self.qa1), norms))
+
+    def test_conjugate(self):
+        self.assert_array_equal(self.qa1.conjugate(), [q.conjugate() for q in self.qa1])
+
+    def test_reciprocal(self):
+        self.assert_array_equal(self.qa1.reciprocal(), [q.reciprocal() for q in self.qa1])
+        self.assert_array_equal(self.qa1 * self.qa1.reciprocal(), [Quaternion(1)] * 3)
+
+    def test_unit(self):
+        qa = QuaternionArray.from_quaternions([self.q1, Quaternion()])
+        self.assert_array_equal(qa.unit(), [self.q1.unit(), Quaternion()])
+        numpy.testing.assert_array_equal(unit_components(qa.components), qa.unit().components)
+        numpy.testing.assert_allclose(unit_components(numpy.array([0.0, 3, 0, 4])), [0, 0.6, 0, 0.8])
+
+    def test_principal_eigenvector(self):
+        u = self.q2.unit().to_list()
+        matrices = numpy.stack([numpy.outer(u, u) * 3 + numpy.eye(4), numpy.diag([1.0, 4, 2, 3])])
+        vectors = principal_eigenvector(matrices)
+        numpy.testing.assert_allclose(vectors[0], numpy.negative(u), atol=1e-12)
+        numpy.testing.assert_allclose(vectors[1], [0, 1, 0, 0], atol=1e-12)
+
+    def test_pairwise_angles(self):
+        units = self.qa1.unit().components
+        others = numpy.concatenate([units, -units[:1], units[1:2] + 1e-9])
+        angles = pairwise_angles(units, others)
+        self.assertEqual(angles.shape, (3, 5))
+        for m, v in enumerate(others):
+            for n, u in enumerate(units):
+                expected = 2 * numpy.arctan2(numpy.linalg.norm(u - v), numpy.linalg.norm(u + v))
+                self.assertAlmostEqual(angles[n, m], expected, places=12)
+        self.assertTrue(numpy.all(numpy.diag(angles) == 0))
+        self.assertEqual(angles[0, 3], numpy.pi)
+        rotations = pairwise_angles(units, others, rotations=True)
+        numpy.testing.assert_allclose(rotations, numpy.minimum(angles, numpy.pi - angles), atol=1e-12)
+        self.assertEqual(rotations[0, 3], 0)
+
+    def test_cumulative_product(self):
+        products = cumulative_product(self.qa1.components)
+        self.assert_array_equal(QuaternionArray(products),
+                                [self.q1, self.q1 * self.q2, self.q1 * self.q2 * self.q3])
+        self.assertEqual(cumulative_product(numpy.empty((0, 4))).shape, (0, 4))
+
+        #long arrays are scanned in blocks, stacked arrays along the first axis
+        rng = numpy.random.default_rng(2)
+        components = rng.normal(size=(20000, 2, 4))
+        components /= numpy.linalg.norm(components, axis=-1, keepdims=True)
+        expected = components.copy()
+        for n in range(1, len(expected)):
+            expected[n] = hamilton_product(expected[n - 1], expected[n])
+        numpy.testing.assert_allclose(cumulative_product(components), expected, atol=1e-11)
+        numpy.testing.assert_allclose(cumulative_product(components[:100]), expected[:100], atol=1e-13)
+
+    def test_inappropriate_type(self):
+        with self.assertRaises(TypeError):
+            self.qa1 + 'a'  # pylint: disable=pointless-statement
+        with self.assertRaises(TypeError):
+            self.qa1 * [1, 2]  # pylint: disable=pointless-statement
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+'''Unit tests for quaternion_clustering.py'''
+
+from __future__ import absolute_import
+from __future__ import division
+
+import math
+import unittest
+import numpy
+from quaternion import MIN_TOLERANCE, Quaternion
+from quaternion_array import QuaternionArray
+from quaternion_clustering import distance_matrix, kmeans, kmedoids, deduplicate
+
+
+class QuaternionClusteringTestCase(unittest.TestCase):
+    '''Unit tests for quaternion_clustering.py'''
+
+    def setUp(self):
+        rng = numpy.random.default_rng(3)
+        self.centers = rng.normal(size=(5, 4))
+        self.centers /= numpy.linalg.norm(self.centers, axis=1, keepdims=True)
+        #40 noisy copies of each center with random signs, shuffled
+        self.truth = numpy.repeat(numpy.arange(5), 40)
+        rng.shuffle(self.truth)
+        noise = rng.normal(scale=0.01, size=(200, 4))
+        self.samples = (self.centers[self.truth] + noise) * rng.choice([-1, 1], size=(200, 1))
+
+    def assert_same_partition(self, labels, truth):
+        pairs = set(zip(labels.tolist(), truth.tolist()))
+        self.assertEqual(len(pairs), len(set(labels.tolist())))
+        self.assertEqual(len(pairs), len(set(truth.tolist())))
+
+    def test_distance_matrix(self):
+        q = Quaternion(1, 2, 3, 4)
+        r = Quaternion(0, 1, 0, 0)
+        distances = distance_matrix([q, -q, 2 * r], [q, r])
+        self.assertEqual(distances.shape, (3, 2))
+        numpy.testing.assert_allclose(distances[:, 0], [0, 0, math.acos(2 / math.sqrt(30))], atol=1e-12)
+        self.assertEqual(distances[:2, 0].tolist(), [0, 0])
+        self.assertAlmostEqual(distances[2, 1], 0)
+        self.assertTrue(numpy.all(distances <= math.pi / 2))
+        with self.assertRaises(ValueError):
+            distance_matrix([q, Quaternion(0)])
+        with self.assertRaises(TypeError):
+            distance_matrix(q)
+
+    def test_kmeans(self):
+        centers, labels = kmeans(self.samples, 5, seed=0)
+        self.assertIsInstance(centers, QuaternionArray)
+        self.assert_same_partition(labels, self.truth)
+        #the centers recover the true rotations, whatever the signs of the samples
+        self.assertLess(distance_matrix(centers, self.centers).min(axis=1).max(), 0.01)
+        self.assertTrue(numpy.all(centers.components[:, 0] >= 0))
+
+        centers, labels = kmeans(QuaternionArray(self.samples), 1)
+        self.assertEqual(len(centers), 1)
+        self.assertTrue(numpy.all(labels == 0))
+        with self.assertRaises(ValueError):
+            kmeans(self.samples, 0)
+        with self.assertRaises(ValueError):
+            kmeans(self.samples[:3], 4)
+
+    def test_kmedoids(self):
+        medoids, labels = kmedoids(self.samples, 5, seed=0)
+        self.assert_same_partition(labels, self.truth)
+        self.assertEqual(sorted(self.truth[medoids].tolist()), [0, 1, 2, 3, 4])
+        #each medoid has the least total distance to the rest of its cluster
+        for cluster, medoid in enumerate(medoids):
+            members = numpy.flatnonzero(labels == cluster)
+            totals = distance_matrix(self.samples[members]).sum(axis=1)
+            self.assertAlmostEqual(totals.min(), totals[members.tolist().index(medoid)])
+
+    def test_deduplicate(self):
+        kept, labels = deduplicate(self.samples, 0.1)
+        self.assertEqual(len(kept), 5)
+        self.assert_same_partition(labels, self.truth)
+        #earlier rotations take precedence
+        self.assertEqual(kept.tolist(), sorted(numpy.unique(self.truth, return_index=True)[1]))
+
+        qs = [Quaternion(1), Quaternion(1), Quaternion(-2), Quaternion(0, 1, 0, 0), Quaternion(0, -1, 0, 0)]
+        self.assertEqual([array.tolist() for array in deduplicate(qs, 0)], [[0, 3], [0, 0, 0, 1, 1]])
+        self.assertEqual(deduplicate(qs, math.pi / 2)[0].tolist(), [0])
+        self.assertEqual([len(array) for array in deduplicate([], 0.1)], [0, 0])
+        #tolerances below MIN_TOLERANCE act as it
+        turns = [Quaternion(math.cos(angle), 0, 0, math.sin(angle))
+                 for angle in [0, 1e-9, -0.5 * MIN_TOLERANCE, 2 * MIN_TOLERANCE]]
+        for tolerance in [0, 1e-10]:
+            self.assertEqual(deduplicate(turns, tolerance)[1].tolist(), [0, 0, 0, 1])
+        with self.assertRaises(ValueError):
+            deduplicate(qs, -0.1)
+
+    def test_deduplicate_tolerance(self):
+        #compare with a brute force greedy pass, including rotations near the
+        #equator, where q and -q are close to different grid cells
+        rng = numpy.random.default_rng(4)
+        samples = rng.normal(size=(400, 4))
+        samples[:100, 0] *= 1e-3
+        distances = distance_matrix(samples)
+        for tolerance in [0.05, 0.3, 1.0]:
+            kept, labels = deduplicate(samples, tolerance)
+            expected = []
+            for n in range(len(samples)):
+                near = [distances[n, m] for m in expected if distances[n, m] <= tolerance]
+                if not near:
+                    expected.append(n)
+                else:
+                    self.assertAlmostEqual(distances[n, kept[labels[n]]], min(near))
+            self.assertEqual(kept.tolist(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
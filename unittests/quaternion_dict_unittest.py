@@ -0,0 +1,106 @@
+'''Unit tests for quaternion_dict.py'''
+
+from __future__ import absolute_import
+from __future__ import division
+
+import math
+import unittest
+import numpy
+from quaternion import MIN_TOLERANCE, Quaternion
+from quaternionic_integer import QuaternionicInteger
+from quaternion_clustering import distance_matrix
+from quaternion_dict import QuaternionDict
+
+
+class QuaternionDictTestCase(unittest.TestCase):
+    '''Unit tests for quaternion_dict.py'''
+
+    def setUp(self):
+        self.q1 = Quaternion(3.7, 17.1, -2.4, 4.8)
+        self.q2 = Quaternion(-5, 0, 10, -5)
+        self.qdict = QuaternionDict(1e-6, [(self.q1, 'a'), (self.q2, 'b')])
+
+    def test_lookup(self):
+        self.assertEqual(len(self.qdict), 2)
+        self.assertEqual(self.qdict[self.q1], 'a')
+        #values that differ by rounding, multiples and negatives find the same key
+        self.assertEqual(self.qdict[self.q1 + Quaternion(1e-12, 0, 0, 1e-12)], 'a')
+        self.assertEqual(self.qdict[-2 * self.q2], 'b')
+        self.assertEqual(self.qdict[QuaternionicInteger(1, 0, -2, 1)], 'b')
+        self.assertIs(self.qdict.find(-self.q1), self.q1)
+        self.assertIsNone(self.qdict.find(self.q1 + Quaternion(0, 0.1, 0, 0)))
+        self.assertNotIn(Quaternion(1), self.qdict)
+        self.assertEqual(self.qdict.get(Quaternion(1), 'c'), 'c')
+        with self.assertRaises(KeyError):
+            self.qdict[Quaternion(0, 1, 0, 0)]
+        with self.assertRaises(ZeroDivisionError):
+            self.qdict[Quaternion(0)]
+        with self.assertRaises(TypeError):
+            self.qdict['a']
+
+        qdict = QuaternionDict(1e-6, {2: 'real', 1j: 'complex'})
+        self.assertEqual(qdict[Quaternion(-1)], 'real')
+        self.assertEqual(qdict[Quaternion(0, 3)], 'complex')
+
+    def test_assignment(self):
+        #assigning to a matching quaternion keeps the stored key
+        self.qdict[-self.q1 * (1 + 1e-12)] = 'c'
+        self.assertEqual(list(self.qdict.items()), [(self.q1, 'c'), (self.q2, 'b')])
+        self.assertEqual(self.qdict.setdefault(self.q2 * 3, 'd'), 'b')
+        self.qdict[Quaternion(1)] = 'e'
+        self.assertEqual(list(self.qdict), [self.q1, self.q2, Quaternion(1)])
+
+        del self.qdict[-self.q1]
+        self.assertEqual(list(self.qdict.values()), ['b', 'e'])
+        with self.assertRaises(KeyError):
+            del self.qdict[self.q1]
+        self.assertEqual(self.qdict.pop(Quaternion(-1)), 'e')
+        self.assertEqual(len(self.qdict), 1)
+        self.assertEqual(repr(self.qdict), f"QuaternionDict(1e-06, {{{self.q2!r}: 'b'}})")
+        with self.assertRaises(ValueError):
+            QuaternionDict(-1)
+
+    def test_tolerance(self):
+        #compare with a brute force search, including rotations near the equator,
+        #where q and -q have different bucket keys
+        rng = numpy.random.default_rng(7)
+        samples = rng.normal(size=(600, 4))
+        samples[:200, 0] *= 1e-3
+        samples[200:300] *= -1
+        quaternions = [Quaternion(*row) for row in samples.tolist()]
+        for tolerance in [0.0, 0.05, 0.4, 2.0]:
+            qdict = QuaternionDict(tolerance)
+            self.assertEqual(qdict.tolerance, tolerance)
+            for n, q in enumerate(quaternions[:300]):
+                qdict.setdefault(q, n)
+            keys = numpy.array(list(qdict.values()))
+            distances = distance_matrix(samples, samples[keys])
+            #arccos loses precision near 0, so distances within 1e-6 of the
+            #tolerance are not checked
+            for n, q in enumerate(quaternions):
+                if distances[n].min() > tolerance + 1e-6:
+                    self.assertIsNone(qdict.find(q))
+                elif distances[n].min() < tolerance - 1e-6 or not tolerance:
+                    self.assertAlmostEqual(distances[n, list(keys).index(qdict[q])], distances[n].min())
+            #no two keys are within tolerance of each other
+            between = distance_matrix(samples[keys]) + numpy.eye(len(keys)) * math.pi
+            self.assertTrue(numpy.all(between > tolerance))
+
+    def test_min_tolerance(self):
+        #smaller tolerances act as MIN_TOLERANCE, and the probed buckets cover it
+        rng = numpy.random.default_rng(11)
+        for tolerance in [0.0, 1e-10]:
+            qdict = QuaternionDict(tolerance)
+            self.assertEqual(qdict.tolerance, tolerance)
+            for n, row in enumerate(rng.normal(size=(200, 4)).tolist()):
+                key = Quaternion(*row).unit()
+                qdict[key] = n
+                axis = Quaternion(0, *rng.normal(size=3).tolist()).unit()
+                for angle, expected in [(0.5 * MIN_TOLERANCE, n), (2 * MIN_TOLERANCE, None)]:
+                    turn = Quaternion(math.cos(angle)) + axis * math.sin(angle)
+                    self.assertEqual(qdict.get(key * turn), expected)
+                    self.assertEqual(qdict.get(-key * turn), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,9 +3,14 @@
 from __future__ import absolute_import
 from __future__ import division
 
+import random
 import unittest
-from quaternionic_integer import QuaternionicInteger
+from fractions import Fraction
+from functools import reduce
+from operator import mul
+from quaternionic_integer import QuaternionicInteger, HurwitzInteger, gcd, extended_gcd, four_square, factor
 from quaternion import Quaternion
+from rational_quaternion import RationalQuaternion
 
 class QuaternionicIntegerTestCase(unittest.TestCase):
     '''Unit tests for quaternionic_integer.py'''
@@ -239,6 +244,32 @@ class QuaternionicIntegerTestCase(unittest.TestCase):
         self.assert_quaternion_equal(self.iq1 ** -1, self.iq1.reciprocal())
         self.assert_quaternion_equal(self.iq1 ** -1, 1 / self.iq1)
 
+    def test_integer_power(self):
+        self.assertIsInstance(self.iq1 ** 3, QuaternionicInteger)
+        self.assertEqual(self.iq1 ** 3, self.iq1 * self.iq1 * self.iq1)
+        self.assertEqual(self.iq1 ** 0, QuaternionicInteger(1))
+        self.assertEqual((self.iq1 ** 40).norm_squared(), self.iq1.norm_squared() ** 40)
+        self.assertIsInstance(self.iq1 ** -2, RationalQuaternion)
+        self.assertEqual(self.iq1 ** -2 * self.iq1 ** 2, 1)
+
+    def test_modular_power(self):
+        m = 1000003
+        expected = QuaternionicInteger(1)
+        for n in range(20):
+            reduced = QuaternionicInteger(*(x % m for x in expected.to_list()))
+            self.assertEqual(pow(self.iq1, n, m), reduced)
+            expected = expected * self.iq1
+        big = pow(self.iq1, 2 ** 200, m)
+        self.assertEqual(pow(self.iq1, 2 ** 200 + 1, m), pow(big * self.iq1, 1, m))
+        inverse = pow(self.iq1, -1, m)
+        self.assertEqual(pow(inverse * self.iq1, 1, m), 1)
+        with self.assertRaises(ValueError):
+            pow(QuaternionicInteger(1, 2, 1, 1), -1, 7)
+        with self.assertRaises(ValueError):
+            pow(self.iq1, 2, 0)
+        with self.assertRaises(TypeError):
+            pow(self.iq1, 2.0, 5)
+
     def test_vector(self):
         self.assertEqual(self.iq1.vector(), Quaternion(0, self.iq1.i, self.iq1.j, self.iq1.k))
 
@@ -251,6 +282,31 @@ class QuaternionicIntegerTestCase(unittest.TestCase):
     def test_reciprocal(self):
         self.assert_quaternion_equal(self.iq1 * self.iq1.reciprocal(), QuaternionicInteger(1))
         self.assert_quaternion_equal(self.iq1.reciprocal() * self.iq1, QuaternionicInteger(1))
+        self.assertIsInstance(self.iq1.reciprocal(), RationalQuaternion)
+        self.assertEqual(self.iq1 * self.iq1.reciprocal(), 1)
+
+    def test_exact_division(self):
+        big = QuaternionicInteger(3 ** 200, -5 ** 150, 7 ** 100, 2 ** 700 + 1)
+        quotient = big / self.iq2
+        self.assertIsInstance(quotient, RationalQuaternion)
+        self.assertEqual(quotient * self.iq2, big)
+        self.assertEqual(quotient.reciprocal() * big, self.iq2)
+        self.assertIsInstance(self.iq3 / self.iq4, QuaternionicInteger)
+        self.assertEqual(self.iq1 / 3, RationalQuaternion(Fraction(5, 3), 3, Fraction(-10, 3), Fraction(4, 3)))
+        self.assertEqual(Fraction(1, 2) / self.iq1, Fraction(1, 2) * self.iq1.reciprocal())
+        self.assertIsInstance(self.iq1 * Fraction(1, 2), RationalQuaternion)
+        self.assertIsInstance(Fraction(1, 2) + self.iq1, RationalQuaternion)
+        with self.assertRaises(ZeroDivisionError):
+            self.iq1 / 0
+        with self.assertRaises(ZeroDivisionError):
+            self.iq1 / QuaternionicInteger()
+
+    def test_norm_squared(self):
+        big = QuaternionicInteger(2 ** 600, 1, 0, 0)
+        self.assertEqual(big.norm_squared(), 2 ** 1200 + 1)
+        self.assertIsInstance(big.norm_squared(), int)
+        self.assertEqual(big.norm(), 2.0 ** 600)
+        self.assertEqual(self.iq1.norm_squared(), 222)
 
     def test_unit(self):
         self.assert_quaternion_equal(self.iq1.norm() * self.iq1.unit(), self.iq1)
@@ -279,5 +335,159 @@ class QuaternionicIntegerTestCase(unittest.TestCase):
         self.assertIsInstance(iqd, QuaternionicInteger)
 
 
+    def test_divmod(self):
+        q, r = divmod(self.iq1, self.iq2)
+        self.assertIsInstance(q, QuaternionicInteger)
+        self.assertEqual(q * self.iq2 + r, self.iq1)
+        self.assertLessEqual(norm_squared(r), norm_squared(self.iq2))
+        self.assertEqual(self.iq3 // self.iq4, QuaternionicInteger(3))
+        self.assertEqual(self.iq3 % self.iq4, QuaternionicInteger(0))
+        self.assertEqual(divmod(self.iq4, 4), (QuaternionicInteger(2, 0, 2, -3), QuaternionicInteger(-2, -2, 0, 0)))
+        q, r = self.iq1.ldivmod(self.iq2)
+        self.assertEqual(self.iq2 * q + r, self.iq1)
+        with self.assertRaises(ZeroDivisionError):
+            divmod(self.iq1, QuaternionicInteger())
+        with self.assertRaises(TypeError):
+            divmod(self.iq1, self.q)
+
+
+class HurwitzIntegerTestCase(unittest.TestCase):
+    '''Unit tests for HurwitzInteger and the Euclidean algorithm'''
+
+    def setUp(self):
+        self.half = HurwitzInteger(Fraction(1, 2), Fraction(1, 2), Fraction(1, 2), Fraction(1, 2))
+        self.iq1 = QuaternionicInteger(5, 9, -10, 4)
+        self.iq2 = QuaternionicInteger(-7, 3, -2, -5)
+        self.rng = random.Random(7)
+
+    def random_hurwitz(self, bound=50):
+        components = [self.rng.randint(-bound, bound) for _ in range(4)]
+        if self.rng.random() < 0.5:
+            return HurwitzInteger(*components)
+        return HurwitzInteger(*(Fraction(2 * c + 1, 2) for c in components))
+
+    def test_instantiation(self):
+        self.assertEqual(HurwitzInteger(1.5, -0.5, 0.5, 2.5).scalar, Fraction(3, 2))
+        self.assertIsInstance(HurwitzInteger(2, 4).scalar, int)
+        self.assertEqual(HurwitzInteger(Fraction(4, 2)), HurwitzInteger(2))
+        with self.assertRaises(ValueError):
+            HurwitzInteger(Fraction(1, 2), 1, 0, 0)
+        with self.assertRaises(ValueError):
+            HurwitzInteger(Fraction(1, 3))
+
+    def test_arithmetic(self):
+        self.assertEqual(self.half * self.half,
+                         HurwitzInteger(Fraction(-1, 2), Fraction(1, 2), Fraction(1, 2), Fraction(1, 2)))
+        self.assertEqual(self.half + self.half, HurwitzInteger(1, 1, 1, 1))
+        self.assertIsInstance(self.iq1 + self.half, HurwitzInteger)
+        self.assertIsInstance(self.half * self.iq1, HurwitzInteger)
+        self.assertIsInstance(self.iq1 * self.half, HurwitzInteger)
+        self.assertEqual(self.iq1 * self.half, QuaternionicInteger(5, 9, -10, 4) * self.half)
+        self.assertEqual(2 - self.half, HurwitzInteger(Fraction(3, 2), Fraction(-1, 2), Fraction(-1, 2), Fraction(-1, 2)))
+        self.assertEqual(self.half * self.half.conjugate(), HurwitzInteger(1))
+        self.assertEqual(1 / self.half, self.half.conjugate())
+        self.assertIsInstance(self.half / 3, RationalQuaternion)
+        self.assertEqual(self.half.norm_squared(), 1)
+        self.assertEqual(HurwitzInteger(3, 1, 2, 0).to_quaternionic_integer(), QuaternionicInteger(3, 1, 2, 0))
+        with self.assertRaises(ValueError):
+            self.half.to_quaternionic_integer()
+
+    def test_divmod(self):
+        for _ in range(200):
+            a, b = self.random_hurwitz(), self.random_hurwitz(10)
+            if b == 0:
+                continue
+            q, r = divmod(a, b)
+            self.assertEqual(q * b + r, a)
+            self.assertLessEqual(2 * norm_squared(r), norm_squared(b))
+            q, r = a.ldivmod(b)
+            self.assertEqual(b * q + r, a)
+            self.assertLessEqual(2 * norm_squared(r), norm_squared(b))
+        # Lipschitz rounding cannot reduce this remainder, the Hurwitz quotient can
+        self.assertEqual(divmod(HurwitzInteger(3, 5, 7, 9), 2),
+                         (HurwitzInteger(Fraction(3, 2), Fraction(5, 2), Fraction(7, 2), Fraction(9, 2)), 0))
+        self.assertEqual(divmod(self.iq1, HurwitzInteger(2)), divmod(HurwitzInteger(5, 9, -10, 4), 2))
+        with self.assertRaises(ZeroDivisionError):
+            divmod(self.half, 0)
+
+    def test_gcd(self):
+        self.assertEqual(gcd(0, 0), HurwitzInteger())
+        self.assertEqual(gcd(self.iq1, 0), HurwitzInteger(5, 9, -10, 4))
+        self.assertEqual(gcd(6, 4), HurwitzInteger(2))
+        common = QuaternionicInteger(1, 1, 0, 0)
+        g = gcd(QuaternionicInteger(3, 1, 4, 1) * common, QuaternionicInteger(2, -7, 1, 8) * common)
+        self.assertEqual(divmod(QuaternionicInteger(3, 1, 4, 1) * common, g)[1], 0)
+        with self.assertRaises(ValueError):
+            gcd(self.iq1, self.iq2, side='middle')
+        with self.assertRaises(TypeError):
+            gcd(self.iq1, 1.5)
+
+    def test_extended_gcd(self):
+        for _ in range(100):
+            a, b = self.random_hurwitz(), self.random_hurwitz()
+            g, x, y = extended_gcd(a, b)
+            self.assertEqual(x * a + y * b, g)
+            self.assertTrue(g.is_lipschitz())
+            self.assertGreaterEqual(g.scalar, 0)
+            self.assertEqual(divmod(a, g)[1], 0)
+            self.assertEqual(divmod(b, g)[1], 0)
+            g, x, y = extended_gcd(a, b, side='left')
+            self.assertEqual(a * x + b * y, g)
+            self.assertEqual(a.ldivmod(g)[1], 0)
+            self.assertEqual(b.ldivmod(g)[1], 0)
+
+
+class FactorizationTestCase(unittest.TestCase):
+    '''Unit tests for four_square and factor'''
+
+    def setUp(self):
+        self.rng = random.Random(11)
+
+    def test_four_square(self):
+        for n in list(range(2000)) + [self.rng.getrandbits(256) for _ in range(20)] + [4 ** 40 * 7]:
+            q = four_square(n)
+            self.assertIsInstance(q, QuaternionicInteger)
+            self.assertEqual(norm_squared(q), n)
+        with self.assertRaises(ValueError):
+            four_square(-1)
+        with self.assertRaises(ValueError):
+            four_square(2.5)
+
+    def test_factor(self):
+        for _ in range(300):
+            q = QuaternionicInteger(*(self.rng.randint(-200, 200) for _ in range(4)))
+            if q == 0:
+                continue
+            factors = factor(q)
+            self.assertEqual(reduce(mul, factors), q)
+            for f in factors:
+                self.assertIsInstance(f, QuaternionicInteger)
+                self.assertTrue(is_prime(norm_squared(f)))
+        large = four_square(2 ** 31 - 1) * four_square(2 ** 61 - 1) * QuaternionicInteger(2, 1, 1, 1)
+        factors = factor(large)
+        self.assertEqual(sorted(norm_squared(f) for f in factors), [7, 2 ** 31 - 1, 2 ** 61 - 1])
+        self.assertEqual(reduce(mul, factors), large)
+
+    def test_factor_special_cases(self):
+        self.assertEqual(factor(QuaternionicInteger(0, -1)), [QuaternionicInteger(0, -1)])
+        self.assertEqual(reduce(mul, factor(-12)), -12)
+        self.assertEqual(len(factor(-12)), 6)
+        self.assertEqual(len(factor(QuaternionicInteger(1, 1, 1, 1))), 2)
+        with self.assertRaises(ValueError):
+            factor(0)
+        with self.assertRaises(TypeError):
+            factor(Quaternion(1.5))
+
+
+def is_prime(n):
+    '''Trial division primality test'''
+    return n > 1 and all(n % d for d in range(2, int(n ** 0.5) + 1))
+
+
+def norm_squared(q):
+    '''The exact squared norm of a quaternionic or Hurwitz integer'''
+    return q.scalar ** 2 + q.i ** 2 + q.j ** 2 + q.k ** 2
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,129 @@
+'''Unit tests for quaternion_io.py'''
+
+from __future__ import absolute_import
+from __future__ import division
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+from quaternion import Quaternion
+from quaternion_array import QuaternionArray
+from quaternionic_integer import QuaternionicInteger
+from quaternion_io import QuaternionReader, QuaternionWriter, save, load, open_memmap, read_header
+from quaternion_io import HEADER_SIZE
+
+
+class QuaternionIOTestCase(unittest.TestCase):
+    '''Unit tests for quaternion_io.py'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'q.quat')
+        self.q1 = Quaternion(3.7, 17.1, -2.4, 4.8)
+        self.q2 = Quaternion(-5, 0, 10, -5)
+        self.q3 = Quaternion(12.4, -10, -41.23, -1.213)
+        self.qa = QuaternionArray.from_quaternions([self.q1, self.q2, self.q3])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_save_load(self):
+        self.assertEqual(save(self.path, self.qa), 3)
+        self.assertEqual(os.path.getsize(self.path), HEADER_SIZE + 3 * 4 * 8)
+        loaded = load(self.path)
+        self.assertEqual(loaded, self.qa)
+        #native float64 files are mapped, not copied
+        self.assertIsInstance(loaded.components, numpy.memmap)
+        self.assertFalse(loaded.components.flags.writeable)
+
+        save(self.path, [self.q1, 2, 1 + 2j])
+        self.assertEqual(load(self.path).to_quaternions(), [self.q1, Quaternion(2), Quaternion(1, 2)])
+        save(self.path, [])
+        self.assertEqual(len(load(self.path)), 0)
+
+    def test_data_types(self):
+        for dtype, byteorder in [('float32', '<'), ('float64', '>'), ('float32', '=')]:
+            save(self.path, self.qa, dtype=dtype, byteorder=byteorder)
+            stored, count = read_header(self.path)
+            self.assertEqual((stored, count), (numpy.dtype(dtype).newbyteorder(byteorder), 3))
+            numpy.testing.assert_allclose(load(self.path).components, self.qa.components, rtol=1e-6)
+
+        integers = [QuaternionicInteger(1, -2, 3, 2**40), QuaternionicInteger(0, 0, 0, -7)]
+        save(self.path, integers)
+        self.assertEqual(read_header(self.path)[0], numpy.dtype('int64'))
+        with QuaternionReader(self.path) as reader:
+            quaternions = list(reader)
+        self.assertEqual(quaternions, integers)
+        self.assertIsInstance(quaternions[0], QuaternionicInteger)
+
+        save(self.path, numpy.array([[1, 2, 3, 4]]))
+        self.assertEqual(read_header(self.path)[0], numpy.dtype('int64'))
+        with self.assertRaises(ValueError):
+            save(self.path, [self.q1], dtype='int64')
+        with self.assertRaises(ValueError):
+            save(self.path, self.qa, dtype='int64')
+        with self.assertRaises(OverflowError):
+            save(self.path, [QuaternionicInteger(2**70)])
+        with self.assertRaises(ValueError):
+            save(self.path, self.qa, dtype='int32')
+        with self.assertRaises(ValueError):
+            save(self.path, self.qa, byteorder='|')
+
+    def test_memmap(self):
+        save(self.path, self.qa, dtype='float32')
+        mapped = open_memmap(self.path)
+        self.assertIsInstance(mapped, numpy.memmap)
+        self.assertEqual((mapped.dtype, mapped.shape), (numpy.dtype('float32'), (3, 4)))
+        writable = open_memmap(self.path, mode='r+')
+        writable[1] = [1, 2, 3, 4]
+        writable.flush()
+        del writable
+        self.assertEqual(load(self.path)[1], Quaternion(1, 2, 3, 4))
+        with self.assertRaises(ValueError):
+            open_memmap(self.path, mode='w+')
+
+    def test_streaming(self):
+        quaternions = [Quaternion(n, -n, 0.5 * n, 1) for n in range(25)]
+        with QuaternionWriter(self.path, buffer_size=4) as writer:
+            for q in quaternions[:10]:
+                writer.write(q)
+            #flushed blocks are readable before the writer is closed
+            self.assertEqual(read_header(self.path)[1], 8)
+            writer.write_array(QuaternionArray.from_quaternions(quaternions[10:20]))
+            writer.write_array(quaternions[20:])
+            self.assertEqual(writer.count, 25)
+            with self.assertRaises(TypeError):
+                writer.write('a')
+        self.assertTrue(writer.closed)
+
+        with QuaternionReader(self.path, chunk_size=7) as reader:
+            self.assertEqual(len(reader), 25)
+            self.assertEqual(list(reader), quaternions)
+            chunks = list(reader.chunks())
+            self.assertEqual([len(chunk) for chunk in chunks], [7, 7, 7, 4])
+            self.assertEqual(chunks[1].to_quaternions(), quaternions[7:14])
+            self.assertEqual([len(chunk) for chunk in reader.chunks(10)], [10, 10, 5])
+        with self.assertRaises(ValueError):
+            list(reader)
+
+    def test_invalid_files(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'not a quaternion file at all, really')
+        with self.assertRaises(ValueError):
+            load(self.path)
+        with open(self.path, 'wb') as file:
+            file.write(b'QUAT')
+        with self.assertRaises(ValueError):
+            read_header(self.path)
+
+        save(self.path, self.qa)
+        with open(self.path, 'r+b') as file:
+            file.truncate(HEADER_SIZE + 40)
+        with self.assertRaises(ValueError):
+            QuaternionReader(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
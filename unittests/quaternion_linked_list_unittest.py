@@ -0,0 +1,163 @@
+'''Unit tests for quaternion_linked_list.py'''
+
+from __future__ import absolute_import
+
+import random
+import unittest
+from quaternion import Quaternion
+from quaternion_linked_list import QuaternionList, QuaternionNode
+from utils.quaternion_utils import geodesic_distance
+
+
+class QuaternionListTestCase(unittest.TestCase):
+    '''Unit tests for quaternion_linked_list.py'''
+
+    def setUp(self):
+        rng = random.Random(0)
+        self.quaternions = [Quaternion(*(rng.randint(-20, 20) for _ in range(4)))
+                            for _ in range(2000)]
+
+    #determines if the linked nodes, iteration and positional access
+    #all agree with the expected order
+    def assert_list_order(self, qlist, expected):
+        linked = []
+        node = qlist.head
+        previous = None
+        while node:
+            self.assertIs(node.previous, previous)
+            linked.append(node.quaternion)
+            previous, node = node, node.next
+        self.assertEqual(linked, expected)
+        self.assertEqual(list(qlist), expected)
+        self.assertEqual(len(qlist), len(expected))
+        for index in (0, len(expected) // 2, len(expected) - 1):
+            self.assertEqual(qlist[index], expected[index])
+
+    def test_invalid_ordering(self):
+        with self.assertRaises(ValueError):
+            QuaternionList('size')
+
+    def test_add(self):
+        unique = list(dict.fromkeys(self.quaternions))
+        for ordering in ('alpha', 'norm'):
+            qlist = QuaternionList(ordering)
+            for q in unique:
+                qlist.add(q)
+            #quaternions with equal keys are ordered newest first
+            expected = sorted(reversed(unique), key=getattr(qlist, ordering + '_key'))
+            self.assert_list_order(qlist, expected)
+        with self.assertRaises(TypeError):
+            qlist.add('a')
+
+    def test_node_insert(self):
+        head = None
+        for q in self.quaternions[:300]:
+            node = QuaternionNode(q)
+            head = node if head is None else head.insert(node, QuaternionList.alpha_compare)
+        linked = []
+        previous = None
+        while head:
+            self.assertIs(head.previous, previous)
+            linked.append(head.quaternion)
+            previous, head = head, head.next
+        self.assertEqual(linked, sorted(self.quaternions[:300], key=QuaternionList.alpha_key))
+
+    def test_remove(self):
+        unique = list(dict.fromkeys(self.quaternions))
+        qlist = QuaternionList()
+        for q in unique:
+            qlist.add(q)
+        removed = set(random.Random(1).sample(unique, len(unique) // 2))
+        removed.update({min(unique, key=qlist.alpha_key), max(unique, key=qlist.alpha_key)})
+        for q in removed:
+            qlist.remove(q)
+        expected = sorted(set(unique) - removed, key=qlist.alpha_key)
+        self.assert_list_order(qlist, expected)
+        with self.assertRaises(KeyError):
+            qlist.remove(next(iter(removed)))
+
+    def test_rank_and_range(self):
+        qlist = QuaternionList('norm')
+        for q in range(10):
+            qlist.add(Quaternion(q))
+        self.assertEqual(qlist.rank(Quaternion(0, 3)), 3)
+        self.assertEqual(qlist.rank(4.5), 5)
+        self.assertEqual(qlist.bisect_right(-4), 5)
+        self.assertEqual(list(qlist.irange(Quaternion(0, 0, 2), 4j)),
+                         [Quaternion(2), Quaternion(3), Quaternion(4)])
+        self.assertEqual(list(qlist.irange(maximum=1)), [Quaternion(0), Quaternion(1)])
+        self.assertEqual(list(qlist.irange(minimum=20)), [])
+
+    def test_from_iterable(self):
+        for ordering in ('alpha', 'norm'):
+            qlist1 = QuaternionList(ordering)
+            for q in self.quaternions:
+                qlist1.add(q)
+            qlist2 = QuaternionList.from_iterable(self.quaternions, ordering=ordering)
+            self.assert_list_order(qlist2, list(qlist1))
+            qlist2.remove(self.quaternions[0])
+            qlist2.add(Quaternion(100))
+            self.assertEqual(qlist2[-1], Quaternion(100))
+        self.assertEqual(len(QuaternionList.from_iterable([])), 0)
+        with self.assertRaises(TypeError):
+            QuaternionList.from_iterable(['a'])
+
+    def test_range_by_norm(self):
+        for ordering in ('alpha', 'norm'):
+            qlist = QuaternionList.from_iterable(self.quaternions, ordering)
+            found = qlist.range_by_norm(10, 12.5)
+            expected = [q for q in qlist if 10 <= q.norm() <= 12.5]
+            self.assertEqual(sorted(found, key=qlist.alpha_key),
+                             sorted(expected, key=qlist.alpha_key))
+            norms = [q.norm() for q in found]
+            self.assertEqual(norms, sorted(norms))
+            self.assertEqual(qlist.range_by_norm(-5, -1), [])
+
+    def test_nearest(self):
+        qlist = QuaternionList.from_iterable(self.quaternions[:500])
+        target = Quaternion(0.5, -2, 7, 1)
+        distances = sorted(geodesic_distance(target, q) for q in qlist)
+        nearest = qlist.nearest(target, 10)
+        self.assertEqual(len(nearest), 10)
+        for (distance, q), expected in zip(nearest, distances):
+            self.assertAlmostEqual(distance, expected)
+            self.assertAlmostEqual(distance, geodesic_distance(target, q))
+
+        distances = sorted((target - q).norm() for q in qlist)
+        nearest = qlist.nearest(target, 5, metric='euclidean')
+        self.assertEqual([d for d, _ in nearest], distances[:5])
+
+        within = qlist.within(target, 0.3)
+        self.assertEqual(len(within), sum(1 for q in qlist if geodesic_distance(target, q) <= 0.3))
+
+        #queries reflect changes to the list
+        qlist.add(target * 2)
+        self.assertAlmostEqual(qlist.nearest(target)[0][0], 0)
+        self.assertEqual(qlist.nearest(target, 0), [])
+        with self.assertRaises(ValueError):
+            qlist.nearest(target, metric='manhattan')
+
+    def test_exact_matches(self):
+        #acos(u . v) put equal quaternions about 1e-8 apart
+        qlist = QuaternionList.from_iterable(self.quaternions)
+        for q in self.quaternions[:200]:
+            within = qlist.within(q, 0.0)
+            self.assertEqual(sum(1 for _, p in within if p == q), self.quaternions.count(q))
+            self.assertTrue(all(distance == 0.0 for distance, _ in within))
+            self.assertEqual(qlist.nearest(q)[0][0], 0.0)
+
+    def test_zero_quaternion(self):
+        #a zero quaternion has no geodesic distance, and would break the tree's pruning
+        qlist = QuaternionList.from_iterable(self.quaternions[:50] + [Quaternion(0)])
+        with self.assertRaises(ValueError):
+            qlist.nearest(Quaternion(1))
+        with self.assertRaises(ValueError):
+            qlist.within(Quaternion(1), 0.1)
+        self.assertEqual(qlist.nearest(Quaternion(0), metric='euclidean')[0][0], 0.0)
+        qlist.remove(Quaternion(0))
+        with self.assertRaises(ValueError):
+            qlist.nearest(Quaternion(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
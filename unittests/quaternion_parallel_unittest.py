@@ -0,0 +1,63 @@
+'''Unit tests for quaternion_parallel.py'''
+
+from __future__ import absolute_import
+from __future__ import division
+
+import unittest
+from functools import reduce
+from operator import mul
+import numpy
+from quaternion import Quaternion
+from quaternion_array import QuaternionArray
+from quaternion_parallel import pmap, preduce
+
+
+class QuaternionParallelTestCase(unittest.TestCase):
+    '''Unit tests for quaternion_parallel.py'''
+
+    def setUp(self):
+        rng = numpy.random.default_rng(5)
+        components = rng.normal(size=(101, 4))
+        self.qa = QuaternionArray(components / numpy.linalg.norm(components, axis=1)[:, numpy.newaxis])
+        self.quaternions = self.qa.to_quaternions()
+
+    def assert_quaternion_equal(self, q1, q2):
+        for x, y in zip(q1.to_list(), q2.to_list()):
+            self.assertAlmostEqual(x, y)
+
+    def test_pmap(self):
+        expected = [q.conjugate() for q in self.quaternions]
+        self.assertEqual(pmap(Quaternion.conjugate, self.qa, workers=3, chunk_size=7), expected)
+        self.assertEqual(pmap(Quaternion.conjugate, self.quaternions, workers=2), expected)
+        self.assertEqual(pmap(abs, self.qa.components, workers=1), [abs(q) for q in self.quaternions])
+        self.assertEqual(pmap(abs, [1, -2j], workers=2, chunk_size=1), [1.0, 2.0])
+        self.assertEqual(pmap(abs, [], workers=2), [])
+
+    def test_preduce(self):
+        expected = reduce(mul, self.quaternions)
+        self.assert_quaternion_equal(preduce(self.qa, workers=3, chunk_size=10), expected)
+        self.assert_quaternion_equal(preduce(self.quaternions, workers=2), expected)
+        self.assert_quaternion_equal(preduce(self.qa.components, workers=1), expected)
+        #the product is taken in order
+        self.assert_quaternion_equal(preduce(self.quaternions[::-1], workers=2, chunk_size=3),
+                                     reduce(mul, self.quaternions[::-1]))
+        self.assertEqual(preduce([Quaternion(0, 1), Quaternion(0, 0, 1)], workers=2, chunk_size=1),
+                         Quaternion(0, 0, 0, 1))
+        self.assertEqual(preduce([], workers=2), Quaternion(1))
+        self.assertEqual(preduce([Quaternion(1, 2, 3, 4)]), Quaternion(1, 2, 3, 4))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            preduce(self.qa, workers=0)
+        with self.assertRaises(ValueError):
+            pmap(abs, self.qa, chunk_size=0)
+        with self.assertRaises(ValueError):
+            preduce(numpy.zeros((3, 3)))
+        with self.assertRaises(TypeError):
+            preduce(5)
+        with self.assertRaises(TypeError):
+            pmap(abs, ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
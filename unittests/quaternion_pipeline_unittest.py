@@ -0,0 +1,126 @@
+'''Unit tests for quaternion_pipeline.py'''
+
+from __future__ import absolute_import
+from __future__ import division
+
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from functools import reduce
+from operator import mul
+import numpy
+from quaternion import Quaternion
+from quaternion_array import QuaternionArray
+from quaternion_pipeline import run_pipeline, parse, normalize, keep, compose, read_lines
+
+
+class QuaternionPipelineTestCase(unittest.IsolatedAsyncioTestCase):
+    '''Unit tests for quaternion_pipeline.py'''
+
+    def setUp(self):
+        rng = numpy.random.default_rng(11)
+        self.quaternions = QuaternionArray(rng.normal(size=(50, 4))).to_quaternions()
+        self.lines = [repr(q) for q in self.quaternions]
+
+    def assert_array_equal(self, qa, quaternions):
+        self.assertIsInstance(qa, QuaternionArray)
+        self.assertEqual(len(qa), len(quaternions))
+        for q1, q2 in zip(qa, quaternions):
+            for x, y in zip(q1.to_list(), q2.to_list()):
+                self.assertAlmostEqual(x, y, places=3)
+
+    async def test_parse_normalize_compose(self):
+        lines = self.lines[:20] + ['not a quaternion'] + self.lines[20:]
+        malformed = []
+        result = await run_pipeline(lines, [parse(malformed.extend), normalize(), compose()], batch_size=8)
+        units = [q.unit() for q in QuaternionArray.from_strings(self.lines)[0]]
+        expected = [reduce(mul, units[:n + 1]) for n in range(len(units))]
+        self.assert_array_equal(result, expected)
+        self.assertEqual(malformed, ['not a quaternion'])
+
+        result = await run_pipeline([line.encode() for line in self.lines], [parse()])
+        self.assertEqual(len(result), 50)
+
+    async def test_quaternion_sources(self):
+        async def source():
+            for q in self.quaternions:
+                await asyncio.sleep(0)
+                yield q
+
+        result = await run_pipeline(source(), [keep(lambda qa: qa.scalar > 0)], batch_size=4)
+        self.assert_array_equal(result, [q for q in self.quaternions if q.scalar > 0])
+        self.assertEqual(len(await run_pipeline([], [normalize()])), 0)
+        self.assertEqual(len(await run_pipeline(self.quaternions, [keep(lambda qa: qa.scalar > 100)])), 0)
+
+    async def test_compose_state(self):
+        stage = compose(Quaternion(0, 0, 0, 2), renormalize=True)
+        result = await run_pipeline(self.quaternions, [stage], batch_size=7)
+        expected = reduce(mul, self.quaternions, Quaternion(0, 0, 0, 2)).unit()
+        self.assert_array_equal(result[-1:], [expected])
+        self.assert_array_equal(QuaternionArray.from_quaternions([stage.state]), [expected])
+        numpy.testing.assert_allclose(result.norm(), 1.0)
+
+    async def test_batching_and_backpressure(self):
+        produced = 0
+        lead = []
+
+        def source():
+            nonlocal produced
+            for q in self.quaternions * 10:
+                produced += 1
+                yield q
+
+        sizes = []
+
+        async def slow_sink(qa):
+            sizes.append(len(qa))
+            lead.append(produced - sum(sizes))
+            await asyncio.sleep(0.001)
+
+        async def double(qa):
+            await asyncio.sleep(0)
+            return 2 * qa
+
+        result = await run_pipeline(source(), [double, normalize()], slow_sink, batch_size=5, queue_size=2)
+        self.assertIsNone(result)
+        self.assertEqual(sum(sizes), 500)
+        self.assertTrue(all(1 <= size <= 5 for size in sizes))
+        #the source stays a bounded number of samples ahead of the sink
+        self.assertLessEqual(max(lead), 2 * 5 + 4 * 2 * 5 + 3 * 5)
+
+    async def test_errors(self):
+        def fail(qa):
+            raise RuntimeError('stage failed')
+
+        with self.assertRaises(RuntimeError):
+            await run_pipeline(self.quaternions * 100, [normalize(), fail], batch_size=2, queue_size=1)
+        with self.assertRaises(TypeError):
+            await run_pipeline(['a'], [normalize()])
+        with self.assertRaises(ValueError):
+            await run_pipeline(self.quaternions, [], batch_size=0)
+
+    async def test_unix_socket_source(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'imu.sock')
+
+        async def emit(reader, writer):
+            for line in self.lines:
+                writer.write(line.encode() + b'\n')
+                await writer.drain()
+            writer.close()
+
+        try:
+            server = await asyncio.start_unix_server(emit, path)
+            async with server:
+                reader, writer = await asyncio.open_unix_connection(path)
+                result = await run_pipeline(read_lines(reader), [parse(), normalize()], batch_size=16)
+                writer.close()
+        finally:
+            shutil.rmtree(directory)
+        self.assert_array_equal(result, [q.unit() for q in QuaternionArray.from_strings(self.lines)[0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
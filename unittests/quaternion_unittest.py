@@ -3,8 +3,15 @@
 from __future__ import absolute_import
 from __future__ import division
 
+import dataclasses
+import math
+import pickle
+import sys
 import unittest
-from quaternion import Quaternion
+from fractions import Fraction
+import numpy
+from quaternion import Quaternion, hamilton_components
+from quaternionic_integer import QuaternionicInteger
 
 
 class QuaternionTestCase(unittest.TestCase):
@@ -94,6 +101,36 @@ class QuaternionTestCase(unittest.TestCase):
     def test_pos(self):
         self.assert_quaternion_equal(+self.q1, self.q1)
 
+    def test_make(self):
+        q = Quaternion._make(3.7, 17.1, -2.4, 4.8)
+        self.assertIs(type(q), Quaternion)
+        self.assertEqual((q.scalar, q.i, q.j, q.k), (3.7, 17.1, -2.4, 4.8))
+        self.assertEqual(q, self.q1)
+        self.assertEqual(hash(q), hash(self.q1))
+        self.assertFalse(hasattr(q, '__dict__'))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            q.scalar = 1.0
+        #there is nowhere to put other attributes; Python 3.11 raises TypeError here
+        with self.assertRaises((AttributeError, TypeError)):
+            q.l = 1.0  # pylint: disable=attribute-defined-outside-init
+        #subclasses get instances of their own type, and arithmetic keeps it
+        n = QuaternionicInteger._make(1, 2, 3, 4)
+        self.assertIs(type(n), QuaternionicInteger)
+        self.assertEqual(n, QuaternionicInteger(1, 2, 3, 4))
+        self.assertFalse(hasattr(n, '__dict__'))
+        self.assertIs(type(n + n), QuaternionicInteger)
+        self.assertIs(type(self.q1 * self.q2), Quaternion)
+
+    def test_hamilton_components(self):
+        a = self.q1.to_list()
+        b = self.q2.to_list()
+        self.assertEqual(Quaternion(*hamilton_components(a, b)), self.q1 * self.q2)
+        self.assertEqual(hamilton_components((0, 1, 0, 0), (0, 0, 1, 0)), (0, 0, 0, 1))
+        #integers are not rounded
+        self.assertEqual(hamilton_components((2 ** 70, 1, 0, 0), (2 ** 70, 1, 0, 0)), (2 ** 140 - 1, 2 ** 71, 0, 0))
+        self.assertEqual(hamilton_components((Fraction(1, 2), 0, 0, 0), (Fraction(1, 3), 1, 0, 0)),
+                         (Fraction(1, 6), Fraction(1, 2), 0, 0))
+
     def test_multiplication(self):
 
         #right multiplication with other quaternion
@@ -191,6 +228,71 @@ class QuaternionTestCase(unittest.TestCase):
         self.assertAlmostEqual(Quaternion(7.45) ** 2.64, 7.45 ** 2.64)
         self.assertAlmostEqual(7.45 ** Quaternion(2.64), 7.45 ** 2.64)
 
+    def test_integer_power(self):
+        self.assertEqual(self.q2 ** 3, self.q2 * self.q2 * self.q2)
+        self.assertEqual(self.q1 ** 0, Quaternion(1))
+        self.assertEqual(Quaternion() ** 0, 1)
+        unit = self.q1.unit()
+        self.assert_quaternion_equal(unit ** 1000, unit ** 1000.5 / unit ** 0.5)
+        self.assert_quaternion_equal(self.q1 ** -3, (self.q1 ** 3).reciprocal())
+        with self.assertRaises(TypeError):
+            pow(self.q1, 2, 5)
+
+    def test_derived_quantities_cached_per_instance(self):
+        q = Quaternion(0, 0, 0, 2)
+        self.assertEqual(q.norm(), 2.0)
+        self.assertEqual(q.unit(), Quaternion(0, 0, 0, 1))
+        self.assertEqual(q.rotation_matrix(), ((-1.0, 0.0, 0.0), (0.0, -1.0, 0.0), (0.0, 0.0, 1.0)))
+        self.assertEqual(q.axis_angle(), ((0.0, 0.0, 1.0), math.pi))
+        self.assertEqual(Quaternion(-3).axis_angle(), ((1.0, 0.0, 0.0), 2 * math.pi))
+        self.assertEqual(Quaternion().unit(), Quaternion())
+        # later calls return the stored objects, which belong to this instance only
+        for method in (Quaternion.norm, Quaternion.unit, Quaternion.rotation_matrix, Quaternion.axis_angle):
+            self.assertIs(method(self.q1), method(self.q1))
+            copy = Quaternion(3.7, 17.1, -2.4, 4.8)
+            self.assertEqual(method(copy), method(self.q1))
+            self.assertIsNot(method(copy), method(self.q1))
+        # the cache is not a field, so it is left out of fields, comparison and pickling
+        q = Quaternion(3.7, 17.1, -2.4, 4.8)
+        size = sys.getsizeof(q)
+        q.norm(), q.unit(), q.rotation_matrix(), q.axis_angle()
+        self.assertEqual(sys.getsizeof(q), size)
+        self.assertFalse(hasattr(q, '__dict__'))
+        self.assertEqual([f.name for f in dataclasses.fields(q)], ['scalar', 'i', 'j', 'k'])
+        self.assertEqual(dataclasses.astuple(q), (3.7, 17.1, -2.4, 4.8))
+        self.assertEqual(q, self.q1)
+        self.assertEqual(hash(q), hash(self.q1))
+        self.assertEqual(len(pickle.dumps(q)), len(pickle.dumps(Quaternion(3.7, 17.1, -2.4, 4.8))))
+        self.assertEqual(pickle.loads(pickle.dumps(q)), self.q1)
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            q.scalar = 1.0
+
+    def test_rotation_matrix(self):
+        matrix = Quaternion(0, 0, 0, 2).rotation_matrix()
+        expected = ((-1, 0, 0), (0, -1, 0), (0, 0, 1))
+        for row, expected_row in zip(matrix, expected):
+            for x, y in zip(row, expected_row):
+                self.assertAlmostEqual(x, y)
+        v = Quaternion(0, 1, -2, 0.5)
+        rotated = self.q1 * v * self.q1.reciprocal()
+        matrix = self.q1.rotation_matrix()
+        for row, component in zip(matrix, (rotated.i, rotated.j, rotated.k)):
+            self.assertAlmostEqual(sum(m * x for m, x in zip(row, (v.i, v.j, v.k))), component)
+        with self.assertRaises(ZeroDivisionError):
+            Quaternion().rotation_matrix()
+
+    def test_axis_angle(self):
+        axis, angle = Quaternion(math.cos(0.3), 0, math.sin(0.3), 0).axis_angle()
+        self.assertAlmostEqual(angle, 0.6)
+        self.assertEqual(axis, (0.0, 1.0, 0.0))
+        axis, angle = (2 * self.q1).axis_angle()
+        self.assertAlmostEqual(angle, 2 * self.q1.angle())
+        self.assertAlmostEqual(sum(x * x for x in axis), 1)
+        self.assertEqual(Quaternion(2).axis_angle(), ((1.0, 0.0, 0.0), 0.0))
+        self.assertEqual(Quaternion(-1).axis_angle(), ((1.0, 0.0, 0.0), 2 * math.pi))
+        with self.assertRaises(ZeroDivisionError):
+            Quaternion().axis_angle()
+
     def test_vector(self):
         self.assertEqual(self.q1.vector(), Quaternion(0, self.q1.i, self.q1.j, self.q1.k))
 
@@ -218,10 +320,60 @@ class QuaternionTestCase(unittest.TestCase):
         self.assertEqual(self.q1.to_list(), [3.7, 17.1, -2.4, 4.8])
         self.assertEqual(self.q1.vector_to_list(), [17.1, -2.4, 4.8])
 
+    def test_numpy_interop(self):
+        arr = numpy.asarray(self.q1)
+        self.assertEqual(arr.shape, (4,))
+        self.assertEqual(arr.tolist(), self.q1.to_list())
+        self.assertEqual(numpy.array([self.q1, self.q2]).shape, (2, 4))
+        self.assertEqual(numpy.asarray(self.q1, dtype=numpy.float32).dtype, numpy.float32)
+        #NumPy scalars defer to the quaternion operators
+        self.assertEqual(numpy.float64(2) * self.q1, 2 * self.q1)
+        self.assertIsInstance(self.q1 + numpy.float64(2), Quaternion)
+        self.assertIsInstance(numpy.float64(2) - self.q1, Quaternion)
+        #arrays combine with quaternions elementwise into object arrays
+        arr = numpy.array([1.0, 2.0])
+        for result, expected in [(arr * self.q1, [self.q1, 2 * self.q1]),
+                                 (self.q1 * arr, [self.q1, self.q1 * 2]),
+                                 (arr + self.q1, [1 + self.q1, 2 + self.q1]),
+                                 (self.q1 - arr, [self.q1 - 1, self.q1 - 2])]:
+            self.assertEqual(result.dtype, object)
+            self.assertEqual(result.tolist(), expected)
+        objects = numpy.empty(2, dtype=object)
+        objects[:] = [self.q1, self.q2]
+        self.assertEqual((objects * self.q2).tolist(), [self.q1 * self.q2, self.q2 * self.q2])
+        with self.assertRaises(ValueError):
+            self.q1.__array__(copy=False)
+
     def test_hash(self):
         self.assertEqual(hash(self.q1),
                          hash((self.q1.scalar, self.q1.i, self.q1.j, self.q1.k)))
 
+    def test_canonical_components(self):
+        u = self.q1.canonical_components()
+        for component, expected in zip(u, self.q1.unit().to_list()):
+            self.assertAlmostEqual(component, expected)
+        self.assertEqual((-2 * self.q1).canonical_components(), u)
+        self.assertEqual(Quaternion(0, 0, -3, 4).canonical_components(), (0.0, 0.0, 0.6, -0.8))
+        with self.assertRaises(ZeroDivisionError):
+            Quaternion(0).canonical_components()
+
+    def test_bucket_key(self):
+        key = self.q1.bucket_key(0.1)
+        self.assertEqual(key, (2, 9, -2, 2))
+        #q, -q and positive multiples of q represent the same rotation
+        self.assertEqual((-self.q1).bucket_key(0.1), key)
+        self.assertEqual((3 * self.q1).bucket_key(0.1), key)
+        self.assertEqual(Quaternion(0, 0, -1, 1).bucket_key(0.5), (0, 0, 1, -2))
+        self.assertEqual(Quaternion(0, 0, 0, -2).bucket_key(0.5), (0, 0, 0, 2))
+        self.assertEqual(Quaternion(self.f).bucket_key(0.5), (2, 0, 0, 0))
+        #nearby rotations usually share a key
+        self.assertEqual((self.q1 + Quaternion(1e-12)).bucket_key(0.1), key)
+        self.assertNotEqual(self.q1.bucket_key(1e-3), self.q2.bucket_key(1e-3))
+        with self.assertRaises(ValueError):
+            self.q1.bucket_key(0)
+        with self.assertRaises(ZeroDivisionError):
+            Quaternion(0).bucket_key(0.1)
+
     def test_instantiation(self):
 
         #default
@@ -253,6 +405,14 @@ class QuaternionTestCase(unittest.TestCase):
         self.assert_quaternion_equal(Quaternion.from_string('3.6 - 5i + 100k + 4.6j'),
                                      Quaternion(3.6, -5, 4.6, 100))
 
+    def test_parse_many(self):
+        lines = ['3.6 - 5i + 100k + 4.6j\n', 'q', '\n', '-2 + 1.5k', '4 + x']
+        quaternions, malformed = Quaternion.parse_many(lines)
+        self.assertEqual(quaternions, [Quaternion(3.6, -5, 4.6, 100), Quaternion(-2, 0, 0, 1.5)])
+        self.assertEqual(malformed, [(1, 'q'), (4, '4 + x')])
+        with self.assertRaises(ValueError):
+            Quaternion.from_string('4 + x')
+
     def test_conversion_from_quaternion(self):
         self.assertEqual(complex(self.q1), 3.7 + 17.1j)
         self.assertEqual(float(self.q1), 3.7)
@@ -0,0 +1,73 @@
+'''Unit tests for rational_quaternion.py'''
+
+from __future__ import absolute_import
+from __future__ import division
+
+import unittest
+from fractions import Fraction
+from rational_quaternion import RationalQuaternion, as_rational_quaternion
+from quaternionic_integer import QuaternionicInteger
+from quaternion import Quaternion
+
+
+class RationalQuaternionTestCase(unittest.TestCase):
+    '''Unit tests for rational_quaternion.py'''
+
+    def setUp(self):
+        self.rq1 = RationalQuaternion(Fraction(1, 2), Fraction(-2, 3), 3, Fraction(5, 7))
+        self.rq2 = RationalQuaternion(-4, Fraction(1, 9), 0, Fraction(-3, 5))
+        self.iq = QuaternionicInteger(5, 9, -10, 4)
+        self.q = Quaternion(3.7, 17.1, -2.4, 4.8)
+
+    def test_instantiation(self):
+        self.assertIsInstance(RationalQuaternion(1, 2).scalar, Fraction)
+        self.assertEqual(RationalQuaternion(0.5).scalar, Fraction(1, 2))
+        self.assertEqual(RationalQuaternion('1/3', 2), RationalQuaternion(Fraction(1, 3), 2))
+        self.assertEqual(repr(self.rq1), '1/2 - 2/3i + 3j + 5/7k')
+
+    def test_exact_arithmetic(self):
+        for result in (self.rq1 + self.rq2, self.rq1 - self.rq2, self.rq1 * self.rq2,
+                       self.rq1 / self.rq2, self.rq1 + Fraction(1, 3), 2 * self.rq1,
+                       self.rq1 * self.iq, self.iq * self.rq1, 1 / self.rq1):
+            self.assertIsInstance(result, RationalQuaternion)
+        self.assertEqual((self.rq1 * self.rq2) / self.rq2, self.rq1)
+        self.assertEqual(self.rq2.reciprocal() * self.rq2, 1)
+        self.assertEqual(self.rq1 + self.rq1, 2 * self.rq1)
+        self.assertEqual(self.rq1 - self.rq1, 0)
+
+    def test_float_fallback(self):
+        result = self.rq1 * self.q
+        self.assertNotIsInstance(result, RationalQuaternion)
+        self.assertIsInstance(result, Quaternion)
+        self.assertNotIsInstance(self.rq1 + 0.5, RationalQuaternion)
+        self.assertNotIsInstance(self.rq1 * 1j, RationalQuaternion)
+
+    def test_norm_squared(self):
+        self.assertEqual(self.rq1.norm_squared(), Fraction(1, 4) + Fraction(4, 9) + 9 + Fraction(25, 49))
+        self.assertAlmostEqual(self.rq1.norm() ** 2, float(self.rq1.norm_squared()))
+
+    def test_reciprocal(self):
+        with self.assertRaises(ZeroDivisionError):
+            RationalQuaternion().reciprocal()
+        with self.assertRaises(ZeroDivisionError):
+            self.rq1 / RationalQuaternion()
+
+    def test_is_integral(self):
+        self.assertTrue(RationalQuaternion(1, -2, 3, 4).is_integral())
+        self.assertFalse(self.rq1.is_integral())
+
+    def test_as_rational_quaternion(self):
+        self.assertEqual(as_rational_quaternion(self.iq), RationalQuaternion(5, 9, -10, 4))
+        self.assertEqual(as_rational_quaternion(Fraction(2, 3)), RationalQuaternion(Fraction(2, 3)))
+        with self.assertRaises(TypeError):
+            as_rational_quaternion(self.q)
+        with self.assertRaises(TypeError):
+            as_rational_quaternion(1.5)
+
+    def test_hash(self):
+        self.assertEqual(hash(RationalQuaternion(3)), hash(3))
+        self.assertEqual(hash(self.rq1), hash(RationalQuaternion(*self.rq1.to_list())))
+
+
+if __name__ == '__main__':
+    unittest.main()
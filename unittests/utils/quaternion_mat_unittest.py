@@ -2,10 +2,17 @@
 
 from __future__ import absolute_import
 
+import math
 import unittest
 import numpy
 from utils.quaternion_matrix_utils import complex_matrix, real_matrix, matrix_to_quaternion
+from utils.quaternion_matrix_utils import complex_matrices, real_matrices, matrices_to_quaternions
+from utils.quaternion_matrix_utils import rotate_points
+from utils.quaternion_matrix_utils import enable_matrix_cache, disable_matrix_cache, matrix_cache_info
+from utils.quaternion_matrix_utils import to_rotation_matrix, from_rotation_matrix, to_euler, from_euler
+from utils.quaternion_matrix_utils import to_axis_angle, from_axis_angle
 from quaternion import Quaternion
+from quaternion_array import QuaternionArray
 
 
 class QuaternionMatrixTestCase(unittest.TestCase):
@@ -53,6 +60,174 @@ class QuaternionMatrixTestCase(unittest.TestCase):
             self.assert_quaternion_equal(
                 matrix_to_quaternion(self.r1 * self.r2), self.q1 * self.q2)
 
+    def test_batched_matrices(self):
+        qa = QuaternionArray.from_quaternions([self.q1, self.q2])
+        c = complex_matrices(qa)
+        r = real_matrices(qa.components)
+        self.assertEqual(c.shape, (2, 2, 2))
+        self.assertEqual(r.shape, (2, 4, 4))
+        numpy.testing.assert_array_equal(c[0], self.c1)
+        numpy.testing.assert_array_equal(c[1], self.c2)
+        numpy.testing.assert_array_equal(r[0], self.r1)
+        numpy.testing.assert_array_equal(r[1], self.r2)
+        self.assertEqual(matrices_to_quaternions(c), qa)
+        self.assertEqual(matrices_to_quaternions(r), qa)
+        products = matrices_to_quaternions(numpy.matmul(r, r[::-1]))
+        self.assert_quaternion_equal(products[0], self.q1 * self.q2)
+        with self.assertRaises(ValueError):
+            real_matrices(numpy.zeros((2, 3)))
+        with self.assertRaises(ValueError):
+            matrices_to_quaternions(numpy.zeros((2, 3, 3)))
+        with self.assertRaises(ValueError):
+            matrices_to_quaternions(self.c1)
+
+    def test_rotate_points(self):
+        points = numpy.array([[1.0, 0.0, 0.0], [0.5, -2.0, 3.0], [-1.2, 4.4, 0.7]])
+
+        def rotate(q, p):
+            return (q * Quaternion(0, *p) * q.reciprocal()).vector_to_list()
+
+        #single quaternion rotates every point
+        rotated = rotate_points(self.q1, points)
+        self.assertEqual(rotated.shape, points.shape)
+        for r, p in zip(rotated, points):
+            numpy.testing.assert_allclose(r, rotate(self.q1, p))
+        numpy.testing.assert_allclose(rotate_points(self.q2, points[1]), rotate(self.q2, points[1]))
+
+        #one quaternion per point
+        quaternions = [self.q1, self.q2, Quaternion(0.3, -0.1, 0.8, 0.2)]
+        rotated = rotate_points(QuaternionArray.from_quaternions(quaternions), points)
+        for r, q, p in zip(rotated, quaternions, points):
+            numpy.testing.assert_allclose(r, rotate(q, p))
+
+        #real numbers leave points unchanged
+        numpy.testing.assert_allclose(rotate_points(3, points), points)
+
+        with self.assertRaises(ValueError):
+            rotate_points(self.q1, numpy.zeros((3, 4)))
+        with self.assertRaises(ValueError):
+            rotate_points(QuaternionArray.from_quaternions([self.q1]), points)
+        with self.assertRaises(ZeroDivisionError):
+            rotate_points(Quaternion(), points)
+        with self.assertRaises(TypeError):
+            rotate_points('', points)
+
+    def test_matrix_cache(self):
+        self.assertIsNone(matrix_cache_info())
+        enable_matrix_cache(maxsize=2)
+        try:
+            r1 = real_matrix(self.q1)
+            self.assertIs(real_matrix(Quaternion(3.7, 17.1, -2.4, 4.8)), r1)
+            self.assertTrue(numpy.array_equal(r1, self.r1))
+            self.assertTrue(numpy.array_equal(complex_matrix(self.q1), self.c1))
+            with self.assertRaises(ValueError):
+                r1[0, 0] = 0.0
+            info = matrix_cache_info()
+            self.assertEqual((info['real'].hits, info['real'].misses), (1, 1))
+            self.assertEqual(info['complex'].misses, 1)
+            real_matrix(self.q2)
+            real_matrix(1)
+            self.assertEqual(matrix_cache_info()['real'].currsize, 2)
+        finally:
+            disable_matrix_cache()
+        self.assertIsNone(matrix_cache_info())
+        self.assertTrue(real_matrix(self.q1).flags.writeable)
+
+    def test_rotation_matrix_method(self):
+        points = numpy.eye(3)
+        expected = rotate_points(self.q1, points)
+        matrix = numpy.array(self.q1.rotation_matrix())
+        self.assertTrue(numpy.allclose(points @ matrix.T, expected))
+
+    def random_unit_quaternions(self, n):
+        rng = numpy.random.default_rng(7)
+        components = rng.normal(size=(n, 4))
+        return components / numpy.linalg.norm(components, axis=1)[:, numpy.newaxis]
+
+    def test_to_from_rotation_matrix(self):
+        numpy.testing.assert_allclose(to_rotation_matrix(self.q1), self.q1.rotation_matrix())
+        numpy.testing.assert_allclose(to_rotation_matrix(1), numpy.eye(3))
+        q = from_rotation_matrix(to_rotation_matrix(self.q1))
+        self.assertIsInstance(q, Quaternion)
+        for x, y in zip(q.to_list(), self.q1.unit().to_list()):
+            self.assertAlmostEqual(x, y)
+        self.assertEqual(from_rotation_matrix(numpy.diag([-1.0, 1.0, -1.0])), Quaternion(0, 0, 1, 0))
+
+        #every branch of Shepperd's method, including half turns
+        components = self.random_unit_quaternions(200)
+        components[:4] = numpy.eye(4)
+        matrices = to_rotation_matrix(QuaternionArray(components))
+        self.assertEqual(matrices.shape, (200, 3, 3))
+        numpy.testing.assert_allclose(to_rotation_matrix(components), matrices)
+        qa = from_rotation_matrix(matrices)
+        self.assertIsInstance(qa, QuaternionArray)
+        self.assertTrue(numpy.all(qa.scalar >= 0))
+        numpy.testing.assert_allclose(numpy.abs(numpy.sum(qa.components * components, axis=1)), 1.0)
+
+        with self.assertRaises(ValueError):
+            from_rotation_matrix(numpy.eye(4))
+        with self.assertRaises(ValueError):
+            to_rotation_matrix(numpy.zeros((2, 3)))
+        with self.assertRaises(ZeroDivisionError):
+            to_rotation_matrix(Quaternion())
+
+    def test_euler_angles(self):
+        q = from_euler((math.pi / 2, 0, 0), 'zyx')
+        numpy.testing.assert_allclose(q.to_list(), [math.sqrt(0.5), 0, 0, math.sqrt(0.5)])
+        angles = to_euler(self.q1, 'xyz')
+        self.assertIsInstance(angles, tuple)
+        numpy.testing.assert_allclose(to_rotation_matrix(from_euler(angles, 'xyz')),
+                                      to_rotation_matrix(self.q1))
+
+        components = self.random_unit_quaternions(100)
+        matrices = to_rotation_matrix(components)
+        rng = numpy.random.default_rng(3)
+        for order in ('xyz', 'xzy', 'yxz', 'yzx', 'zxy', 'zyx',
+                      'xyx', 'xzx', 'yxy', 'yzy', 'zxz', 'zyz'):
+            angles = to_euler(components, order)
+            self.assertEqual(angles.shape, (100, 3))
+            self.assertTrue(numpy.all(numpy.abs(angles) <= math.pi))
+            #intrinsic rotations compose left to right
+            expected = numpy.eye(3)
+            for axis, angle in zip(order, angles[0]):
+                expected = expected @ to_rotation_matrix(from_axis_angle(numpy.eye(3)['xyz'.index(axis)], angle))
+            numpy.testing.assert_allclose(matrices[0], expected, atol=1e-12)
+            numpy.testing.assert_allclose(to_rotation_matrix(from_euler(angles, order)), matrices, atol=1e-12)
+
+            #gimbal lock puts the combined angle on the first axis
+            middle = math.pi if order[0] == order[2] else math.pi / 2
+            locked = numpy.column_stack([rng.uniform(-3, 3, 20), numpy.full(20, middle), rng.uniform(-3, 3, 20)])
+            locked_angles = to_euler(from_euler(locked, order), order)
+            numpy.testing.assert_array_equal(locked_angles[:, 2], 0.0)
+            numpy.testing.assert_allclose(to_rotation_matrix(from_euler(locked_angles, order)),
+                                          to_rotation_matrix(from_euler(locked, order)), atol=1e-9)
+
+        with self.assertRaises(ValueError):
+            to_euler(self.q1, 'xxy')
+        with self.assertRaises(ValueError):
+            from_euler((1, 2), 'xyz')
+
+    def test_axis_angle(self):
+        self.assertEqual(to_axis_angle(self.q1), self.q1.axis_angle())
+        q = from_axis_angle((0, 0, 2), math.pi / 2)
+        numpy.testing.assert_allclose(q.to_list(), [math.sqrt(0.5), 0, 0, math.sqrt(0.5)])
+
+        components = self.random_unit_quaternions(50)
+        components[0] = [-1, 0, 0, 0]
+        axes, angles = to_axis_angle(components)
+        numpy.testing.assert_allclose(axes[0], [1, 0, 0])
+        self.assertAlmostEqual(angles[0], 2 * math.pi)
+        for axis, angle, q in zip(axes[1:], angles[1:], QuaternionArray(components[1:])):
+            expected_axis, expected_angle = q.axis_angle()
+            numpy.testing.assert_allclose(axis, expected_axis)
+            self.assertAlmostEqual(angle, expected_angle)
+        numpy.testing.assert_allclose(from_axis_angle(axes, angles).components, components, atol=1e-15)
+
+        with self.assertRaises(ValueError):
+            from_axis_angle((0, 0, 0), 1.0)
+        with self.assertRaises(ZeroDivisionError):
+            to_axis_angle(numpy.zeros((2, 4)))
+
 
 if __name__ == '__main__':
     unittest.main()
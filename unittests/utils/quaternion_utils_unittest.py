@@ -5,8 +5,14 @@ from __future__ import absolute_import
 import unittest
 import math
 import cmath
-from utils.quaternion_utils import exp, ln, geodesic_distance
+import numpy
+from utils.quaternion_utils import exp, ln, geodesic_distance, slerp, squad
+from utils.quaternion_utils import exp_array, ln_array, power_array
+from utils.quaternion_utils import geodesic_distance_array, geodesic_distance_matrix
+from utils.quaternion_utils import AngularVelocityIntegrator, integrate_angular_velocity
+from utils.quaternion_utils import integrate_angular_velocity_stream, mean, MeanAccumulator
 from quaternion import Quaternion
+from quaternion_array import QuaternionArray, as_components
 from quaternionic_integer import QuaternionicInteger
 
 
@@ -70,6 +76,246 @@ class QuaternionUtilsTestCase(unittest.TestCase):
         with self.assertRaises(TypeError):
             geodesic_distance('a', self.q1)
 
+    def test_geodesic_values(self):
+        self.assertAlmostEqual(geodesic_distance(Quaternion(1), Quaternion(0, 1)), math.pi / 2)
+        self.assertAlmostEqual(geodesic_distance(self.q1, 2 * self.q1), 0)
+        self.assertAlmostEqual(geodesic_distance(self.q1, -self.q1), math.pi)
+        self.assertAlmostEqual(geodesic_distance(self.q1, self.q2),
+                               ln(self.q1.unit().reciprocal() * self.q2.unit()).norm())
+        with self.assertRaises(ZeroDivisionError):
+            geodesic_distance(self.q1, Quaternion())
+
+    def test_array_functions(self):
+        quaternions = [self.q1, self.q2, self.iq1, Quaternion(2.5), Quaternion(-3)]
+        qa = QuaternionArray.from_quaternions(quaternions)
+        for function, scalar_function in ((exp_array, exp), (ln_array, ln)):
+            result = function(qa)
+            self.assertIsInstance(result, QuaternionArray)
+            for q1, q2 in zip(result, quaternions):
+                self.assert_quaternion_equal(q1, scalar_function(q2))
+            self.assertIsInstance(function(qa.components), numpy.ndarray)
+        for exponent in (2, -1, 0.37):
+            for q1, q2 in zip(power_array(qa, exponent), quaternions):
+                self.assert_quaternion_equal(q1, q2 ** exponent)
+        exponents = numpy.array([2, -1, 0.5, 3, 1])
+        for q1, q2, x in zip(power_array(qa, exponents), quaternions, exponents):
+            self.assert_quaternion_equal(q1, q2 ** float(x))
+
+    def test_geodesic_arrays(self):
+        a = [self.q1, self.q2, self.iq1]
+        b = [self.iq2, self.q1, Quaternion(0.3, 0.2, -0.1, 0.9)]
+        qa = QuaternionArray.from_quaternions(a)
+        qb = QuaternionArray.from_quaternions(b)
+        distances = geodesic_distance_array(qa, qb)
+        for d, q1, q2 in zip(distances, a, b):
+            self.assertAlmostEqual(d, geodesic_distance(q1, q2))
+        distances = geodesic_distance_array(qa, self.q2)
+        for d, q1 in zip(distances, a):
+            self.assertAlmostEqual(d, geodesic_distance(q1, self.q2))
+        matrix = geodesic_distance_matrix(qa, qb.components[:2])
+        self.assertEqual(matrix.shape, (3, 2))
+        for i, q1 in enumerate(a):
+            for j, q2 in enumerate(b[:2]):
+                self.assertAlmostEqual(matrix[i, j], geodesic_distance(q1, q2))
+        self.assertTrue(numpy.all(numpy.diag(geodesic_distance_matrix(qa)) == 0))
+        #close and opposite pairs agree with the elementwise version too
+        qc = QuaternionArray.from_quaternions([self.q1 + Quaternion(0, 1e-9), -self.q2, self.iq1])
+        numpy.testing.assert_allclose(numpy.diag(geodesic_distance_matrix(qa, qc)),
+                                      geodesic_distance_array(qa, qc), rtol=1e-12, atol=0)
+
+    def test_geodesic_array_validation(self):
+        qa = QuaternionArray.from_quaternions([self.q1, self.q2])
+        for bad in (self.q1, [1.0, 2.0, 3.0, 4.0], numpy.ones((2, 3)), numpy.ones((2, 2, 4))):
+            with self.assertRaises(ValueError):
+                geodesic_distance_matrix(bad)
+            with self.assertRaises(ValueError):
+                geodesic_distance_matrix(qa, bad)
+        with self.assertRaises(ValueError):
+            geodesic_distance_array(qa, numpy.ones((2, 2, 4)))
+        zeros = QuaternionArray.from_quaternions([self.q1, Quaternion(0)])
+        for function in (geodesic_distance_array, geodesic_distance_matrix):
+            with self.assertRaises(ZeroDivisionError):
+                function(zeros, qa)
+            with self.assertRaises(ZeroDivisionError):
+                function(qa, zeros)
+        with self.assertRaises(ZeroDivisionError):
+            geodesic_distance_array(qa, Quaternion(0))
+
+    def test_slerp(self):
+        q2 = -self.q2 #same hemisphere as q1
+        u1 = self.q1.unit()
+        u2 = q2.unit()
+        self.assert_quaternion_equal(slerp(self.q1, q2, 0), u1)
+        self.assert_quaternion_equal(slerp(self.q1, q2, 1), u2)
+        #slerp(q1, q2, t) == q1 (q1^-1 q2)^t
+        self.assert_quaternion_equal(slerp(self.q1, q2, 0.3),
+                                     u1 * (u1.reciprocal() * u2) ** 0.3)
+        #shorter arc is taken for antipodal representations
+        self.assert_quaternion_equal(slerp(self.q1, self.q2, 0.3),
+                                     u1 * (u1.reciprocal() * u2) ** 0.3)
+        #nearly parallel inputs
+        q = Quaternion(1, 1e-9, 0, 0)
+        self.assert_quaternion_equal(slerp(Quaternion(1), q, 0.5), Quaternion(1, 5e-10, 0, 0))
+
+    def test_slerp_batched(self):
+        t = numpy.linspace(0, 1, 5)
+        samples = slerp(self.q1, self.q2, t)
+        self.assertIsInstance(samples, QuaternionArray)
+        self.assertEqual(len(samples), 5)
+        for sample, x in zip(samples, t):
+            self.assert_quaternion_equal(sample, slerp(self.q1, self.q2, x))
+        keyframes = QuaternionArray.from_quaternions([self.q1, self.q2])
+        samples = slerp(keyframes, keyframes[::-1], numpy.array([0.25, 0.75]))
+        self.assert_quaternion_equal(samples[0], slerp(self.q1, self.q2, 0.25))
+        self.assert_quaternion_equal(samples[1], slerp(self.q2, self.q1, 0.75))
+
+    def test_squad(self):
+        quaternions = [self.q1, self.q2, Quaternion(0.3, -0.1, 0.8, 0.2), Quaternion(1, 1, 0, 0)]
+        keyframes = QuaternionArray.from_quaternions(quaternions)
+        samples = squad(keyframes, numpy.arange(4))
+        for sample, q in zip(samples, quaternions):
+            #keyframes are passed through, up to sign
+            if sample.scalar * q.scalar < 0:
+                sample = -sample
+            self.assert_quaternion_equal(sample, q.unit())
+        samples = squad(keyframes, numpy.linspace(0, 3, 50))
+        numpy.testing.assert_allclose(samples.norm(), numpy.ones(50))
+        with self.assertRaises(ValueError):
+            squad(keyframes[:1], 0)
+        with self.assertRaises(TypeError):
+            squad(quaternions, 0)
+
+    def test_integrate_angular_velocity(self):
+        #constant rotation about z at 1 rad/s for 1 s
+        omega = numpy.tile([0.0, 0.0, 1.0], (1000, 1))
+        for method in ('exp', 'rk4'):
+            orientations = integrate_angular_velocity(omega, 1e-3, method=method)
+            self.assertIsInstance(orientations, QuaternionArray)
+            self.assertEqual(len(orientations), 1000)
+            self.assert_quaternion_equal(orientations[-1], Quaternion(math.cos(0.5), 0, 0, math.sin(0.5)))
+
+        #the closed form matches multiplying exponentials one sample at a time
+        t = numpy.arange(500) * 1e-2
+        omega = numpy.column_stack([numpy.sin(3 * t), numpy.cos(2 * t), 0.5 * t])
+        q = self.q1.unit()
+        for w in omega:
+            q = q * exp(Quaternion(0, *(w * 0.5e-2)))
+        self.assert_quaternion_equal(integrate_angular_velocity(omega, 1e-2, self.q1.unit())[-1], q)
+
+        #rk4 is exact for a linearly increasing rate about a fixed axis
+        omega = numpy.column_stack([0 * t, t, 0 * t])[:200]
+        q = integrate_angular_velocity(omega, 1e-2, method='rk4')[-1]
+        self.assertAlmostEqual(2 * math.atan2(q.j, q.scalar), t[199] ** 2 / 2)
+
+    def test_integrator_streaming(self):
+        t = numpy.arange(300) * 1e-3
+        omega = numpy.column_stack([numpy.sin(3 * t), numpy.cos(2 * t), 0.5 * t])
+        dt = numpy.full(300, 1e-3)
+        for method in ('exp', 'rk4'):
+            expected = integrate_angular_velocity(omega, dt, self.q2, method).components
+            chunks = integrate_angular_velocity_stream(numpy.array_split(omega, 7), 1e-3, self.q2, method)
+            numpy.testing.assert_allclose(numpy.concatenate([c.components for c in chunks]), expected)
+
+        integrator = AngularVelocityIntegrator(self.q2, renormalize=False)
+        integrator.update(omega, 1e-3)
+        self.assertAlmostEqual(integrator.state.norm(), self.q2.norm())
+        self.assertEqual(len(integrator.update(numpy.empty((0, 3)), 1e-3)), 0)
+
+        with self.assertRaises(ValueError):
+            AngularVelocityIntegrator(method='euler')
+        with self.assertRaises(ValueError):
+            integrator.update(numpy.zeros((4, 4)), 1e-3)
+
+    def test_integrator_multiple_sensors(self):
+        t = numpy.arange(100) * 1e-3
+        omega = numpy.stack([numpy.column_stack([t, 0 * t, 0 * t]),
+                             numpy.column_stack([numpy.sin(t), numpy.cos(t), t])], axis=1)
+        initial = QuaternionArray.from_quaternions([Quaternion(1.0), self.q1.unit()])
+        integrator = AngularVelocityIntegrator(initial, method='rk4')
+        orientations = integrator.update(omega, 1e-3)
+        self.assertEqual(orientations.shape, (100, 2, 4))
+        for sensor in range(2):
+            single = integrate_angular_velocity(omega[:, sensor], 1e-3, initial[sensor], 'rk4')
+            numpy.testing.assert_allclose(orientations[:, sensor], single.components)
+        numpy.testing.assert_allclose(integrator.state, orientations[-1])
+        with self.assertRaises(ValueError):
+            integrator.update(omega[:, 0], 1e-3)
+
+    def test_mean(self):
+        #the mean is unaffected by the sign and norm of each quaternion
+        q = Quaternion(0.8, 0.6, 0, 0)
+        self.assertAlmostEqual(geodesic_distance(mean([q, -q, 2 * q]), q), 0)
+        r = exp(Quaternion(0, 0, 0, 0.2))
+        self.assertAlmostEqual(geodesic_distance(mean([r, r.conjugate()]), Quaternion(1)), 0)
+        #the mean of two rotations about one axis lies between them, nearer the heavier one
+        rotations = [Quaternion(1), -exp(Quaternion(0, 0.3, 0, 0))]
+        m = mean(rotations)
+        self.assertAlmostEqual(geodesic_distance(m, exp(Quaternion(0, 0.15, 0, 0))), 0)
+        self.assertGreaterEqual(m.scalar, 0)
+        angle = ln(mean(rotations, weights=[2, 1])).i
+        self.assertTrue(0 < angle < 0.15)
+
+        rng = numpy.random.default_rng(5)
+        frames = rng.normal(size=(3, 50, 4))
+        weights = rng.uniform(size=(3, 50))
+        means = mean(frames, weights)
+        self.assertIsInstance(means, QuaternionArray)
+        for frame in range(3):
+            numpy.testing.assert_allclose(means.components[frame],
+                                          as_components(mean(frames[frame], weights[frame])))
+            self.assertEqual(mean(QuaternionArray(frames[frame])), mean(frames[frame]))
+        with self.assertRaises(ValueError):
+            mean([])
+        with self.assertRaises(ValueError):
+            mean([q], weights=[0])
+        with self.assertRaises(ValueError):
+            mean([q, q], weights=[1, -1])
+        with self.assertRaises(ValueError):
+            mean([q, q], weights=[1])
+        #zero quaternions have no direction and carry no weight
+        self.assertAlmostEqual(geodesic_distance(mean([Quaternion(0), q], weights=[5, 1]), q), 0)
+        with self.assertRaises(ValueError):
+            mean([Quaternion(0), Quaternion(0)])
+        with self.assertRaises(ValueError):
+            mean(numpy.zeros((2, 3, 4)))
+        with self.assertRaises(ValueError):
+            mean([q], weights=[numpy.inf])
+        with self.assertRaises(ValueError):
+            mean([q], weights=[numpy.nan])
+
+    def test_mean_accumulator(self):
+        rng = numpy.random.default_rng(6)
+        components = rng.normal(size=(1000, 4))
+        weights = rng.uniform(size=1000)
+        accumulator = MeanAccumulator()
+        with self.assertRaises(ValueError):
+            accumulator.mean()
+        for start in range(0, 600, 200):
+            accumulator.update(components[start:start + 200], weights[start:start + 200])
+        other = MeanAccumulator()
+        other.update(QuaternionArray(components[600:]), weights[600:])
+        accumulator.merge(other)
+        self.assertEqual(accumulator.count, 1000)
+        self.assertAlmostEqual(accumulator.weight, weights.sum())
+        expected = mean(components, weights)
+        self.assertAlmostEqual(geodesic_distance(accumulator.mean(), expected), 0)
+
+        accumulator = MeanAccumulator()
+        accumulator.update(self.q1)
+        accumulator.update([self.q2, self.q1])
+        self.assertEqual(accumulator.count, 3)
+        self.assertAlmostEqual(geodesic_distance(accumulator.mean(), mean([self.q1, self.q2, self.q1])), 0)
+        with self.assertRaises(TypeError):
+            accumulator.merge(self.q1)
+
+        accumulator = MeanAccumulator()
+        accumulator.update([Quaternion(0)])
+        self.assertEqual((accumulator.count, accumulator.weight), (1, 0.0))
+        with self.assertRaises(ValueError):
+            accumulator.mean()
+        with self.assertRaises(ValueError):
+            accumulator.update([self.q1], weights=[numpy.inf])
+
 
 if __name__ == '__main__':
     unittest.main()
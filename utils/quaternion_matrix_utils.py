@@ -2,8 +2,12 @@
 
 from __future__ import absolute_import
 
+from functools import lru_cache
+from numbers import Complex
+import math
 import numpy as np
 from quaternion import Quaternion
+from quaternion_array import QuaternionArray, hamilton_product
 
 
 def complex_matrix(q):
@@ -13,17 +17,17 @@ def complex_matrix(q):
        
     The addition and multiplication of the matrices correspond to the addition
     and multiplication of the quaternions.
+
+    If the matrix cache is enabled, the returned array is shared and read-only.
     '''
 
     if not isinstance(q, Quaternion):
         raise TypeError('Argument must be quaternion or quaternion subclass')
 
-    a, b, c, d = Quaternion(q).to_list()
-
-    row1 = [complex(a, b), complex(c, d)]
-    row2 = [complex(-c, d), complex(a, -b)]
-
-    arr = np.array([row1, row2], dtype=np.complex128)
+    if _matrix_caches is not None:
+        arr = _matrix_caches[1](tuple(_components(q)))
+    else:
+        arr = _complex_matrix(*_components(q))
 
     if hasattr(np, 'matmul'):
         return arr
@@ -37,25 +41,51 @@ The function returns a matrix with real numbers as elements.
 
 The addition and multiplication of the matrices correspond to the addition and
 multiplication of the quaternions.
+
+If the matrix cache is enabled, the returned array is shared and read-only.
     '''
 
     if not isinstance(q, Quaternion):
         raise TypeError('Argument must be quaternion or quaternion subclass')
 
-    a, b, c, d = Quaternion(q).to_list()
-
-    row1 = [a, -b, -c, -d]
-    row2 = [b, a, -d, c]
-    row3 = [c, d, a, -b]
-    row4 = [d, -c, b, a]
-
-    arr = np.array([row1, row2, row3, row4], dtype=np.float64)
+    if _matrix_caches is not None:
+        arr = _matrix_caches[0](tuple(_components(q)))
+    else:
+        arr = _real_matrix(*_components(q))
 
     if hasattr(np, 'matmul'):
         return arr
     return np.mat(arr)
 
 
+def enable_matrix_cache(maxsize=4096):
+    '''Cache the results of real_matrix and complex_matrix in bounded
+    least-recently-used caches keyed by the quaternion's components.
+
+    Useful when the same orientations are converted repeatedly.  Cached matrices
+    are shared between callers, so they are returned read-only.  Enabling the
+    cache again replaces it with an empty one of the new size.
+    '''
+    global _matrix_caches
+    _matrix_caches = (lru_cache(maxsize)(_readonly(_real_matrix)),
+                      lru_cache(maxsize)(_readonly(_complex_matrix)))
+
+
+def disable_matrix_cache():
+    '''Stop caching matrices and discard the cached ones'''
+    global _matrix_caches
+    _matrix_caches = None
+
+
+def matrix_cache_info():
+    '''The statistics of the real and complex matrix caches as a dictionary of
+    functools cache info tuples, or None if the cache is disabled
+    '''
+    if _matrix_caches is None:
+        return None
+    return {'real': _matrix_caches[0].cache_info(), 'complex': _matrix_caches[1].cache_info()}
+
+
 def matrix_to_quaternion(_a):
     '''Factory function creating a quaternion from a numpy array.
     
@@ -63,9 +93,7 @@ def matrix_to_quaternion(_a):
     multiplication of the matrices.
     '''
 
-    a = _a
-    if hasattr(np, 'array'):
-        a = np.array(_a)
+    a = np.asarray(_a)
 
     if a.dtype.name[:7] == 'complex':
 
@@ -79,5 +107,426 @@ def matrix_to_quaternion(_a):
     if a.shape != (4, 4):
         raise ValueError('Real array must be 4 x 4 for quaternion conversion')
 
-    s, i, j, k = np.transpose(a)[0]
+    s, i, j, k = a[:, 0].tolist()
     return Quaternion(s, i, j, k)
+
+
+def complex_matrices(quaternions):
+    '''Batched complex_matrix: the 2 x 2 complex matrices of many quaternions at once.
+
+    Accepts a QuaternionArray or an (N, 4) array of components and returns an
+    (N, 2, 2) complex NumPy array.
+    '''
+
+    a, b, c, d = _component_columns(quaternions)
+
+    out = np.empty((len(a), 2, 2), dtype=np.complex128)
+    out.real[:, 0, 0] = a
+    out.imag[:, 0, 0] = b
+    out.real[:, 0, 1] = c
+    out.imag[:, 0, 1] = d
+    out.real[:, 1, 0] = -c
+    out.imag[:, 1, 0] = d
+    out.real[:, 1, 1] = a
+    out.imag[:, 1, 1] = -b
+    return out
+
+
+def real_matrices(quaternions):
+    '''Batched real_matrix: the 4 x 4 real matrices of many quaternions at once.
+
+    Accepts a QuaternionArray or an (N, 4) array of components and returns an
+    (N, 4, 4) float64 NumPy array.
+    '''
+
+    a, b, c, d = _component_columns(quaternions)
+
+    out = np.empty((len(a), 4, 4), dtype=np.float64)
+    out[:, 0, 0] = out[:, 1, 1] = out[:, 2, 2] = out[:, 3, 3] = a
+    out[:, 1, 0] = out[:, 3, 2] = b
+    out[:, 0, 1] = out[:, 2, 3] = -b
+    out[:, 2, 0] = out[:, 1, 3] = c
+    out[:, 0, 2] = out[:, 3, 1] = -c
+    out[:, 3, 0] = out[:, 2, 1] = d
+    out[:, 0, 3] = out[:, 1, 2] = -d
+    return out
+
+
+def matrices_to_quaternions(matrices):
+    '''Batched matrix_to_quaternion: convert an (N, 2, 2) complex or (N, 4, 4) real
+    stack of matrices back to a QuaternionArray.
+    '''
+
+    a = np.asarray(matrices)
+
+    if np.iscomplexobj(a):
+
+        if a.ndim != 3 or a.shape[1:] != (2, 2):
+            raise ValueError('Complex array must be N x 2 x 2 for quaternion conversion')
+
+        out = np.empty((len(a), 4), dtype=np.float64)
+        out[:, 0] = a.real[:, 0, 0]
+        out[:, 1] = a.imag[:, 0, 0]
+        out[:, 2] = a.real[:, 0, 1]
+        out[:, 3] = a.imag[:, 0, 1]
+        return QuaternionArray(out)
+
+    if a.ndim != 3 or a.shape[1:] != (4, 4):
+        raise ValueError('Real array must be N x 4 x 4 for quaternion conversion')
+
+    return QuaternionArray(a[:, :, 0])
+
+
+_matrix_caches = None
+
+
+def _real_matrix(a, b, c, d):
+    '''The real 4 x 4 matrix of the quaternion with the given components'''
+
+    row1 = [a, -b, -c, -d]
+    row2 = [b, a, -d, c]
+    row3 = [c, d, a, -b]
+    row4 = [d, -c, b, a]
+
+    return np.array([row1, row2, row3, row4], dtype=np.float64)
+
+
+def _complex_matrix(a, b, c, d):
+    '''The complex 2 x 2 matrix of the quaternion with the given components'''
+
+    row1 = [complex(a, b), complex(c, d)]
+    row2 = [complex(-c, d), complex(a, -b)]
+
+    return np.array([row1, row2], dtype=np.complex128)
+
+
+def _readonly(build):
+    '''Wrap a matrix builder taking a tuple of components to return read-only arrays'''
+    def build_readonly(components):
+        arr = build(*components)
+        arr.setflags(write=False)
+        return arr
+    return build_readonly
+
+
+def _components(q):
+    '''The components of a quaternion or number as a list'''
+    if isinstance(q, Complex):
+        return [float(q.real), float(q.imag), 0.0, 0.0]
+    return q.to_list()
+
+
+def _component_array(quaternions):
+    '''The (N, 4) component array of a QuaternionArray or array-like'''
+    if isinstance(quaternions, QuaternionArray):
+        arr = quaternions.components
+    else:
+        arr = np.asarray(quaternions, dtype=np.float64)
+    if arr.ndim != 2 or arr.shape[1] != 4:
+        raise ValueError('Quaternion components must have shape (N, 4)')
+    return arr
+
+
+def _component_columns(quaternions):
+    '''The four component columns of a QuaternionArray or (N, 4) array'''
+    arr = _component_array(quaternions)
+    return arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3]
+
+
+def _rotation_matrices(components):
+    '''The 3 x 3 rotation matrices of a (..., 4) array of quaternion components.
+
+    The quaternions need not be unit quaternions; each matrix rotates a vector v
+    the same way as q * v * q.reciprocal().
+    '''
+
+    w, x, y, z = components[..., 0], components[..., 1], components[..., 2], components[..., 3]
+    norm_squared = w * w + x * x + y * y + z * z
+    if np.any(norm_squared == 0):
+        raise ZeroDivisionError('Cannot rotate by a zero quaternion')
+    s = 2.0 / norm_squared
+
+    out = np.empty(components.shape[:-1] + (3, 3), dtype=np.float64)
+    out[..., 0, 0] = 1.0 - s * (y * y + z * z)
+    out[..., 0, 1] = s * (x * y - w * z)
+    out[..., 0, 2] = s * (x * z + w * y)
+    out[..., 1, 0] = s * (x * y + w * z)
+    out[..., 1, 1] = 1.0 - s * (x * x + z * z)
+    out[..., 1, 2] = s * (y * z - w * x)
+    out[..., 2, 0] = s * (x * z - w * y)
+    out[..., 2, 1] = s * (y * z + w * x)
+    out[..., 2, 2] = 1.0 - s * (x * x + y * y)
+    return out
+
+
+def rotate_points(q, points):
+    '''Rotate 3D points by a quaternion, as q * p * q.reciprocal() does for each point p.
+
+    q may be a single quaternion, which rotates every point, or a QuaternionArray
+    with one quaternion per point.  points must be an (N, 3) array or a single 3-vector.
+    Returns a NumPy array of the same shape as points.
+    '''
+
+    pts = np.asarray(points, dtype=np.float64)
+    if pts.shape[-1:] != (3,) or pts.ndim > 2:
+        raise ValueError('Points must be an N x 3 array or a 3-vector')
+
+    if isinstance(q, QuaternionArray):
+        if len(q) != len(np.atleast_2d(pts)):
+            raise ValueError('Number of quaternions must match number of points')
+        matrices = _rotation_matrices(q.components)
+        rotated = np.matmul(matrices, np.atleast_2d(pts)[..., np.newaxis])[..., 0]
+        return rotated.reshape(pts.shape)
+
+    if not isinstance(q, Quaternion):
+        raise TypeError('First argument must be quaternion, quaternion subclass or QuaternionArray')
+
+    if isinstance(q, Complex):
+        q = Quaternion(float(q.real), float(q.imag))
+
+    matrix = _rotation_matrices(np.array([q.scalar, q.i, q.j, q.k], dtype=np.float64))
+    return pts @ matrix.T
+
+
+def to_rotation_matrix(q):
+    '''The 3 x 3 rotation matrix of a quaternion as a NumPy array.
+
+    q may be a single quaternion, giving a (3, 3) array, or a QuaternionArray or
+    (N, 4) array of components, giving an (N, 3, 3) array.  The quaternions need
+    not be unit quaternions.
+    '''
+
+    if isinstance(q, Quaternion):
+        return np.array(_single(q).rotation_matrix(), dtype=np.float64)
+    return _rotation_matrices(_component_array(q))
+
+
+def from_rotation_matrix(matrix):
+    '''The unit quaternion of a 3 x 3 rotation matrix, by Shepperd's method.
+
+    A (3, 3) array gives a Quaternion and an (N, 3, 3) array a QuaternionArray.
+    The quaternion is computed from whichever of the trace and the diagonal
+    elements is largest, which keeps the division well conditioned, and is
+    returned with a non-negative scalar part.  The matrices are assumed to be
+    proper rotations.
+    '''
+
+    m = np.asarray(matrix, dtype=np.float64)
+    if m.shape[-2:] != (3, 3) or m.ndim not in (2, 3):
+        raise ValueError('Rotation matrix must be 3 x 3 or N x 3 x 3')
+
+    out = _shepperd(m.reshape(-1, 3, 3))
+    if m.ndim == 2:
+        return Quaternion(*out[0].tolist())
+    return QuaternionArray(out)
+
+
+def to_euler(q, order='zyx'):
+    '''The Euler angles of the rotation represented by a quaternion.
+
+    order is one of the twelve axis sequences, such as 'zyx' or 'zxz', and the
+    angles (a, b, c) describe intrinsic rotations: q rotates vectors as
+    from_euler((a, b, c), order) does, the product of rotations by a about the
+    first axis, b about the second and c about the third.  Extrinsic angles are
+    the same angles in the reversed order.
+
+    The first and third angles are in [-pi, pi]; the second is in [0, pi] for
+    sequences that repeat an axis and in [-pi/2, pi/2] otherwise.  At a gimbal
+    lock the third angle is set to 0.
+
+    A single quaternion gives a tuple of three floats, and a QuaternionArray or
+    (N, 4) array of components gives an (N, 3) array.
+    '''
+
+    axes = _euler_axes(order)
+    if isinstance(q, Quaternion):
+        angles = _euler_angles(_single_components(q)[np.newaxis], axes)
+        return tuple(angles[0].tolist())
+    return _euler_angles(_component_array(q), axes)
+
+
+def from_euler(angles, order='zyx'):
+    '''The unit quaternion of a sequence of intrinsic rotations, the inverse of to_euler.
+
+    angles is a 3-vector, giving a Quaternion, or an (N, 3) array, giving a
+    QuaternionArray.
+
+        >>> from_euler((math.pi / 2, 0, 0), 'zyx')
+        0.7071 + 0.0000i + 0.0000j + 0.7071k
+    '''
+
+    axes = _euler_axes(order)
+    arr = np.asarray(angles, dtype=np.float64)
+    if arr.shape[-1:] != (3,) or arr.ndim not in (1, 2):
+        raise ValueError('Euler angles must be a 3-vector or an N x 3 array')
+
+    rows = arr.reshape(-1, 3)
+    out = _axis_rotations(rows[:, 0], axes[0])
+    for column, axis in ((1, axes[1]), (2, axes[2])):
+        out = hamilton_product(out, _axis_rotations(rows[:, column], axis))
+
+    if arr.ndim == 1:
+        return Quaternion(*out[0].tolist())
+    return QuaternionArray(out)
+
+
+def to_axis_angle(q):
+    '''The rotation represented by a quaternion as a unit axis and an angle in [0, 2 pi].
+
+    A single quaternion gives the same result as Quaternion.axis_angle().  A
+    QuaternionArray or (N, 4) array of components gives an (N, 3) array of axes
+    and an (N,) array of angles.  The axis of a rotation by 0 is (1, 0, 0).
+    '''
+
+    if isinstance(q, Quaternion):
+        return _single(q).axis_angle()
+
+    arr = _component_array(q)
+    sines = np.sqrt(np.einsum('ij,ij->i', arr[:, 1:], arr[:, 1:]))
+    if np.any((sines == 0) & (arr[:, 0] == 0)):
+        raise ZeroDivisionError('A zero quaternion does not represent a rotation')
+
+    angles = 2.0 * np.arctan2(sines, arr[:, 0])
+    axes = np.zeros((len(arr), 3), dtype=np.float64)
+    axes[:, 0] = 1.0
+    nonzero = sines != 0
+    axes[nonzero] = arr[nonzero, 1:] / sines[nonzero, np.newaxis]
+    return axes, angles
+
+
+def from_axis_angle(axis, angle):
+    '''The unit quaternion of a rotation by angle radians about axis, the inverse of
+    to_axis_angle.
+
+    axis is a 3-vector, giving a Quaternion, or an (N, 3) array, giving a
+    QuaternionArray; angle is a number or an array broadcastable to (N,).  The
+    axes need not be unit vectors but must not be zero.
+    '''
+
+    axes = np.asarray(axis, dtype=np.float64)
+    if axes.shape[-1:] != (3,) or axes.ndim not in (1, 2):
+        raise ValueError('Axis must be a 3-vector or an N x 3 array')
+
+    rows = axes.reshape(-1, 3)
+    lengths = np.sqrt(np.einsum('ij,ij->i', rows, rows))
+    if np.any(lengths == 0):
+        raise ValueError('Rotation axis must not be zero')
+
+    halves = 0.5 * np.broadcast_to(np.asarray(angle, dtype=np.float64), lengths.shape)
+    out = np.empty((len(rows), 4), dtype=np.float64)
+    out[:, 0] = np.cos(halves)
+    out[:, 1:] = rows * (np.sin(halves) / lengths)[:, np.newaxis]
+
+    if axes.ndim == 1:
+        return Quaternion(*out[0].tolist())
+    return QuaternionArray(out)
+
+
+_EULER_ORDERS = frozenset(a + b + c for a in 'xyz' for b in 'xyz' for c in 'xyz'
+                          if a != b and b != c)
+
+_EULER_EPSILON = 1e-7
+
+
+def _single(q):
+    '''A quaternion, with complex numbers converted to Quaternions'''
+    if isinstance(q, Complex):
+        return Quaternion(float(q.real), float(q.imag))
+    return q
+
+
+def _single_components(q):
+    '''The components of a single quaternion or number as a (4,) float64 array'''
+    return np.array(_components(q), dtype=np.float64)
+
+
+def _euler_axes(order):
+    '''The axis indices, 0 to 2, of an Euler angle sequence such as xyz or zxz'''
+    if not isinstance(order, str) or order.lower() not in _EULER_ORDERS:
+        raise ValueError(f'Euler angle order must be one of {", ".join(sorted(_EULER_ORDERS))}')
+    return tuple('xyz'.index(axis) for axis in order.lower())
+
+
+def _axis_rotations(angles, axis):
+    '''The (N, 4) components of rotations by an array of angles about a coordinate axis'''
+    out = np.zeros((len(angles), 4), dtype=np.float64)
+    out[:, 0] = np.cos(0.5 * angles)
+    out[:, axis + 1] = np.sin(0.5 * angles)
+    return out
+
+
+def _shepperd(m):
+    '''The (N, 4) unit quaternion components of an (N, 3, 3) stack of rotation matrices'''
+
+    trace = m[:, 0, 0] + m[:, 1, 1] + m[:, 2, 2]
+    largest = np.argmax(np.stack([trace, m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]], axis=1), axis=1)
+
+    out = np.empty((len(m), 4), dtype=np.float64)
+
+    rows = largest == 0
+    mm = m[rows]
+    out[rows, 0] = 1.0 + trace[rows]
+    out[rows, 1] = mm[:, 2, 1] - mm[:, 1, 2]
+    out[rows, 2] = mm[:, 0, 2] - mm[:, 2, 0]
+    out[rows, 3] = mm[:, 1, 0] - mm[:, 0, 1]
+
+    # With the i-th diagonal element largest, the i-th vector component is largest
+    for i in range(3):
+        j, k = (i + 1) % 3, (i + 2) % 3
+        rows = largest == i + 1
+        mm = m[rows]
+        out[rows, 0] = mm[:, k, j] - mm[:, j, k]
+        out[rows, i + 1] = 1.0 + 2.0 * mm[:, i, i] - trace[rows]
+        out[rows, j + 1] = mm[:, i, j] + mm[:, j, i]
+        out[rows, k + 1] = mm[:, i, k] + mm[:, k, i]
+
+    out /= np.sqrt(np.einsum('ij,ij->i', out, out))[:, np.newaxis]
+    out[out[:, 0] < 0] *= -1.0
+    return out
+
+
+def _euler_angles(components, axes):
+    '''The (N, 3) intrinsic Euler angles of an (N, 4) array of quaternion components.
+
+    Bernardes and Viollet's direct method, which handles all twelve sequences by
+    permuting the components.  It is stated for extrinsic rotations, so the
+    sequence is reversed on the way in and the angles on the way out.  At a
+    gimbal lock the combined angle is assigned to the first axis.
+    '''
+
+    i, j, k = axes[2], axes[1], axes[0]
+    symmetric = i == k
+    if symmetric:
+        k = 3 - i - j
+    sign = (i - j) * (j - k) * (k - i) // 2
+
+    w, v = components[:, 0], components[:, 1:]
+    if symmetric:
+        a, b, c, d = w, v[:, i], v[:, j], v[:, k] * sign
+    else:
+        a, b = w - v[:, j], v[:, i] + v[:, k] * sign
+        c, d = v[:, j] + w, v[:, k] * sign - v[:, i]
+
+    angles = np.empty((len(components), 3), dtype=np.float64)
+    angles[:, 1] = 2.0 * np.arctan2(np.hypot(c, d), np.hypot(a, b))
+
+    half_sum = np.arctan2(b, a)
+    half_diff = np.arctan2(d, c)
+    low = np.abs(angles[:, 1]) <= _EULER_EPSILON
+    high = np.abs(angles[:, 1] - np.pi) <= _EULER_EPSILON
+    regular = ~(low | high)
+
+    angles[:, 0] = np.where(regular, half_sum - half_diff, 0.0)
+    angles[:, 2] = np.where(low, 2.0 * half_sum, 2.0 * half_diff)
+    angles[regular, 2] = half_sum[regular] + half_diff[regular]
+
+    if not symmetric:
+        angles[:, 2] *= sign
+        angles[:, 1] -= np.pi / 2
+
+    angles[:, [0, 2]] = angles[:, [2, 0]]
+
+    wrapped = (angles[:, [0, 2]] + np.pi) % (2.0 * np.pi) - np.pi
+    wrapped[wrapped == -np.pi] = np.pi
+    angles[:, [0, 2]] = wrapped
+    return angles
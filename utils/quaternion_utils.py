@@ -5,34 +5,40 @@ from __future__ import division
 
 import math
 import cmath
+from numbers import Complex, Real
+import numpy as np
 from quaternion import Quaternion
+from quaternion_array import CONJUGATE, QuaternionArray, as_components, cumulative_product, hamilton_product
+from quaternion_array import pairwise_angles, principal_eigenvector, unit_components
+
+# Cosine of the angle above which slerp falls back to normalized linear interpolation
+_NLERP_THRESHOLD = 0.9995
 
 def exp(q):
     '''Calculates the exponential of a quaternion.
         
         Also accepts real and complex numbers.'''
-    try:
-        a = math.exp(q.scalar)
-        b = math.cos(q.vector().norm())
-        c = q.unit_vector() * math.sin(q.vector().norm())
-        return a * (b + c)
-    except AttributeError:
-        try:
-            return math.exp(q)
-        except TypeError:
-            return cmath.exp(q)
+    if isinstance(q, Real):
+        return math.exp(q)
+    if not isinstance(q, Quaternion) or isinstance(q, Complex):
+        return cmath.exp(q)
+    a = math.exp(q.scalar)
+    v_norm = math.sqrt(q.i * q.i + q.j * q.j + q.k * q.k)
+    f = a * math.sin(v_norm) / v_norm if v_norm else 0.0
+    return Quaternion(a * math.cos(v_norm), q.i * f, q.j * f, q.k * f)
 
 def ln(q):
     '''Calculates the natural logarithm of a quaternion.
         
         Also accepts real and complex numbers.'''
-    try:
-        return math.log(q.norm()) + q.unit_vector() * math.acos(q.scalar / q.norm())
-    except AttributeError:
-        try:
-            return math.log(q)
-        except TypeError:
-            return cmath.log(q)
+    if isinstance(q, Real):
+        return math.log(q)
+    if not isinstance(q, Quaternion) or isinstance(q, Complex):
+        return cmath.log(q)
+    v_norm = math.sqrt(q.i * q.i + q.j * q.j + q.k * q.k)
+    # atan2 equals acos(scalar / norm) but cannot leave its domain through rounding
+    f = math.atan2(v_norm, q.scalar) / v_norm if v_norm else 0.0
+    return Quaternion(math.log(q.norm()), q.i * f, q.j * f, q.k * f)
 
 def geodesic_distance(q1, q2):
     '''The absolute value of half the angle subtended by two quaternions along the
@@ -41,7 +47,420 @@ def geodesic_distance(q1, q2):
         Also accepts real and complex numbers.'''
     if not isinstance(q1, Quaternion) or not isinstance(q2, Quaternion):
         raise TypeError('Both arguments must be Quaternions or a Quaternion subclass')
-    try:
-        return ln(q1.unit().reciprocal() * q2.unit()).norm()
-    except AttributeError:
-        return geodesic_distance(Quaternion(q1), Quaternion(q2))
+    a = _unit_tuple(q1)
+    b = _unit_tuple(q2)
+    # Equal to ln(q1.unit().reciprocal() * q2.unit()).norm()
+    difference = math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)))
+    total = math.sqrt(sum((x + y) ** 2 for x, y in zip(a, b)))
+    return 2 * math.atan2(difference, total)
+
+def _unit_tuple(q):
+    '''The components of a quaternion or number divided by its norm'''
+    if isinstance(q, Complex):
+        components = (float(q.real), float(q.imag), 0.0, 0.0)
+    else:
+        components = (q.scalar, q.i, q.j, q.k)
+    norm = math.sqrt(sum(x * x for x in components))
+    if not norm:
+        raise ZeroDivisionError('Geodesic distance is undefined for a zero quaternion')
+    return tuple(x / norm for x in components)
+
+
+def exp_array(quaternions):
+    '''Elementwise exponential of a QuaternionArray or (N, 4) component array,
+    returned as the same type'''
+    return _same_type(quaternions, _exp_components(_components(quaternions)))
+
+
+def ln_array(quaternions):
+    '''Elementwise natural logarithm of a QuaternionArray or (N, 4) component array,
+    returned as the same type'''
+    return _same_type(quaternions, _ln_components(_components(quaternions)))
+
+
+def power_array(quaternions, exponent):
+    '''Elementwise real power of a QuaternionArray or (N, 4) component array,
+    returned as the same type.  exponent may be a number or an array of N numbers.'''
+    arr = _components(quaternions)
+    exponent = np.asarray(exponent, dtype=np.float64)[..., np.newaxis]
+    norm = np.sqrt(np.sum(arr * arr, axis=-1, keepdims=True))
+    v_norm = np.sqrt(np.sum(arr[..., 1:] * arr[..., 1:], axis=-1, keepdims=True))
+    angle = exponent * np.arctan2(v_norm, arr[..., :1])
+    magnitude = norm ** exponent
+    out = np.empty(np.broadcast_shapes(arr.shape, exponent.shape), dtype=np.float64)
+    out[..., :1] = magnitude * np.cos(angle)
+    out[..., 1:] = arr[..., 1:] * (magnitude * np.sin(angle) / np.where(v_norm == 0, 1.0, v_norm))
+    return _same_type(quaternions, out)
+
+
+def geodesic_distance_array(a, b):
+    '''Elementwise geodesic_distance between two QuaternionArrays or (N, 4) component
+    arrays, either of which may also be a single quaternion.  Returns an array of N angles.
+        Like geodesic_distance, raises ZeroDivisionError for a zero quaternion.'''
+    ua = _geodesic_units(a, single=True)
+    ub = _geodesic_units(b, single=True)
+    difference = np.sqrt(np.sum((ua - ub) ** 2, axis=-1))
+    total = np.sqrt(np.sum((ua + ub) ** 2, axis=-1))
+    return 2 * np.arctan2(difference, total)
+
+
+def geodesic_distance_matrix(a, b=None):
+    '''Pairwise geodesic_distance between every quaternion in a and every quaternion
+    in b (or in a again when b is omitted), as an (N, M) array.
+
+        Like geodesic_distance_array, this is 2 atan2(|u - v|, |u + v|) for the unit
+        quaternions u and v; see quaternion_array.pairwise_angles.  Both arguments must
+        hold (N, 4) components (use geodesic_distance_array for a single quaternion), and a
+        zero quaternion raises ZeroDivisionError.'''
+    ua = _geodesic_units(a, single=False)
+    ub = ua if b is None else _geodesic_units(b, single=False)
+    return pairwise_angles(ua, ub)
+
+
+def slerp(q0, q1, t):
+    '''Spherical linear interpolation from q0 (t = 0) to q1 (t = 1) along the shorter arc.
+
+        q0 and q1 may be quaternions or QuaternionArrays, and t may be a number or a
+        NumPy array of interpolation parameters; all three are broadcast together.
+        Returns a Quaternion when every argument is scalar, otherwise a QuaternionArray.
+        Nearly parallel inputs are interpolated linearly and renormalized.'''
+    a = unit_components(as_components(q0))
+    b = unit_components(as_components(q1))
+    out = _slerp_components(a, b, np.asarray(t, dtype=np.float64), shortest=True)
+    if out.ndim == 1:
+        return Quaternion._make(*out.tolist())
+    return QuaternionArray(out.reshape(-1, 4))
+
+
+def squad(keyframes, t):
+    '''Spherical quadrangle interpolation through a sequence of keyframe orientations.
+
+        keyframes is a QuaternionArray of at least two quaternions and t a number or
+        NumPy array of parameters, where t = n is the nth keyframe.  The curve passes
+        through every keyframe with a continuous tangent.  Returns a QuaternionArray.'''
+    if not isinstance(keyframes, QuaternionArray):
+        raise TypeError('Keyframes must be a QuaternionArray')
+    if len(keyframes) < 2:
+        raise ValueError('At least two keyframes are required')
+
+    q = unit_components(keyframes.components)
+
+    # Flip signs so consecutive keyframes lie in the same hemisphere
+    signs = np.ones(len(q))
+    signs[1:] = np.cumprod(np.where(np.einsum('ij,ij->i', q[:-1], q[1:]) < 0, -1.0, 1.0))
+    q = q * signs[:, np.newaxis]
+
+    # Inner control points s_n = q_n exp(-(ln(q_n* q_n+1) + ln(q_n* q_n-1)) / 4)
+    s = q.copy()
+    conj = q[1:-1] * CONJUGATE
+    tangent = _ln_components(hamilton_product(conj, q[2:])) + \
+              _ln_components(hamilton_product(conj, q[:-2]))
+    s[1:-1] = hamilton_product(q[1:-1], _exp_components(tangent * -0.25))
+
+    t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+    index = np.clip(np.floor(t).astype(np.intp), 0, len(q) - 2)
+    u = t - index
+
+    outer = _slerp_components(q[index], q[index + 1], u, shortest=False)
+    inner = _slerp_components(s[index], s[index + 1], u, shortest=False)
+    return QuaternionArray(_slerp_components(outer, inner, 2 * u * (1 - u), shortest=False))
+
+
+class AngularVelocityIntegrator:
+    '''Integrate body-frame angular velocity samples, such as gyroscope readings
+    in radians per second, into orientations, q' = q (0, w) / 2.
+
+        Sample n ends an interval of length dt, over which the orientation is
+        advanced by right-multiplying an increment.  With method 'exp' the
+        increment is the closed-form exponential exp((0, w dt / 2)), which is exact
+        when w is constant over the interval.  With method 'rk4' it is the classical
+        Runge-Kutta step for w varying linearly from the previous sample, written as
+        a single quaternion so that it too can be computed for every sample at once.
+
+        Each call to update() computes all increments in vectorized passes and
+        chains them onto the current orientation with a prefix product, so there
+        is no per-sample Python loop.  With renormalize, every orientation is
+        divided by its norm, which stops rounding errors accumulating across
+        updates.
+
+        Several sensors can be integrated together: with an (S, 4) initial array of
+        orientations, update() takes (N, S, 3) angular velocities.'''
+
+    def __init__(self, initial=Quaternion(1.0), method='exp', renormalize=True):
+        if method not in ('exp', 'rk4'):
+            raise ValueError("Integration method must be 'exp' or 'rk4'")
+        self._state = np.array(_components(initial), dtype=np.float64)
+        if self._state.ndim > 2:
+            raise ValueError('Initial orientations must be a quaternion or an (S, 4) array')
+        self._method = method
+        self._renormalize = renormalize
+        self._previous = None
+
+    @property
+    def state(self):
+        '''The current orientation, as a Quaternion, or an (S, 4) array for several sensors'''
+        if self._state.ndim == 1:
+            return Quaternion._make(*self._state.tolist())
+        return self._state.copy()
+
+    def update(self, omega, dt):
+        '''Advance by a chunk of N angular velocity samples and return the N
+        orientations after each one.
+
+            omega is an (N, 3) array, or (N, S, 3) for S sensors, and dt the sample
+            interval, either a number or an array of N intervals.  Returns a
+            QuaternionArray, or an (N, S, 4) array for several sensors.'''
+        omega = np.asarray(omega, dtype=np.float64)
+        if omega.shape[1:] != self._state.shape[:-1] + (3,):
+            raise ValueError(f'Angular velocities must have shape (N, {", ".join(map(str, self._state.shape[:-1] + (3,)))})')
+        dt = np.asarray(dt, dtype=np.float64)
+        dt = dt.reshape(dt.shape + (1,) * (omega.ndim - dt.ndim))
+        if not len(omega):
+            return self._wrap(np.empty(omega.shape[:-1] + (4,)))
+
+        if self._method == 'exp':
+            increments = _exp_components(_pure(omega * (0.5 * dt)))
+        else:
+            previous = omega[:1] if self._previous is None else self._previous[np.newaxis]
+            increments = _rk4_increments(np.concatenate([previous, omega]), dt)
+        self._previous = omega[-1].copy()
+
+        out = hamilton_product(self._state, cumulative_product(increments))
+        if self._renormalize:
+            out /= np.sqrt(np.sum(out * out, axis=-1, keepdims=True))
+        self._state = out[-1].copy()
+        return self._wrap(out)
+
+    def _wrap(self, out):
+        if self._state.ndim == 1:
+            return QuaternionArray(out)
+        return out
+
+
+def integrate_angular_velocity(omega, dt, initial=Quaternion(1.0), method='exp', renormalize=True):
+    '''The orientations after each of a sequence of body-frame angular velocity
+    samples, starting from initial.  See AngularVelocityIntegrator.'''
+    return AngularVelocityIntegrator(initial, method, renormalize).update(omega, dt)
+
+
+def integrate_angular_velocity_stream(chunks, dt, initial=Quaternion(1.0), method='exp', renormalize=True):
+    '''Integrate an iterable of angular velocity chunks, yielding the orientations
+    for each chunk in turn, so that streams longer than memory can be processed.
+    See AngularVelocityIntegrator.'''
+    integrator = AngularVelocityIntegrator(initial, method, renormalize)
+    for omega in chunks:
+        yield integrator.update(omega, dt)
+
+
+def mean(quaternions, weights=None):
+    '''The (weighted) mean orientation of a set of quaternions, by Markley's method.
+
+        The mean is the unit eigenvector, for the largest eigenvalue, of the 4 x 4
+        matrix M = sum w_n q_n q_n^T, so q and -q, which represent the same
+        rotation, count alike, unlike in an average of components.  The quaternions
+        are normalized, and M is accumulated with a single matrix product.
+        The sign of the result is chosen so that its scalar part is not negative.
+
+        quaternions may be a QuaternionArray, an iterable of quaternions or an
+        (N, 4) array, for which a Quaternion is returned, or an (F, N, 4) array of F
+        sets, for which the F means are returned as a QuaternionArray.  weights, if
+        given, are N non-negative numbers, or (F, N) for F sets.'''
+    arr = _mean_components(quaternions)
+    if arr.ndim not in (2, 3):
+        raise ValueError('Quaternions must have shape (N, 4) or (F, N, 4)')
+    if not arr.shape[-2]:
+        raise ValueError('Mean of no quaternions is undefined')
+    matrix, total = _outer_product_sum(arr, weights)
+    if np.any(total <= 0):
+        raise ValueError('Weights must not all be zero')
+    out = principal_eigenvector(matrix)
+    if out.ndim == 1:
+        return Quaternion._make(*out.tolist())
+    return QuaternionArray(out)
+
+
+class MeanAccumulator:
+    '''Accumulate the matrix of Markley's method chunk by chunk, for the mean
+    orientation of a stream of quaternions too long to hold in memory.
+
+        Only the 4 x 4 matrix and the total weight are kept, and since both are
+        sums, accumulators filled from separate parts of a stream, for example in
+        different processes, can be combined with merge().  mean() then gives the
+        same result as the mean() function over all of the quaternions at once.
+
+            accumulator = MeanAccumulator()
+            for chunk in reader.chunks():
+                accumulator.update(chunk)
+            average = accumulator.mean()'''
+
+    def __init__(self):
+        self._matrix = np.zeros((4, 4))
+        self._count = 0
+        self._weight = 0.0
+
+    @property
+    def count(self):
+        '''The number of quaternions accumulated so far'''
+        return self._count
+
+    @property
+    def weight(self):
+        '''The total weight of the quaternions accumulated so far'''
+        return self._weight
+
+    @property
+    def matrix(self):
+        '''The accumulated 4 x 4 matrix, sum w_n q_n q_n^T'''
+        return self._matrix.copy()
+
+    def update(self, quaternions, weights=None):
+        '''Add a chunk of quaternions, a QuaternionArray, an iterable of
+        quaternions or an (N, 4) array, with optional weights, to the mean'''
+        arr = _mean_components(quaternions)
+        if arr.ndim == 1:
+            arr = arr[np.newaxis]
+        if arr.ndim != 2:
+            raise ValueError('Quaternions must have shape (N, 4)')
+        matrix, total = _outer_product_sum(arr, weights)
+        self._matrix += matrix
+        self._count += len(arr)
+        self._weight += float(total)
+
+    def merge(self, other):
+        '''Add the quaternions accumulated by another MeanAccumulator'''
+        if not isinstance(other, MeanAccumulator):
+            raise TypeError('Argument must be a MeanAccumulator')
+        self._matrix += other._matrix
+        self._count += other._count
+        self._weight += other._weight
+
+    def mean(self):
+        '''The mean orientation of the quaternions accumulated so far'''
+        if self._weight <= 0:
+            raise ValueError('Mean of no quaternions is undefined')
+        return Quaternion._make(*principal_eigenvector(self._matrix).tolist())
+
+
+def _mean_components(quaternions):
+    '''The component array of the argument to mean or MeanAccumulator.update'''
+    if not isinstance(quaternions, (QuaternionArray, Quaternion, np.ndarray)):
+        return QuaternionArray.from_quaternions(quaternions).components
+    arr = _components(quaternions)
+    if not arr.size:
+        arr = arr.reshape(arr.shape[:-2] + (0, 4))
+    return arr
+
+
+def _outer_product_sum(arr, weights):
+    '''The matrices sum w_n u_n u_n^T of the unit quaternions u_n of (..., N, 4)
+    components, and the total weights.  The quaternions are not normalized
+    themselves: w_n is divided by the squared norm instead, which is cheaper.
+    Zero quaternions have no direction, and are left out of both.'''
+    squared_norms = np.einsum('...i,...i->...', arr, arr)
+    if weights is None:
+        weights = np.ones(arr.shape[:-1])
+    else:
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != arr.shape[:-1]:
+            raise ValueError(f'Weights must have shape {arr.shape[:-1]}')
+        if not np.all(np.isfinite(weights)):
+            raise ValueError('Weights must be finite')
+        if np.any(weights < 0):
+            raise ValueError('Weights must not be negative')
+    weights = np.where(squared_norms != 0, weights, 0.0)
+    scale = np.divide(weights, squared_norms, out=np.zeros_like(squared_norms), where=squared_norms != 0)
+    return np.swapaxes(arr, -1, -2) @ (scale[..., np.newaxis] * arr), weights.sum(axis=-1)
+
+
+def _pure(vectors):
+    '''The (..., 4) components of pure quaternions with (..., 3) vector parts'''
+    out = np.zeros(vectors.shape[:-1] + (4,), dtype=np.float64)
+    out[..., 1:] = vectors
+    return out
+
+
+def _rk4_increments(omega, dt):
+    '''The quaternions M_n with q_n+1 = q_n M_n for one Runge-Kutta step of
+    q' = q A(t), A = (0, w) / 2, for each of the N intervals between N + 1 samples
+    of w, taking w to vary linearly over each interval'''
+    a1 = _pure(0.5 * omega[:-1])
+    a3 = _pure(0.5 * omega[1:])
+    a2 = 0.5 * (a1 + a3)
+    half = 0.5 * dt
+    # k_i = q B_i, since q' is linear in q
+    b2 = a2 + half * hamilton_product(a1, a2)
+    b3 = a2 + half * hamilton_product(b2, a2)
+    b4 = a3 + dt * hamilton_product(b3, a3)
+    out = (dt / 6.0) * (a1 + 2.0 * b2 + 2.0 * b3 + b4)
+    out[..., 0] += 1.0
+    return out
+
+
+def _slerp_components(a, b, t, shortest):
+    '''Slerp between broadcastable (..., 4) arrays of unit quaternions'''
+    dot = np.sum(a * b, axis=-1)
+    if shortest:
+        b = np.where((dot < 0)[..., np.newaxis], -b, b)
+        dot = np.abs(dot)
+    dot = np.clip(dot, -1.0, 1.0)[..., np.newaxis]
+    t = t[..., np.newaxis]
+
+    linear = dot > _NLERP_THRESHOLD
+    theta = np.arccos(dot)
+    sin_theta = np.where(linear, 1.0, np.sin(theta))
+    wa = np.where(linear, 1.0 - t, np.sin((1.0 - t) * theta) / sin_theta)
+    wb = np.where(linear, t, np.sin(t * theta) / sin_theta)
+    out = wa * a + wb * b
+    if np.any(linear):
+        out = np.where(linear, unit_components(out), out)
+    return out
+
+
+def _ln_components(arr):
+    '''Natural logarithm of a (..., 4) component array'''
+    v = arr[..., 1:]
+    v_norm = np.sqrt(np.sum(v * v, axis=-1, keepdims=True))
+    out = np.empty_like(arr)
+    out[..., :1] = 0.5 * np.log(np.sum(arr * arr, axis=-1, keepdims=True))
+    out[..., 1:] = v * (np.arctan2(v_norm, arr[..., :1]) / np.where(v_norm == 0, 1.0, v_norm))
+    return out
+
+
+def _exp_components(arr):
+    '''Exponential of a (..., 4) component array'''
+    v = arr[..., 1:]
+    v_norm = np.sqrt(np.sum(v * v, axis=-1, keepdims=True))
+    a = np.exp(arr[..., :1])
+    out = np.empty_like(arr)
+    out[..., :1] = a * np.cos(v_norm)
+    out[..., 1:] = v * (a * np.sinc(v_norm / np.pi))
+    return out
+
+
+def _components(quaternions):
+    '''The component array of a QuaternionArray, quaternion or (N, 4) array-like'''
+    if isinstance(quaternions, (QuaternionArray, Quaternion)):
+        return as_components(quaternions)
+    arr = np.asarray(quaternions, dtype=np.float64)
+    if arr.shape[-1:] != (4,):
+        raise ValueError('Quaternion components must have shape (N, 4)')
+    return arr
+
+
+def _geodesic_units(quaternions, single):
+    '''The unit components of (N, 4) quaternions, or of a single quaternion if
+    single is set, rejecting zero quaternions like geodesic_distance'''
+    arr = _components(quaternions)
+    if arr.ndim != 2 and not (single and arr.ndim == 1):
+        expected = 'a single quaternion or shape (N, 4)' if single else 'shape (N, 4)'
+        raise ValueError(f'Quaternion components must have {expected}, not {arr.shape}')
+    if not np.all(arr.any(axis=-1)):
+        raise ZeroDivisionError('Geodesic distance is undefined for a zero quaternion')
+    return unit_components(arr)
+
+
+def _same_type(quaternions, arr):
+    '''Wrap a result array in a QuaternionArray if the argument was one'''
+    if isinstance(quaternions, QuaternionArray):
+        return QuaternionArray(arr)
+    return arr